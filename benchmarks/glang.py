@@ -1,12 +1,15 @@
 from chainforge.frontend import Parser, PostProcessor
 from chainforge.common import FloatingPointType
-from chainforge.backend.generator import Generator
+from chainforge.backend.parallel import generate_many
+from chainforge.backend.fusion import fuse_gemm_lists
+from chainforge.backend.cache import KernelCache
 from chainforge.common import Context
 from internals import BenchGenerator, EnryPointGenerator, Aux
 from os import path, makedirs
 import sys
 import shutil
 import yaml
+import json
 from copy import deepcopy
 import argparse
 
@@ -37,6 +40,13 @@ def main():
   cmd.add_argument('-c', '--config', type=str, help="config file")
   cmd.add_argument('-b', '--backend', type=str, help='gpu arch (cuda, hip)')
   cmd.add_argument('-a', '--arch', type=str, help='architecture e.g., sm_60, gfx906, etc.')
+  cmd.add_argument('-d', '--cache-dir', type=str, default=None, help='directory of the kernel cache')
+  cmd.add_argument('-j', '--jobs', type=int, default=None, help='num. processes used for generation')
+  cmd.add_argument('-o', '--ordering', type=str, default=None,
+                   help='automatic matrix-chain ordering (flops, shr_mem, balanced)')
+  cmd.add_argument('-r', '--report', action='store_true', help='write kernel reports to report.json')
+  cmd.add_argument('-f', '--fuse', action='store_true',
+                   help='fuse all statements into a single kernel (outputs must be independent)')
   args = cmd.parse_args()
 
   try:
@@ -56,8 +66,11 @@ def main():
 
   # convert AST to lists of gemms
   symbol_table.add_scope()
-  processor = PostProcessor(ast, symbol_table)
+  processor = PostProcessor(ast, symbol_table, chain_ordering=args.ordering)
   gemm_dicts = processor.process()
+  if args.fuse:
+    # NOTE: statements share matrices of the same symbol table. Thus, shared inputs are loaded once
+    gemm_dicts = {'_'.join(gemm_dicts.keys()): fuse_gemm_lists(list(gemm_dicts.values()))}
 
   stream = open(args.config, 'r')
   config = yaml.safe_load(stream)
@@ -65,13 +78,17 @@ def main():
                     backend=args.backend,
                     fp_type=FloatingPointType.str2enum(config['fp_type']))
 
+  cache = KernelCache(args.cache_dir) if args.cache_dir else None
+
   kernels = []; launchers = []; headers = []
   benchmarks_src = []; benchmarks_names = []
-  for bench_name, gemm_list in gemm_dicts.items():
-    gpu_generator = Generator(gemm_list, context)
-    gpu_generator.set_kernel_name(bench_name)
-    gpu_generator.generate()
+  generators = generate_many(list(gemm_dicts.values()),
+                             context,
+                             workers=args.jobs,
+                             kernel_names=list(gemm_dicts.keys()),
+                             cache=cache)
 
+  for (bench_name, gemm_list), gpu_generator in zip(gemm_dicts.items(), generators):
     # write kernel, launcher and header to files
     kernels.append(gpu_generator.get_kernel())
     launchers.append(gpu_generator.get_launcher())
@@ -110,6 +127,12 @@ def main():
       file.write(header)
     file.write('#endif\n')
 
+  if args.report:
+    reports = {name: generator.get_report().to_dict() for name, generator in zip(gemm_dicts.keys(),
+                                                                                 generators)}
+    with open(path.join(tmp_dir, 'report.json'), 'w') as file:
+      file.write(json.dumps(reports, indent=2))
+
   with open(path.join(tmp_dir, 'cmake_params.cmake'), 'w') as file:
     real_size = 8 if config['fp_type'] == 'double' else 4
     file.write(f'set(REAL_SIZE {real_size})\n')
@@ -18,6 +18,8 @@ class Aux:
     offset_names = {}
     for gemm in gemm_list:
       mat_list = [gemm.mat_a, gemm.mat_b, gemm.mat_c]
+      if gemm.epilogue is not None:
+        mat_list.extend(gemm.epilogue.get_matrices())
       for mat in mat_list:
         mat_names[mat.alias] = f'dev_{mat.alias}'
         offset_names[mat.alias] = '0'
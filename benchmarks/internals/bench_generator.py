@@ -1,6 +1,7 @@
 from .gpu_api import GpuAPI
 from .aux import Aux
 from chainforge.common import Addressing
+from chainforge.backend.fusion import get_chain_outputs
 
 
 class BenchGenerator:
@@ -22,14 +23,14 @@ class BenchGenerator:
 
     gpu_matrices = self._symbol_table.get_matrices(0)
     gpu_matrices = self._decorate_matrices(gpu_matrices)
-    res_matrix = self._gemm_list[-1].mat_c
-    res_matrix = {'name': res_matrix.alias,
-                  'attr': res_matrix}
+    # NOTE: a list can contain several fused chains and thus several results
+    res_matrices = [{'name': matrix.alias,
+                     'attr': matrix} for matrix in get_chain_outputs(self._gemm_list)]
 
     src = self._template.render(test_name=self._test_name,
                                 cpu_matrices=cpu_matrices,
                                 gpu_matrices=gpu_matrices,
-                                res_matrix=res_matrix,
+                                res_matrices=res_matrices,
                                 gemm_list=self._gemm_list,
                                 call_site=self._call_site,
                                 flops=self._compute_flops(),
@@ -70,6 +71,8 @@ class BenchGenerator:
       used_variables.add(gemm.mat_a.alias)
       used_variables.add(gemm.mat_b.alias)
       used_variables.add(gemm.mat_c.alias)
+      if gemm.epilogue is not None:
+        used_variables.update([matrix.alias for matrix in gemm.epilogue.get_matrices()])
     return used_variables
 
   def _get_all_variable_names(self):
@@ -0,0 +1,73 @@
+from chainforge.common import DenseMatrix, GemmDescr, Addressing, FloatingPointType
+from chainforge.common import Context
+from chainforge.common.context import Options
+from chainforge.common.aux import generate_tmp_matrix
+from chainforge.backend.generator import Generator
+from time import perf_counter
+import argparse
+
+
+def make_chain(num_gemms, size, num_distinct_operands):
+  """Generates a synthetic chain: tmp_0 = A x B_0; tmp_i = tmp_(i - 1) x B_(i % num_distinct_operands)
+
+  Note: B-operands are loaded to shr. mem. once and reused by the following gemms.
+  Thus, the chain contains both short- and long-lived shr. mem. symbols
+  """
+  def make_matrix():
+    return DenseMatrix(num_rows=size,
+                       num_cols=size,
+                       addressing=Addressing.STRIDED,
+                       bbox=[0, 0, size, size])
+
+  mat_a = make_matrix()
+  operands = [make_matrix() for _ in range(num_distinct_operands)]
+  result = make_matrix()
+
+  gemm_list = []
+  prev = mat_a
+  for index in range(num_gemms):
+    mat_b = operands[index % num_distinct_operands]
+    is_last = index == num_gemms - 1
+    dest = result if is_last else generate_tmp_matrix(prev, mat_b)
+    gemm_list.append(GemmDescr(trans_a=False, trans_b=False, a=prev, b=mat_b, c=dest))
+    prev = dest
+  return gemm_list
+
+
+def main():
+  cmd = argparse.ArgumentParser(description='measures generation time of long synthetic chains')
+  cmd.add_argument('-s', '--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                   help='num. gemms in a chain')
+  cmd.add_argument('-b', '--backend', type=str, default='cuda', help='gpu arch (cuda, hip)')
+  cmd.add_argument('-a', '--arch', type=str, default='sm_60', help='architecture e.g., sm_60, gfx906, etc.')
+  cmd.add_argument('-m', '--matrix-size', type=int, default=16, help='num. rows/cols of all matrices')
+  cmd.add_argument('-n', '--num-operands', type=int, default=4, help='num. distinct B-operands')
+  cmd.add_argument('-p', '--pipeline', type=str, default='default',
+                   help='optimization pipeline (default, fast, aggressive)')
+  args = cmd.parse_args()
+
+  pass_names = None
+  for num_gemms in args.sizes:
+    gemm_list = make_chain(num_gemms, args.matrix_size, args.num_operands)
+    context = Context(arch=args.arch,
+                      backend=args.backend,
+                      fp_type=FloatingPointType.FLOAT,
+                      options=Options(pipeline=args.pipeline))
+
+    generator = Generator(gemm_list, context)
+    start = perf_counter()
+    generator.generate()
+    total = perf_counter() - start
+
+    timings = generator.get_pass_timings()
+    if pass_names is None:
+      pass_names = list(timings.keys())
+      print(', '.join(['num. gemms', 'num. instrs', 'total, s'] + [f'{name}, s' for name in pass_names]))
+
+    row = [str(num_gemms), str(len(generator.get_instructions())), f'{total:.4f}']
+    row.extend([f'{timings.get(name, 0.0):.4f}' for name in pass_names])
+    print(', '.join(row))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,229 @@
+import os
+import json
+import math
+import itertools
+from copy import copy, deepcopy
+from typing import List, Dict, Union, Callable, Type
+from chainforge.common import GemmDescr, Context
+from .generator import Generator
+from .thread_block_policies import AbstractThreadBlockPolicy, OccupancyThreadBlockPolicy, FixedThreadBlockPolicy
+from .fusion import get_chain_orders
+from .cache import KernelCache
+from .exceptions import GenerationError
+
+
+class AnalyticCostModel:
+  """Estimates time per batch element (in arbitrary units) from the static report of a kernel.
+
+  Glb. mem. traffic, shr. mem. accesses (scaled by the max. degree of bank conflicts),
+  issued flops and barriers are weighted and summed. The sum is scaled up by the fraction
+  of idle threads in warps and if occupancy is too low to hide latency
+  """
+  GLB_BYTE_COST = 1.0
+  SHR_ACCESS_COST = 0.5
+  FLOP_COST = 0.125
+  BARRIER_COST = 16.0
+  LATENCY_HIDING_OCCUPANCY = 0.5
+
+  def __call__(self, generator: Generator) -> float:
+    report = generator.get_report().to_dict()
+    per_element = report['per_element']
+
+    conflict_degree = max(report['bank_conflicts']['max_degree'], 1)
+    cost = per_element['glb_bytes'] * AnalyticCostModel.GLB_BYTE_COST
+    cost += (per_element['shr_loads'] + per_element['shr_stores']) * conflict_degree * AnalyticCostModel.SHR_ACCESS_COST
+    cost += per_element['issued_flops'] * AnalyticCostModel.FLOP_COST
+    cost += per_element['num_barriers'] * AnalyticCostModel.BARRIER_COST
+
+    warp_size = generator.get_context().get_vm().hw_descr.vec_unit_length
+    threads_per_block = report['block']['threads_per_block']
+    lane_efficiency = threads_per_block / (math.ceil(threads_per_block / warp_size) * warp_size)
+
+    occupancy = report['occupancy']['occupancy']
+    if occupancy == 0.0:
+      return math.inf
+    latency_hiding = min(1.0, occupancy / AnalyticCostModel.LATENCY_HIDING_OCCUPANCY)
+    return cost / (lane_efficiency * latency_hiding)
+
+
+class TuningDatabase:
+  """A json file which keeps the best configuration found for each tuned gemm list"""
+
+  def __init__(self, file_path: str):
+    self._file_path: str = file_path
+    self._records: Dict[str, Dict[str, object]] = {}
+    self._load()
+
+  def get(self, key: str) -> Union[Dict[str, object], None]:
+    return self._records.get(key, None)
+
+  def put(self, key: str, record: Dict[str, object]) -> None:
+    # NOTE: re-read the file to keep records added by other processes
+    self._load()
+    self._records[key] = record
+    self._save()
+
+  def __contains__(self, key: str) -> bool:
+    return key in self._records
+
+  def __len__(self) -> int:
+    return len(self._records)
+
+  def _load(self) -> None:
+    try:
+      with open(self._file_path, 'r') as file:
+        self._records = json.load(file)
+    except (OSError, ValueError):
+      self._records = {}
+
+  def _save(self) -> None:
+    directory = os.path.dirname(self._file_path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f'{self._file_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+      file.write(json.dumps(self._records, indent=2))
+    os.replace(tmp_path, self._file_path)
+
+
+MAX_NUM_CHAIN_ORDERS = 4
+MAX_MULTS_PER_BLOCK = 16
+
+
+def get_search_space(generator: Generator) -> List[Dict[str, object]]:
+  """Returns configurations of a gemm list, sorted by the num. changes w.r.t. the generator.
+
+  The first configuration reproduces the generator. A value `None` keeps the corresponding
+  choice of the generator (i.e., `prefer_align` of gemm descr., the thread-block policy or the
+  order of the gemm list)
+  """
+  options = generator.get_context().get_user_options()
+  hw_descr = generator.get_context().get_vm().hw_descr
+  gemm_list = generator.gemm_list
+
+  prefer_align = set([gemm.prefer_align for gemm in gemm_list])
+  loaders = ['auto', 'exact', 'extended']
+
+  # NOTE: a block of the host backend always computes a single batch element
+  mults_per_block = [None]
+  num_threads = generator.get_num_threads()
+  if 0 < num_threads <= hw_descr.vec_unit_length and hw_descr.backend != 'cpu':
+    max_mults = min(hw_descr.max_threads_per_block // num_threads, MAX_MULTS_PER_BLOCK)
+    mults_per_block.extend([2 ** power for power in range(int(math.log2(max_mults)) + 1)])
+
+  chain_orders = [None] + get_chain_orders(gemm_list, MAX_NUM_CHAIN_ORDERS)[1:]
+
+  choices = {
+    'prefer_align': [None] + ([not prefer_align.pop()] if len(prefer_align) == 1 else [False, True]),
+    'align_shr_mem': [options.align_shr_mem, not options.align_shr_mem],
+    'enable_sync_threads_opt': [options.enable_sync_threads_opt, not options.enable_sync_threads_opt],
+    'shr_mem_loader': [options.shr_mem_loader] + [item for item in loaders if item != options.shr_mem_loader],
+    'mults_per_block': mults_per_block,
+    'chain_order': chain_orders,
+  }
+
+  names = list(choices.keys())
+  configs = []
+  for indices in itertools.product(*[range(len(choices[name])) for name in names]):
+    config = {name: choices[name][index] for name, index in zip(names, indices)}
+    configs.append((len([index for index in indices if index != 0]), config))
+
+  # NOTE: the sort is stable. Thus, the order of configs with the same num. changes is deterministic
+  return [config for _, config in sorted(configs, key=lambda item: item[0])]
+
+
+def make_generator(gemm_list: List[GemmDescr],
+                   context: Context,
+                   config: Dict[str, object],
+                   kernel_name: Union[str, None] = None,
+                   thread_block_policy_type: Type[AbstractThreadBlockPolicy] = OccupancyThreadBlockPolicy) -> Generator:
+  """Generates a kernel for a configuration given by `get_search_space`"""
+  gemm_list = deepcopy(gemm_list)
+  if config['prefer_align'] is not None:
+    for gemm in gemm_list:
+      gemm.prefer_align = config['prefer_align']
+
+  options = copy(context.get_user_options())
+  options.align_shr_mem = config['align_shr_mem']
+  options.enable_sync_threads_opt = config['enable_sync_threads_opt']
+  options.shr_mem_loader = config['shr_mem_loader']
+
+  hw_descr = context.get_vm().hw_descr
+  context = Context(arch=hw_descr.model,
+                    backend=hw_descr.backend,
+                    fp_type=context.fp_type,
+                    options=options)
+
+  if config['mults_per_block'] is not None:
+    thread_block_policy_type = FixedThreadBlockPolicy.with_num_mults(config['mults_per_block'])
+
+  generator = Generator(gemm_list, context, thread_block_policy_type)
+  if kernel_name:
+    generator.set_kernel_name(kernel_name)
+  generator.set_chain_order(config['chain_order'])
+  generator.generate()
+  return generator
+
+
+def autotune(gemm_list: List[GemmDescr],
+             context: Context,
+             budget: int = 32,
+             timer: Union[Callable[[Generator], float], None] = None,
+             database: Union[TuningDatabase, None] = None,
+             kernel_name: Union[str, None] = None,
+             thread_block_policy_type: Type[AbstractThreadBlockPolicy] = OccupancyThreadBlockPolicy) -> Generator:
+  """Searches generator variants of a gemm list and returns the fastest one
+
+  Args:
+    gemm_list: a gemm list to tune. It is not modified
+    context: generation context. Its options are the starting point of the search
+    budget: max. num. variants to generate and score
+    timer: optional callback which returns the measured time of a generated kernel.
+           If not given, variants are scored with `AnalyticCostModel`
+    database: optional database of the best configurations. A gemm list found in the database
+              is generated without a search
+    kernel_name: optional kernel name. Otherwise, the name is deduced from the gemm list
+    thread_block_policy_type: thread-block policy used if the num. mults per block is not tuned
+
+  Returns:
+    the generated generator of the best variant. All variants have the same kernel name
+    and arguments
+  """
+  if budget < 1:
+    raise ValueError(f'budget must be positive, given: {budget}')
+
+  baseline = Generator(deepcopy(gemm_list), context, thread_block_policy_type)
+  if kernel_name:
+    baseline.set_kernel_name(kernel_name)
+  baseline.generate()
+  kernel_name = baseline.get_base_name()
+
+  scorer = timer if timer is not None else AnalyticCostModel()
+  key = KernelCache.make_key([baseline.get_fingerprint(),
+                              f'scorer: {"timer" if timer is not None else "model"}'])
+
+  if database is not None and key in database:
+    try:
+      return make_generator(gemm_list, context, database.get(key)['config'], kernel_name, thread_block_policy_type)
+    except (GenerationError, KeyError):
+      # NOTE: the record is outdated (e.g., written by another version). Search again
+      pass
+
+  configs = get_search_space(baseline)[:budget]
+  best_generator, best_config, best_score = baseline, configs[0], scorer(baseline)
+  for config in configs[1:]:
+    try:
+      generator = make_generator(gemm_list, context, config, kernel_name, thread_block_policy_type)
+    except GenerationError:
+      continue
+
+    score = scorer(generator)
+    if math.isfinite(score) and (not math.isfinite(best_score) or score < best_score):
+      best_generator, best_config, best_score = generator, config, score
+
+  if database is not None:
+    database.put(key, {'config': best_config,
+                       'score': best_score if math.isfinite(best_score) else None,
+                       'num_variants': len(configs)})
+  return best_generator
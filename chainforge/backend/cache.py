@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Tuple, Union
+
+
+def get_chainforge_version() -> str:
+  version_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'VERSION')
+  with open(version_file, 'r') as file:
+    return file.read().strip()
+
+
+class CacheEntry:
+  def __init__(self, kernel: str, launcher: str, header: str):
+    self.kernel = kernel
+    self.launcher = launcher
+    self.header = header
+
+  def to_dict(self) -> Dict[str, str]:
+    return {'kernel': self.kernel,
+            'launcher': self.launcher,
+            'header': self.header}
+
+  @classmethod
+  def from_dict(cls, data: Dict[str, str]):
+    return cls(kernel=data['kernel'],
+               launcher=data['launcher'],
+               header=data['header'])
+
+
+class KernelCache:
+  """A content-addressed on-disk storage of generated kernels.
+
+  Each entry is a json file named after its key. The modification time of an entry
+  is its last access time which is used to evict the least recently used entries
+  once `max_size` (in bytes) is exceeded. There is no shared index. Thus, several
+  processes can use the same directory concurrently and a hit does not write any file
+  """
+  ENTRY_SUFFIX = '.json'
+
+  def __init__(self, cache_dir: str, max_size: int = 64 * 1024 * 1024):
+    self._cache_dir: str = cache_dir
+    self._max_size: int = max_size
+    os.makedirs(self._cache_dir, exist_ok=True)
+
+  @classmethod
+  def make_key(cls, items: List[str]) -> str:
+    long_key = ', '.join([f'chainforge: {get_chainforge_version()}'] + items)
+    return hashlib.md5(long_key.encode()).hexdigest()
+
+  def get(self, key: str) -> Union[CacheEntry, None]:
+    entry_path = self._get_entry_path(key)
+    try:
+      with open(entry_path, 'r') as file:
+        entry = CacheEntry.from_dict(json.load(file))
+      os.utime(entry_path)
+    except (OSError, ValueError, KeyError):
+      # NOTE: the entry does not exist, has been evicted or corrupted by someone else.
+      # Treat it as a miss and let the caller regenerate it
+      return None
+    return entry
+
+  def put(self, key: str, entry: CacheEntry) -> None:
+    self._write_atomically(self._get_entry_path(key), json.dumps(entry.to_dict()))
+    self._evict()
+
+  def clear(self) -> None:
+    for entry_path, _, _ in self._scan():
+      self._remove_file(entry_path)
+
+  def get_total_size(self) -> int:
+    return sum([size for _, size, _ in self._scan()])
+
+  def __contains__(self, key: str) -> bool:
+    return os.path.isfile(self._get_entry_path(key))
+
+  def __len__(self) -> int:
+    return len(self._scan())
+
+  def _scan(self) -> List[Tuple[str, int, float]]:
+    """Returns path, size and last access time of each entry"""
+    entries = []
+    with os.scandir(self._cache_dir) as items:
+      for item in items:
+        if not item.name.endswith(KernelCache.ENTRY_SUFFIX):
+          continue
+        try:
+          stat = item.stat()
+        except OSError:
+          # NOTE: evicted by another process in the meantime
+          continue
+        entries.append((item.path, stat.st_size, stat.st_mtime))
+    return entries
+
+  def _evict(self) -> None:
+    entries = self._scan()
+    total_size = sum([size for _, size, _ in entries])
+    for entry_path, size, _ in sorted(entries, key=lambda item: item[2]):
+      if total_size <= self._max_size:
+        break
+      total_size -= size
+      self._remove_file(entry_path)
+
+  def _remove_file(self, file_path: str) -> None:
+    try:
+      os.remove(file_path)
+    except OSError:
+      pass
+
+  def _get_entry_path(self, key: str) -> str:
+    return os.path.join(self._cache_dir, f'{key}{KernelCache.ENTRY_SUFFIX}')
+
+  def _write_atomically(self, file_path: str, content: str) -> None:
+    tmp_path = f'{file_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+      file.write(content)
+    os.replace(tmp_path, file_path)
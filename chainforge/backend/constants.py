@@ -0,0 +1,76 @@
+import math
+import struct
+from typing import List
+from chainforge.common import Addressing, FloatingPointType
+from chainforge.common.matrix import Matrix
+from .exceptions import GenerationError
+
+
+class ConstantValues:
+  """Values of a matrix without addressing which are known at generation time.
+
+  Values are given as a 2D array-like object (e.g., a NumPy array) of the shape
+  `(num_rows, num_cols)` of the matrix and are stored in the column-major order, i.e. in
+  the same layout as the matrix in glb. mem.
+  """
+
+  def __init__(self, matrix: Matrix, values):
+    if matrix.addressing != Addressing.NONE:
+      raise GenerationError(f'constant values can be set only for matrices without addressing, '
+                            f'given: {Addressing.addr2str(matrix.addressing)}')
+
+    num_rows = len(values)
+    num_cols = len(values[0]) if num_rows else 0
+    if (num_rows, num_cols) != (matrix.num_rows, matrix.num_cols):
+      raise GenerationError(f'shape of constant values ({num_rows}, {num_cols}) does not match '
+                            f'the shape of the matrix ({matrix.num_rows}, {matrix.num_cols})')
+
+    self.matrix: Matrix = matrix
+    self._values: List[float] = [float(values[row][column])
+                                 for column in range(num_cols)
+                                 for row in range(num_rows)]
+
+    if not all([math.isfinite(value) for value in self._values]):
+      raise GenerationError('constant values must be finite')
+
+  def get_values(self) -> List[float]:
+    return self._values
+
+  def get_value(self, address: int) -> float:
+    """Returns a value given by its address in the column-major layout"""
+    return self._values[address]
+
+  def get_num_nonzeros(self) -> int:
+    return len([value for value in self._values if value != 0.0])
+
+  def gen_descr(self) -> str:
+    return ', '.join([repr(value) for value in self._values])
+
+
+def gen_fp_literal(value: float, fp_type: FloatingPointType) -> str:
+  """Returns a literal which represents a value in a given precision exactly"""
+  if fp_type == FloatingPointType.FLOAT:
+    # NOTE: 9 significant digits are enough to restore any single precision number
+    value = struct.unpack('f', struct.pack('f', value))[0]
+    literal = f'{value:.9g}'
+    suffix = 'f'
+  else:
+    literal = repr(value)
+    suffix = ''
+
+  if not any([char in literal for char in '.e']):
+    literal += '.0'
+  return f'{literal}{suffix}'
+
+
+def gen_constant_array(name: str, constant: ConstantValues, fp_type: FloatingPointType, keyword: str) -> List[str]:
+  """Returns lines of a definition of an array in constant memory"""
+  values_per_line = 8
+  values = [gen_fp_literal(value, fp_type) for value in constant.get_values()]
+  fp_as_str = FloatingPointType.as_str(fp_type)
+
+  lines = [f'{keyword} {fp_as_str} {name}[{len(values)}] = {{']
+  for begin in range(0, len(values), values_per_line):
+    lines.append('  ' + ', '.join(values[begin:begin + values_per_line]) + ',')
+  lines.append('};')
+  return lines
@@ -3,6 +3,7 @@ class ShrMemObject:
     self.name = name
     self._size_per_mult = size
     self._mults_per_block = mults_per_block
+    self._block_shared_size = 0
 
   def set_size_per_mult(self, size):
     self._size_per_mult = size
@@ -16,8 +17,18 @@ class ShrMemObject:
   def get_mults_per_block(self):
     return self._mults_per_block
 
+  def set_block_shared_size(self, size):
+    """Sets size of a region which precedes per-mult. regions and is shared by all mults"""
+    self._block_shared_size = size
+
+  def get_block_shared_size(self):
+    return self._block_shared_size
+
   def get_total_size(self):
-    return self._size_per_mult * self._mults_per_block
+    return self._block_shared_size + self._size_per_mult * self._mults_per_block
+
+  def get_common_name(self):
+    return f'total_{self.name}'
 
   def get_total_size_as_str(self):
     if self._size_per_mult and self._mults_per_block:
@@ -37,3 +48,20 @@ class RegMemObject:
 
   def __str__(self):
     return f'name: {self.name}; size = {self.size}'
+
+
+class ShrMemAccess:
+  """Shared memory elements which threads of a mult. access at the same time.
+
+  Each request holds an element address per thread (`None` if a thread is inactive).
+  A thread accesses `elems_per_thread` consecutive elements starting from its address.
+  """
+  def __init__(self, symbol, is_write, requests, elems_per_thread=1):
+    self.symbol = symbol
+    self.is_write = is_write
+    self.requests = requests
+    self.elems_per_thread = elems_per_thread
+
+  def __str__(self):
+    access_type = 'write' if self.is_write else 'read'
+    return f'{access_type} {self.symbol.name}: num. requests = {len(self.requests)}'
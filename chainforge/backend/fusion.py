@@ -0,0 +1,140 @@
+from typing import List, Dict, Set
+from chainforge.common import GemmDescr
+from chainforge.common.matrix import Matrix
+from .exceptions import GenerationError
+
+
+def get_chain_outputs(gemm_list: List[GemmDescr]) -> List[Matrix]:
+  """Returns non-tmp. matrices written by a gemm list (incl. extra outputs of epilogues)"""
+  outputs, collected = [], set()
+  for gemm in gemm_list:
+    matrices = [] if gemm.mat_c.is_tmp else [gemm.mat_c]
+    if gemm.epilogue is not None:
+      matrices.extend([matrix for matrix, _ in gemm.epilogue.outputs])
+
+    for matrix in matrices:
+      if id(matrix) not in collected:
+        outputs.append(matrix)
+        collected.add(id(matrix))
+  return outputs
+
+
+def _get_chain_matrices(gemm_list: List[GemmDescr]) -> Set[int]:
+  matrices = set()
+  for gemm in gemm_list:
+    matrices.update([id(gemm.mat_a), id(gemm.mat_b), id(gemm.mat_c)])
+    if gemm.epilogue is not None:
+      matrices.update([id(matrix) for matrix in gemm.epilogue.get_matrices()])
+  return matrices
+
+
+def _get_written_matrices(gemm: GemmDescr) -> List[Matrix]:
+  matrices = [gemm.mat_c]
+  if gemm.epilogue is not None:
+    matrices.extend([matrix for matrix, _ in gemm.epilogue.outputs])
+  return matrices
+
+
+def _get_accessed_matrices(gemm: GemmDescr) -> List[Matrix]:
+  matrices = [gemm.mat_a, gemm.mat_b, gemm.mat_c]
+  if gemm.epilogue is not None:
+    matrices.extend(gemm.epilogue.get_matrices())
+  return matrices
+
+
+def _is_same_matrix(matrix: Matrix, other: Matrix) -> bool:
+  is_aliased = matrix.alias is not None and matrix.alias == other.alias
+  return matrix is other or is_aliased
+
+
+def get_chain_dependencies(gemm_list: List[GemmDescr]) -> List[Set[int]]:
+  """Returns indices of gemms which must precede each gemm of a list.
+
+  A gemm depends on a previous one if either of them writes a matrix (or its alias)
+  which is accessed by the other one
+  """
+  dependencies = []
+  for index, gemm in enumerate(gemm_list):
+    preceding = set()
+    for prev_index, prev_gemm in enumerate(gemm_list[:index]):
+      pairs = [(_get_written_matrices(prev_gemm), _get_accessed_matrices(gemm)),
+               (_get_written_matrices(gemm), _get_accessed_matrices(prev_gemm))]
+      for written, accessed in pairs:
+        if any([_is_same_matrix(matrix, other) for matrix in written for other in accessed]):
+          preceding.add(prev_index)
+    dependencies.append(preceding)
+  return dependencies
+
+
+def is_valid_chain_order(gemm_list: List[GemmDescr], order: List[int]) -> bool:
+  """Returns True if a permutation of gemm indices keeps all dependencies of a list"""
+  if sorted(order) != list(range(len(gemm_list))):
+    return False
+
+  dependencies = get_chain_dependencies(gemm_list)
+  position = {index: pos for pos, index in enumerate(order)}
+  return all([position[prev] < position[index] for index in order for prev in dependencies[index]])
+
+
+def get_chain_orders(gemm_list: List[GemmDescr], max_num_orders: int) -> List[List[int]]:
+  """Returns up to `max_num_orders` valid execution orders of a gemm list.
+
+  The given order comes first. Other orders are enumerated in the lexicographic order
+  """
+  dependencies = get_chain_dependencies(gemm_list)
+  orders = [list(range(len(gemm_list)))]
+
+  def enumerate_orders(order: List[int], remaining: List[int]) -> None:
+    if len(orders) >= max_num_orders:
+      return
+    if not remaining:
+      if order != orders[0]:
+        orders.append(list(order))
+      return
+
+    placed = set(order)
+    for index in remaining:
+      if dependencies[index].issubset(placed):
+        enumerate_orders(order + [index], [item for item in remaining if item != index])
+
+  enumerate_orders([], list(range(len(gemm_list))))
+  return orders
+
+
+def fuse_gemm_lists(list_of_gemm_lists: List[List[GemmDescr]]) -> List[GemmDescr]:
+  """Merges independent gemm lists into a single one which results in a single kernel.
+
+  Chains are executed one after another by the same threads. Inputs, shared by several chains,
+  are identified by the same matrix objects. Thus, they are passed to the kernel once and
+  their copies in shr. mem. can be reused by the following chains. A matrix written by a chain
+  can be neither read nor written by the other ones
+
+  Args:
+    list_of_gemm_lists: gemm lists which share matrices (e.g., given by the same PostProcessor)
+
+  Returns:
+    a concatenated gemm list
+  """
+  if not list_of_gemm_lists:
+    raise GenerationError('expected at least one gemm list to fuse')
+
+  matrices: List[Set[int]] = [_get_chain_matrices(gemm_list) for gemm_list in list_of_gemm_lists]
+  for index, gemm_list in enumerate(list_of_gemm_lists):
+    for output in get_chain_outputs(gemm_list):
+      for other_index, other_matrices in enumerate(matrices):
+        if other_index != index and id(output) in other_matrices:
+          raise GenerationError(f'cannot fuse gemm lists {index} and {other_index}: '
+                                f'matrix {output.alias if output.alias else output.name} '
+                                f'is written by the former and accessed by the latter')
+
+  owners: Dict[int, int] = {}
+  for index, gemm_list in enumerate(list_of_gemm_lists):
+    for gemm in gemm_list:
+      if gemm.mat_c.is_tmp and owners.setdefault(id(gemm.mat_c), index) != index:
+        raise GenerationError(f'cannot fuse gemm lists {owners[id(gemm.mat_c)]} and {index}: '
+                              f'they share a tmp. matrix')
+
+  fused_list = []
+  for gemm_list in list_of_gemm_lists:
+    fused_list.extend(gemm_list)
+  return fused_list
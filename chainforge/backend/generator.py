@@ -1,32 +1,45 @@
-from typing import List, Union, Type
+from typing import List, Dict, Union, Type
 from copy import deepcopy
 import hashlib
+import re
 from chainforge.common import GemmDescr
 from chainforge.common import Context
-from chainforge.common import Addressing, GeneralLexicon
+from chainforge.common import RegisterTile, RegisterTileSelector
+from chainforge.common import Addressing, GeneralLexicon, FloatingPointType
 from chainforge.common.aux import get_extra_offset_name
+from chainforge.common.matrix import Matrix, SparseMatrix
 from .data_types import ShrMemObject, RegMemObject
 from .opt import OptimizationStage
+from .opt.hoist_invariants import get_num_invariant_instrs
 from .scopes import Scopes
 from .symbol import Symbol, SymbolType
-from .instructions import AbstractInstruction
+from .instructions import AbstractInstruction, GetElementPtr, SyncThreads
+from .instructions.allocate import RegisterAlloc, ShrMemAlloc
 from .instructions import GetElementPtrBuilder, GemmBuilder
 from .instructions import ShrMemAllocBuilder, RegistersAllocBuilder
-from .writer import Writer
-from .thread_block_policies import AbstractThreadBlockPolicy, SimpleThreadBlockPolicy
+from .writer import Writer, LaneWriter
+from .thread_block_policies import AbstractThreadBlockPolicy, OccupancyThreadBlockPolicy
+from .cache import KernelCache, CacheEntry
+from .report import KernelReport
+from .occupancy import compute_occupancy
+from .constants import ConstantValues, gen_constant_array
+from .fusion import get_chain_outputs, is_valid_chain_order
 from .exceptions import GenerationError
 
 
 class Generator:
   NAME_ENCODING_LENGTH = 10
+  MAX_32BIT_INDEX = 2**32 - 1
 
   def __init__(self,
                gemm_list: List[GemmDescr],
                context: Context,
-               thread_block_policy_type: Type[AbstractThreadBlockPolicy] = SimpleThreadBlockPolicy):
+               thread_block_policy_type: Type[AbstractThreadBlockPolicy] = OccupancyThreadBlockPolicy,
+               cache: Union[KernelCache, None] = None):
     self.gemm_list: List[GemmDescr] = gemm_list
     self._context: Context = context
     self._thread_block_policy_type: Type[AbstractThreadBlockPolicy] = thread_block_policy_type
+    self._cache: Union[KernelCache, None] = cache
     self._base_kernel_name: Union[str, None] = None
 
     self._kernel = None
@@ -41,11 +54,18 @@ class Generator:
     self._num_threads: int = 0
     self._num_active_threads: int = 0
     self._accumulator_size: int = 0
+    self._register_tiles: List[RegisterTile] = []
 
     self._shr_mem_obj: Union[ShrMemObject, None] = None
     self._register_array_obj: Union[RegMemObject, None] = None
 
     self._ir: List[AbstractInstruction] = []
+    self._shr_mem_sizes: Dict[str, int] = {}
+    self._pass_records: List[Dict[str, Union[str, float, int]]] = []
+    self._thread_block_policy_meta_data: Union[str, None] = None
+    self._persistent_blocks_per_sm: Union[int, None] = None
+    self._constants: Dict[int, ConstantValues] = {}
+    self._chain_order: Union[List[int], None] = None
 
     self._check_consistency_with_user_options()
     self._name_operands(self.gemm_list)
@@ -53,6 +73,54 @@ class Generator:
   def set_kernel_name(self, name):
     self._base_kernel_name = name
 
+  def set_cache(self, cache: Union[KernelCache, None]):
+    self._cache = cache
+
+  def set_constant_values(self, matrix: Matrix, values):
+    """Fixes values of a matrix without addressing at generation time.
+
+    The matrix is not passed to the kernel anymore. A gemm, which takes the matrix as `op2`
+    and has a trivial register tile, embeds non-zero values as immediates. All other accesses
+    read the values from an array in constant memory
+
+    Args:
+      matrix: an input of the gemm list
+      values: a 2D array-like object (e.g., a NumPy array) of the shape `(num_rows, num_cols)`
+    """
+    if self._is_registerd:
+      raise RuntimeError('constant values must be set before the generator is registered')
+
+    if not any([matrix is item for item in self._matrix_list]) or matrix.is_tmp:
+      raise GenerationError(f'matrix {matrix.name} is not an input of the gemm list')
+
+    if any([matrix is output for output in get_chain_outputs(self.gemm_list)]):
+      raise GenerationError(f'matrix {matrix.name} is written by the gemm list and cannot be constant')
+
+    if isinstance(matrix, SparseMatrix):
+      raise GenerationError(f'matrix {matrix.name} is sparse and cannot be constant')
+
+    self._constants[id(matrix)] = ConstantValues(matrix, values)
+
+  def set_chain_order(self, order: Union[List[int], None]):
+    """Sets the order in which gemms are executed by the kernel.
+
+    The order of kernel arguments and the kernel name are still deduced from the gemm list.
+    `None` means the order of the list
+
+    Args:
+      order: a permutation of gemm indices which keeps dependencies between gemms
+    """
+    if self._is_registerd:
+      raise RuntimeError('chain order must be set before the generator is registered')
+
+    if order is not None and not is_valid_chain_order(self.gemm_list, order):
+      raise GenerationError(f'order {order} is not a valid execution order of the gemm list')
+    self._chain_order = None if order is None else list(order)
+
+  def get_constant_values(self) -> Dict[str, List[float]]:
+    """Returns column-major values of constant matrices given by matrix names"""
+    return {constant.matrix.name: constant.get_values() for constant in self._constants.values()}
+
   def register(self):
     self._collect_tmp_matrices()
     self._populate_global_scope()
@@ -64,6 +132,27 @@ class Generator:
     if not self._is_registerd:
       self.register()
 
+    if self._cache is not None:
+      cache_key = self.get_fingerprint()
+      entry = self._cache.get(cache_key)
+      if entry:
+        self._kernel = entry.kernel
+        self._launcher = entry.launcher
+        self._header = entry.header
+        return
+
+    self._build_ir()
+    self._generate_kernel()
+    self._generate_launcher()
+    self._generate_header()
+
+    if self._cache is not None:
+      self._cache.put(cache_key, CacheEntry(kernel=self._kernel,
+                                            launcher=self._launcher,
+                                            header=self._header))
+
+  def _build_ir(self):
+    self._select_register_tiles()
     self._deduce_num_threads()
     self._deduce_accumulator_size()
     self._emit_ir()
@@ -73,17 +162,30 @@ class Generator:
                             num_threads=self._num_threads)
     opt.optimize()
     self._ir = opt.get_instructions()
+    self._shr_mem_sizes = opt.get_shr_mem_sizes()
+    self._pass_records = opt.get_pass_records()
     self._deduce_mults_per_block()
+    self._deduce_persistent_blocks_per_sm()
 
-    self._generate_kernel()
-    self._generate_launcher()
-    self._generate_header()
+  def _ensure_ir(self):
+    """A kernel taken from a cache comes without IR. It is rebuilt on demand (e.g., for reports)"""
+    if self._ir:
+      return
+    if self._kernel is None:
+      raise RuntimeError('generator does not hold any instructions. Call generate first')
+    self._build_ir()
 
   def _generate_kernel(self):
+    if self._is_host():
+      self._generate_host_kernel()
+      return
+
     writer = Writer()
+    self._write_constant_arrays(writer)
     proto = self._generate_kernel_proto()
     with writer.block(f'{proto}'):
       self._write_kernel_meta_data(writer)
+      num_device_scopes = self._open_device_scopes(writer)
 
       vm = self._context.get_vm()
       mapped_keywords = vm.lexic.get_mapped_keywords()
@@ -91,56 +193,330 @@ class Generator:
         mapped_kw, real_kw, type = kw
         writer(f'const {type} {mapped_kw} = {real_kw};')
 
-      writer(f'unsigned {GeneralLexicon.BATCH_ID_NAME} = {self._get_2d_block_id()};')
-      with writer.block(f'if ({self._get_element_size_guard()})'):
-        with writer.block(f'if ({self._get_flag_guard(writer)})'):
-          for instruction in self._ir:
-            if instruction.is_ready():
-              instruction.gen_code(writer)
-            else:
-              raise GenerationError(f'instr is not ready to be generated: {instruction}')
+      is_persistent = self._context.get_user_options().enable_persistent_threads
+      if not is_persistent:
+        writer(f'{self._get_index_type()} {GeneralLexicon.BATCH_ID_NAME} = {self._get_2d_block_id()};')
+
+      # NOTE: all threads of a block load block-shared data. Thus, it happens outside of guards
+      num_prologue_instrs = self._get_num_prologue_instrs()
+      self._write_instrs(writer, self._ir[:num_prologue_instrs])
+      if self._shr_mem_obj.get_block_shared_size():
+        writer(f'{vm.lexic.sync_block_threads};')
+
+      if is_persistent:
+        self._write_persistent_loop(writer, self._ir[num_prologue_instrs:])
+      else:
+        self._write_guarded_instrs(writer, self._ir[num_prologue_instrs:])
+
+      self._close_device_scopes(writer, num_device_scopes)
 
     self._kernel = writer.get_src()
 
+  def _open_device_scopes(self, writer) -> int:
+    """Opens scopes which enclose device code of a queue-based backend (e.g., SYCL).
+
+    Device code is a kernel lambda of a command group. Shr. mem. is allocated by the command
+    group and passed to the lambda as an accessor. Returns num. opened scopes
+    """
+    lexic = self._context.get_vm().lexic
+    command_group = lexic.get_command_group(stream='stream')
+    if command_group is None:
+      return 0
+
+    writer(f'{command_group} {{')
+    writer.mv_right()
+    fp_size = 4 if self._context.fp_type == FloatingPointType.FLOAT else 8
+    for instr in self._ir:
+      if isinstance(instr, ShrMemAlloc):
+        shr_mem_obj = instr.get_dest().obj
+        writer(lexic.get_shr_mem_accessor(name=shr_mem_obj.get_common_name(),
+                                          num_bytes=shr_mem_obj.get_total_size() * fp_size,
+                                          alignment=ShrMemAlloc.ALIGNMENT))
+
+    sub_group_size = self._context.get_vm().hw_descr.vec_unit_length
+    writer(f'{lexic.get_parallel_for(grid="grid", block="block", sub_group_size=sub_group_size)} {{')
+    writer.mv_right()
+    return 2
+
+  def _close_device_scopes(self, writer, num_scopes: int):
+    for _ in range(num_scopes):
+      writer.mv_left()
+      writer('});')
+
+  def _generate_host_kernel(self):
+    """Generates a kernel which runs on the host (i.e., `cpu` backend).
+
+    Host threads share batch elements of a parallel loop. All threads of a GPU block are
+    SIMD lanes of a host thread (see LaneWriter) and compute a single batch element.
+    The loop of a host thread is similar to the loop of a persistent block. Thus, batch-invariant
+    instrs. are executed once per host thread only if persistent threads are enabled,
+    i.e. if the IR is prepared for the reuse of registers and shr. mem.
+    """
+    writer = Writer()
+    self._write_constant_arrays(writer)
+    proto = self._generate_kernel_proto()
+    lexic = self._context.get_vm().lexic
+    with writer.block(f'{proto}'):
+      self._write_kernel_meta_data(writer)
+
+      writer(lexic.parallel_region_kw)
+      with writer.block():
+        lanes = LaneWriter(writer,
+                           lane_idx=lexic.thread_idx_x,
+                           num_lanes=self._num_threads,
+                           fp_as_str=self._context.fp_as_str(),
+                           simd_kw=lexic.simd_loop_kw)
+
+        is_persistent = self._context.get_user_options().enable_persistent_threads
+        num_prologue_instrs = self._get_num_prologue_instrs() if is_persistent else 0
+        self._write_host_instrs(lanes, self._ir[:num_prologue_instrs])
+
+        index_type = self._get_index_type()
+        batch_id = GeneralLexicon.BATCH_ID_NAME
+        writer(lexic.parallel_loop_kw)
+        loop = f'for ({index_type} {batch_id} = 0; {batch_id} < {GeneralLexicon.NUM_ELEMENTS}; ++{batch_id})'
+        with writer.block(loop):
+          with writer.block(f'if ({self._get_flag_guard(writer)})'):
+            self._write_host_instrs(lanes, self._ir[num_prologue_instrs:])
+
+    self._kernel = writer.get_src()
+
+  def _write_host_instrs(self, writer: LaneWriter, instructions):
+    for instruction in instructions:
+      if isinstance(instruction, SyncThreads):
+        # NOTE: lanes execute instructions one after another
+        continue
+
+      if not instruction.is_ready():
+        raise GenerationError(f'instr is not ready to be generated: {instruction}')
+
+      if isinstance(instruction, RegisterAlloc):
+        dest = instruction.get_dest()
+        writer.add_registers(dest.name, dest.obj.size)
+        init_value = instruction.get_init_value()
+        if isinstance(init_value, float):
+          if dest.obj.size == 1:
+            with writer.block():
+              writer(f'{dest.name} = {init_value};')
+          else:
+            with writer.block(f'for (int i = 0; i < {dest.obj.size}; ++i)'):
+              writer(f'{dest.name}[i] = {init_value};')
+      else:
+        instruction.gen_code(writer)
+
+  def _write_constant_arrays(self, writer):
+    lexic = self._context.get_vm().lexic
+    for instr in self._ir:
+      if isinstance(instr, GetElementPtr) and instr.get_constant_name():
+        constant = self._constants[id(instr.get_src().obj)]
+        for line in gen_constant_array(name=instr.get_constant_name(),
+                                       constant=constant,
+                                       fp_type=self._context.fp_type,
+                                       keyword=lexic.constant_mem_kw):
+          writer(line)
+        writer.new_line()
+
+  def _get_constant_name(self, matrix: Matrix) -> Union[str, None]:
+    if id(matrix) not in self._constants:
+      return None
+    return f'{self._base_kernel_name}_{matrix.name}'
+
+  def _get_param_symbols(self) -> List[Symbol]:
+    """Returns symbols of matrices which are passed to the kernel (i.e., except constant ones)"""
+    return [symbol for symbol in self._scopes.get_global_scope().values()
+            if id(symbol.obj) not in self._constants]
+
+  def _get_index_type(self) -> str:
+    """Returns the type of batch ids and extra offsets.
+
+    64-bit indices are used only if the offsets of all strided batches of the declared max.
+    batch size do not fit into 32 bits. Otherwise, a launcher with a declared max. batch size
+    splits larger batches into several launches (see `_get_max_elements_per_launch`)
+    """
+    max_batch_size = self._context.get_user_options().max_batch_size
+    if max_batch_size is None:
+      return 'unsigned'
+
+    max_index = max_batch_size * self._get_max_strided_volume()
+    return 'unsigned' if max_index <= Generator.MAX_32BIT_INDEX else 'size_t'
+
+  def _get_max_strided_volume(self) -> int:
+    volumes = [symbol.obj.get_real_volume() for symbol in self._get_param_symbols()
+               if symbol.obj.addressing == Addressing.STRIDED]
+    return max(volumes, default=1)
+
+  def _get_max_elements_per_launch(self) -> Union[int, None]:
+    """Returns max. num. elements of a launch which can be indexed with 32 bits.
+
+    A launcher moves base pointers (and extra offsets of strided batches) to the first element
+    of each launch. Thus, offsets computed in a kernel never exceed 32 bits. `None` means
+    that all elements are processed by a single launch, i.e., if indices are 64-bit or
+    if no max. batch size is declared (as before, the caller must keep offsets in 32 bits then)
+    """
+    max_batch_size = self._context.get_user_options().max_batch_size
+    if max_batch_size is None or self._get_index_type() != 'unsigned':
+      return None
+
+    # NOTE: a half of the range keeps the grid-stride increment of the persistent loop from wrapping
+    max_elements = Generator.MAX_32BIT_INDEX // self._get_max_strided_volume()
+    return min(max_elements, Generator.MAX_32BIT_INDEX // 2)
+
+  def _get_num_prologue_instrs(self):
+    """Returns num. batch-invariant instrs. which are executed once per block before any guard"""
+    is_persistent = self._context.get_user_options().enable_persistent_threads
+    if is_persistent or self._shr_mem_obj.get_block_shared_size():
+      return get_num_invariant_instrs(self._ir)
+    return 0
+
+  def _write_guarded_instrs(self, writer, instructions):
+    with writer.block(f'if ({self._get_element_size_guard()})'):
+      with writer.block(f'if ({self._get_flag_guard(writer)})'):
+        self._write_instrs(writer, instructions)
+
+  def _write_instrs(self, writer, instructions):
+    for instruction in instructions:
+      if instruction.is_ready():
+        instruction.gen_code(writer)
+      else:
+        raise GenerationError(f'instr is not ready to be generated: {instruction}')
+
+  def _write_persistent_loop(self, writer, instructions):
+    """Loops over batch elements with a grid stride.
+
+    The loop condition is uniform within a block. Thus, all threads of a block reach
+    the barrier at the end of an iteration which protects shr. mem. of the next one
+    """
+    lexic = self._context.get_vm().lexic
+    index_type = self._get_index_type()
+    offset = GeneralLexicon.BATCH_OFFSET_NAME
+    init = f'{index_type} {offset} = {self._get_block_offset()}'
+    condition = f'{offset} < {GeneralLexicon.NUM_ELEMENTS}'
+    increment = f'{offset} += {lexic.block_dim_y} * {lexic.grid_dim_x}'
+    with writer.block(f'for ({init}; {condition}; {increment})'):
+      writer(f'{index_type} {GeneralLexicon.BATCH_ID_NAME} = {lexic.thread_idx_y} + {offset};')
+      self._write_guarded_instrs(writer, instructions)
+      writer(f'{lexic.sync_block_threads};')
+
   def _generate_launcher(self):
+    if self._is_host():
+      self._generate_host_launcher()
+      return
+
     writer = Writer()
     proto = self._generate_launcher_proto(with_defaults=False)
     mults_per_block = self._shr_mem_obj.get_mults_per_block()
     lexic = self._context.get_vm().lexic
+    is_persistent = self._context.get_user_options().enable_persistent_threads
     with writer.block(f'{proto}'):
-      writer(f'{lexic.dim3_type} block({self._num_threads}, {mults_per_block}, 1);')
-      num_blocks = f'({GeneralLexicon.NUM_ELEMENTS} + {mults_per_block} - 1) / {mults_per_block}'
-      writer(f'{lexic.dim3_type} grid({num_blocks}, 1, 1);')
-
-      if_stream_exists = f'({GeneralLexicon.STREAM_PTR_STR} != nullptr)'
-      stream_obj = f'static_cast<{lexic.stream_type}>({GeneralLexicon.STREAM_PTR_STR})'
-      writer(f'{lexic.stream_type} stream = {if_stream_exists} ? {stream_obj} : 0;')
-
-      args = self._generate_kernel_base_args()
-      args = ', '.join(args)
-      kernel_name = f'kernel_{self._base_kernel_name}'
-      call_site = lexic.get_launch_code(func_name=kernel_name,
-                                        grid='grid',
-                                        block='block',
-                                        stream='stream',
-                                        func_params=args)
-      writer(f'{call_site};')
-      writer('CHECK_ERR;')
+      for line in lexic.get_stream_decl('stream', GeneralLexicon.STREAM_PTR_STR):
+        writer(line)
+
+      writer(lexic.get_launch_size_decl('block', self._num_threads, mults_per_block, 1))
+      if is_persistent:
+        for line in lexic.get_num_sms_query('numSms'):
+          writer(line)
+
+      for num_elements, args in self._write_launches(writer):
+        num_blocks = f'({num_elements} + {mults_per_block} - 1) / {mults_per_block}'
+        if is_persistent:
+          writer(f'size_t numBlocks = {num_blocks};')
+          writer(f'size_t maxNumBlocks = {self._persistent_blocks_per_sm} * static_cast<size_t>(numSms);')
+          num_blocks = '(numBlocks < maxNumBlocks) ? numBlocks : maxNumBlocks'
+        writer(lexic.get_launch_size_decl('grid', num_blocks, 1, 1))
+
+        kernel_name = f'kernel_{self._base_kernel_name}'
+        call_site = lexic.get_launch_code(func_name=kernel_name,
+                                          grid='grid',
+                                          block='block',
+                                          stream='stream',
+                                          func_params=', '.join(args))
+        writer(f'{call_site};')
+        if lexic.launch_error_check:
+          writer(f'{lexic.launch_error_check};')
     self._launcher = writer.get_src()
 
+  def _generate_host_launcher(self):
+    writer = Writer()
+    proto = self._generate_launcher_proto(with_defaults=False)
+    lexic = self._context.get_vm().lexic
+    with writer.block(f'{proto}'):
+      # NOTE: the host backend does not use streams. The kernel returns after all elements are computed
+      for _, args in self._write_launches(writer):
+        call_site = lexic.get_launch_code(func_name=f'kernel_{self._base_kernel_name}',
+                                          grid=None,
+                                          block=None,
+                                          stream=None,
+                                          func_params=', '.join(args))
+        writer(f'{call_site};')
+    self._launcher = writer.get_src()
+
+  def _write_launches(self, writer):
+    """Yields num. elements and kernel args of each launch.
+
+    If a batch can exceed the range of 32-bit indices (i.e., if it exceeds the declared
+    max. batch size), launches are written inside of a loop over chunks of the batch
+    """
+    max_elements = self._get_max_elements_per_launch()
+    if max_elements is None:
+      yield GeneralLexicon.NUM_ELEMENTS, self._generate_kernel_base_args()
+      return
+
+    num_elements = GeneralLexicon.NUM_ELEMENTS
+    chunk_offset = 'chunkOffset'
+    loop = f'for (size_t {chunk_offset} = 0; {chunk_offset} < {num_elements}; {chunk_offset} += {max_elements})'
+    with writer.block(loop):
+      remainder = f'{num_elements} - {chunk_offset}'
+      writer(f'size_t chunkSize = ({remainder} < {max_elements}) ? ({remainder}) : {max_elements};')
+      yield 'chunkSize', self._generate_chunk_args(chunk_offset, 'chunkSize')
+
+  def _generate_chunk_args(self, chunk_offset: str, chunk_size: str) -> List[str]:
+    args = self._generate_scalar_param_list(with_types=False)
+    for symbol in self._get_param_symbols():
+      extra_offset = get_extra_offset_name(symbol)
+      if symbol.obj.addressing == Addressing.STRIDED:
+        volume = symbol.obj.get_real_volume()
+        args.extend([f'{symbol.name} + {extra_offset} + {chunk_offset} * {volume}', '0'])
+      elif symbol.obj.addressing == Addressing.PTR_BASED:
+        args.extend([f'{symbol.name} + {chunk_offset}', extra_offset])
+      else:
+        args.extend([symbol.name, extra_offset])
+    args.append(chunk_size)
+
+    flags = GeneralLexicon.FLAGS_NAME
+    args.append(f'({flags} != nullptr) ? ({flags} + {chunk_offset}) : nullptr')
+    return args
+
   def _generate_header(self):
     self._header = f'{self._generate_launcher_proto(with_defaults=True)};\n'
 
+  def _select_register_tiles(self):
+    user_options = self._context.get_user_options()
+    if user_options.enable_register_tiling:
+      selector = RegisterTileSelector(self._context)
+      self._register_tiles = selector.select(self.gemm_list)
+
+      # NOTE: constant `op2` is embedded as immediates and sparse operands are unrolled
+      # only if a thread computes an entire row
+      self._register_tiles = [RegisterTile() if self._requires_trivial_tile(gemm) and not gemm.register_tile
+                              else tile for gemm, tile in zip(self.gemm_list, self._register_tiles)]
+    else:
+      self._register_tiles = [gemm.register_tile if gemm.register_tile else RegisterTile()
+                              for gemm in self.gemm_list]
+
+  def _requires_trivial_tile(self, gemm: GemmDescr) -> bool:
+    is_sparse = any([isinstance(matrix, SparseMatrix) for matrix in [gemm.mat_a, gemm.mat_b]])
+    return is_sparse or id(gemm.mat_b) in self._constants
+
   def _deduce_num_threads(self):
-    for gemm in self.gemm_list:
-      num_threads, num_active_threads = gemm.get_num_threads(self._context)
+    for gemm, tile in zip(self.gemm_list, self._register_tiles):
+      num_threads, num_active_threads = gemm.get_num_threads(self._context, tile)
 
       self._num_threads = max(num_threads, self._num_threads)
       self._num_active_threads = max(num_active_threads, self._num_active_threads)
 
   def _deduce_accumulator_size(self):
-    for gemm in self.gemm_list:
-      local_acc_size = gemm.get_accumulator_size()
+    for gemm, tile in zip(self.gemm_list, self._register_tiles):
+      local_acc_size = gemm.get_accumulator_size(tile)
       self._accumulator_size = max(self._accumulator_size, local_acc_size)
 
   def _emit_ir(self):
@@ -148,7 +524,7 @@ class Generator:
     builder = GetElementPtrBuilder(self._context, self._scopes)
     self._scopes.add_scope()
     for symbol in self._scopes.get_global_scope().values():
-      builder.build(symbol)
+      builder.build(symbol, constant_name=self._get_constant_name(symbol.obj))
       self._ir.extend(builder.get_instructions())
 
     # allocate registers
@@ -169,25 +545,89 @@ class Generator:
                           self._scopes,
                           self._scopes.get_symbol(self._register_array_obj),
                           self._scopes.get_symbol(self._shr_mem_obj),
-                          self._num_threads)
+                          self._num_threads,
+                          constants=self._constants)
 
-    for gemm_descr in self.gemm_list:
+    order = self._chain_order if self._chain_order else range(len(self.gemm_list))
+    for gemm_descr, tile in [(self.gemm_list[index], self._register_tiles[index]) for index in order]:
       builder.build(op1=self._scopes.get_symbol(gemm_descr.mat_a),
                     op2=self._scopes.get_symbol(gemm_descr.mat_b),
                     dest_obj=gemm_descr.mat_c,
-                    descr=gemm_descr)
+                    descr=gemm_descr,
+                    register_tile=tile)
       self._ir.extend(builder.get_instructions())
 
   def _deduce_mults_per_block(self):
+    if self._is_host():
+      # NOTE: a host thread computes a single batch element at a time
+      self._shr_mem_obj.set_mults_per_block(1)
+      return
+
     policy = self._thread_block_policy_type(self._context,
                                             self._shr_mem_obj.get_size_per_mult(),
-                                            self._num_threads)
+                                            self._num_threads,
+                                            block_shared_size=self._shr_mem_obj.get_block_shared_size())
     num_mults_per_block = policy.get_num_mults_per_block()
     self._shr_mem_obj.set_mults_per_block(num_mults_per_block)
+    self._thread_block_policy_meta_data = policy.get_meta_data()
+
+  def _deduce_persistent_blocks_per_sm(self):
+    user_options = self._context.get_user_options()
+    if not user_options.enable_persistent_threads or self._is_host():
+      return
+
+    if user_options.persistent_blocks_per_sm:
+      self._persistent_blocks_per_sm = user_options.persistent_blocks_per_sm
+    else:
+      fp_size = 4 if self._context.fp_type == FloatingPointType.FLOAT else 8
+      num_regs = sum([instr.get_dest().obj.size * (fp_size // 4)
+                      for instr in self._ir if isinstance(instr, RegisterAlloc)])
+      occupancy = compute_occupancy(self._context.get_vm().hw_descr,
+                                    threads_per_block=self._num_threads * self._shr_mem_obj.get_mults_per_block(),
+                                    shr_mem_per_block=self._shr_mem_obj.get_total_size() * fp_size,
+                                    regs_per_thread=num_regs)
+      self._persistent_blocks_per_sm = max(1, occupancy.blocks_per_sm)
+
+  def _is_host(self) -> bool:
+    return self._context.get_vm().hw_descr.backend == 'cpu'
 
   def get_kernel(self):
     return self._kernel
 
+  def get_report(self, peak_flops=None, mem_bandwidth=None) -> KernelReport:
+    self._ensure_ir()
+    return KernelReport(context=self._context,
+                        instructions=self._ir,
+                        gemm_list=self.gemm_list,
+                        shr_mem_obj=self._shr_mem_obj,
+                        num_threads=self._num_threads,
+                        shr_mem_sizes=self._shr_mem_sizes,
+                        name=self._base_kernel_name,
+                        peak_flops=peak_flops,
+                        mem_bandwidth=mem_bandwidth)
+
+  def get_instructions(self) -> List[AbstractInstruction]:
+    if self._kernel is not None:
+      self._ensure_ir()
+    return self._ir
+
+  def get_pass_timings(self) -> Dict[str, float]:
+    """Returns wall time (in seconds) spent in each optimization pass"""
+    timings: Dict[str, float] = {}
+    for record in self._pass_records:
+      timings[record['name']] = timings.get(record['name'], 0.0) + record['time']
+    return timings
+
+  def get_pass_records(self) -> List[Dict[str, Union[str, float, int]]]:
+    """Returns name, wall time (in seconds) and num. instructions after each optimization pass"""
+    return self._pass_records
+
+  def get_num_threads(self) -> int:
+    return self._num_threads
+
+  def get_context(self) -> Context:
+    return self._context
+
   def get_launcher(self):
     return self._launcher
 
@@ -211,6 +651,8 @@ class Generator:
     self._matrix_list = []
     for gemm in gemm_list:
       local_list = [gemm.mat_a, gemm.mat_b, gemm.mat_c]
+      if gemm.epilogue is not None:
+        local_list.extend(gemm.epilogue.get_matrices())
 
       # NOTE: to be on the safe side we init all matrix names with None
       for matrix in local_list:
@@ -231,9 +673,11 @@ class Generator:
 
   def _collect_tmp_matrices(self):
     self._tmp_list = []
+    collected = set()
     for matrix in self._matrix_list:
-      if matrix.is_tmp and matrix not in self._tmp_list:
+      if matrix.is_tmp and id(matrix) not in collected:
         self._tmp_list.append(matrix)
+        collected.add(id(matrix))
 
   def _populate_global_scope(self):
     """
@@ -241,16 +685,18 @@ class Generator:
     :return:
     """
     for matrix in self._matrix_list:
-      if matrix not in self._tmp_list:
+      if not matrix.is_tmp:
         self._scopes.add_to_global(Symbol(obj=matrix,
                                           name=matrix.name,
                                           stype=SymbolType.Batch))
 
-  def _generate_kernel_name(self):
+  def _get_chain_descr(self) -> List[str]:
     global_symbols = self._scopes.get_global_scope().values()
     long_name = []
     for item in global_symbols:
       long_name.append(item.obj.gen_descr())
+      if id(item.obj) in self._constants:
+        long_name.append(self._constants[id(item.obj)].gen_descr())
 
     for gemm in self.gemm_list:
       long_name.extend([
@@ -259,14 +705,78 @@ class Generator:
         str(gemm.trans_a),
         str(gemm.trans_b)
       ])
+      if gemm.epilogue is not None:
+        long_name.append(str(gemm.epilogue))
+    return long_name
 
-    result = hashlib.md5(', '.join(long_name).encode())
+  def _generate_kernel_name(self):
+    result = hashlib.md5(', '.join(self._get_chain_descr()).encode())
     md5encoding = result.hexdigest()
     self._base_kernel_name = f'cf_gemms_{md5encoding[:Generator.NAME_ENCODING_LENGTH]}'
 
   def get_base_name(self):
     return self._base_kernel_name
 
+  def adopt_src(self, generator: 'Generator'):
+    """Takes source code of a generated kernel which differs from this one only in its name.
+
+    Identifiers derived from the kernel name are renamed. The IR is rebuilt on demand
+    (e.g., for reports)
+    """
+    if not self._is_registerd:
+      self.register()
+
+    if generator._kernel is None:
+      raise RuntimeError('given generator has not generated any kernel. Call generate first')
+
+    if generator.get_fingerprint(with_name=False) != self.get_fingerprint(with_name=False):
+      raise ValueError('given generator does not generate the same kernel')
+
+    identifiers = dict(zip(generator._get_named_identifiers(), self._get_named_identifiers()))
+    pattern = re.compile(r'\b(' + '|'.join([re.escape(identifier) for identifier in identifiers]) + r')\b')
+    rename = lambda src: pattern.sub(lambda match: identifiers[match.group(1)], src)
+    self._kernel = rename(generator._kernel)
+    self._launcher = rename(generator._launcher)
+    self._header = rename(generator._header)
+
+  def _get_named_identifiers(self) -> List[str]:
+    """Returns identifiers of the generated source code which are derived from the kernel name"""
+    constants = [self._get_constant_name(constant.matrix) for constant in self._constants.values()]
+    return [f'kernel_{self._base_kernel_name}', f'launcher_{self._base_kernel_name}'] + constants
+
+  def get_fingerprint(self, with_name: bool = True) -> str:
+    """
+    Returns a key which identifies generated source code. In contrast to the kernel name,
+    the key also captures the structure of a chain, tmp. matrices and the generation context
+    :param with_name: if False, kernels which differ only in their names have the same key
+    :return:
+    """
+    if not self._is_registerd:
+      raise RuntimeError('generator is not registered. Call register first.')
+
+    items = self._get_chain_descr()
+    for gemm in self.gemm_list:
+      items.extend([str(gemm),
+                    str(gemm.prefer_align),
+                    str(gemm.is_strict_math()),
+                    str(gemm.register_tile)])
+
+    for matrix in self._tmp_list:
+      items.append(matrix.gen_descr())
+
+    vm = self._context.get_vm()
+    user_options = self._context.get_user_options()
+    if with_name:
+      items.append(f'name: {self._base_kernel_name}')
+    items.extend([f'arch: {vm.hw_descr.model}',
+                  f'backend: {vm.hw_descr.backend}',
+                  f'fp: {self._context.fp_as_str()}',
+                  f'options: {sorted(vars(user_options).items())}',
+                  f'policy: {self._thread_block_policy_type.__name__}'])
+    if self._chain_order is not None:
+      items.append(f'order: {self._chain_order}')
+    return KernelCache.make_key(items)
+
   def _get_scalar_name(self, scalar, default_name):
     scalar_type = type(scalar)
     is_pritable = scalar_type.__str__ is not object.__str__
@@ -277,25 +787,51 @@ class Generator:
     writer('// meta data:')
     glb_matrices = self._scopes.get_global_scope().values()
     for matrix in glb_matrices:
-      writer(f'// {matrix.obj.gen_descr()}')
+      if id(matrix.obj) in self._constants:
+        num_nonzeros = self._constants[id(matrix.obj)].get_num_nonzeros()
+        writer(f'// {matrix.obj.gen_descr()} (constant, num. non-zeros: {num_nonzeros})')
+      else:
+        writer(f'// {matrix.obj.gen_descr()}')
 
     writer.new_line()
     for item in self.gemm_list:
       writer(f'// {item}')
+    if self._chain_order is not None:
+      writer(f'// execution order: {self._chain_order}')
+    writer.new_line()
+
+    if self._thread_block_policy_meta_data:
+      writer(f'// thread-block policy: {self._thread_block_policy_meta_data}')
+      writer.new_line()
+
+    if self._persistent_blocks_per_sm:
+      writer(f'// persistent threads: {self._persistent_blocks_per_sm} blocks per SM')
+      writer.new_line()
+
+    writer(f'// index type: {self._get_index_type()}')
     writer.new_line()
 
   def _generate_scalar_param_list(self, with_types=True):
     scalar_type = self._context.fp_as_str() if with_types else ''
-    last_gemm = self.gemm_list[-1]
-    params = []
-    if not isinstance(last_gemm.alpha, (float, int)):
-      name = self._get_scalar_name(last_gemm.alpha, GeneralLexicon.ALPHA_SYMBOL_NAME)
-      params.append(f'{scalar_type} {name}')
 
-    if not isinstance(last_gemm.beta, (float, int)):
-      name = self._get_scalar_name(last_gemm.beta, GeneralLexicon.BETA_SYMBOL_NAME)
-      params.append(f'{scalar_type} {name}')
+    # NOTE: scalars are applied while storing to glb. mem. A list can contain several
+    # independent chains (see `fuse_gemm_lists`) and, thus, several stores to glb. mem.
+    names = []
+    for gemm in self.gemm_list:
+      if gemm.mat_c.is_tmp:
+        continue
+
+      if not isinstance(gemm.alpha, (float, int)):
+        names.append(self._get_scalar_name(gemm.alpha, GeneralLexicon.ALPHA_SYMBOL_NAME))
 
+      if not isinstance(gemm.beta, (float, int)):
+        names.append(self._get_scalar_name(gemm.beta, GeneralLexicon.BETA_SYMBOL_NAME))
+
+    params = []
+    for name in names:
+      param = f'{scalar_type} {name}'
+      if param not in params:
+        params.append(param)
     return params
 
   def _generate_base_params_list(self, symbol_list, with_types=True, with_defaults=False):
@@ -304,7 +840,7 @@ class Generator:
     for symbol in symbol_list:
       ptr_type = Addressing.addr2ptr_type(symbol.obj.addressing)
       batch_type = f'{fp_as_str}{ptr_type}' if with_types else ''
-      offset_type = 'unsigned' if with_types else ''
+      offset_type = self._get_index_type() if with_types else ''
       params.extend([f'{batch_type} {symbol.name}',
                      f'{offset_type} {get_extra_offset_name(symbol)}'])
 
@@ -317,27 +853,27 @@ class Generator:
     return params
 
   def _generate_kernel_base_args(self):
-    global_symbols = self._scopes.get_global_scope().values()
+    global_symbols = self._get_param_symbols()
     args = self._generate_scalar_param_list(with_types=False)
     args.extend(self._generate_base_params_list(global_symbols, with_types=False))
     return args
 
   def _generate_kernel_proto(self):
-    global_symbols = self._scopes.get_global_scope().values()
-    params = self._generate_scalar_param_list()
+    global_symbols = self._get_param_symbols()
+    lexic = self._context.get_vm().lexic
+    params = lexic.get_kernel_launch_params()
+    params.extend(self._generate_scalar_param_list())
 
     params.extend(self._generate_base_params_list(symbol_list=global_symbols,
                                                   with_types=True))
     params = ', '.join(params)
     total_num_threads_per_block = self._num_threads * self._shr_mem_obj.get_mults_per_block()
 
-    lexic = self._context.get_vm().lexic
-
     launch_bounds = lexic.get_launch_bounds(total_num_threads_per_block)
     return f'{lexic.kernel_type} {launch_bounds} kernel_{self._base_kernel_name}({params})'
 
   def _generate_launcher_proto(self, with_defaults=True):
-    global_symbols = self._scopes.get_global_scope().values()
+    global_symbols = self._get_param_symbols()
     params = self._generate_scalar_param_list()
 
     params.extend(self._generate_base_params_list(symbol_list=global_symbols,
@@ -352,7 +888,7 @@ class Generator:
   def default_generate_call_site(self):
     if not self._is_registerd:
       raise RuntimeError('generator is not registered. Call register first.')
-    symbols = deepcopy(list(self._scopes.get_global_scope().values()))
+    symbols = deepcopy(self._get_param_symbols())
     for item in symbols:
       if item.obj.alias:
         item.name = item.obj.alias
@@ -383,7 +919,7 @@ class Generator:
         args.append(scalar)
 
     # add matrices
-    symbols = list(self._scopes.get_global_scope().values())
+    symbols = self._get_param_symbols()
     for symbol in symbols:
       if symbol.obj.alias in mat_name_map:
         args.append(mat_name_map[symbol.obj.alias])
@@ -405,7 +941,16 @@ class Generator:
 
   def _get_2d_block_id(self):
     lexic = self._context.get_vm().lexic
-    return f'{lexic.thread_idx_y} + {lexic.block_dim_y} * {lexic.block_idx_x}'
+    return f'{lexic.thread_idx_y} + {self._get_block_offset()}'
+
+  def _get_block_offset(self):
+    """Returns the id of the first batch element of a block computed in the index type"""
+    lexic = self._context.get_vm().lexic
+    block_dim = lexic.block_dim_y
+    index_type = self._get_index_type()
+    if index_type != 'unsigned':
+      block_dim = f'static_cast<{index_type}>({block_dim})'
+    return f'{block_dim} * {lexic.block_idx_x}'
 
   def _get_element_size_guard(self):
     return f'{GeneralLexicon.BATCH_ID_NAME} < {GeneralLexicon.NUM_ELEMENTS}'
@@ -1,9 +1,10 @@
 from .abstract_instruction import AbstractInstruction, AbstractShrMemWrite
 from .ptr_manip import GetElementPtr
-from .store import StoreRegToShr, StoreRegToGlb
-from .gemm import Gemm
+from .store import StoreRegToShr, StoreRegToGlb, StoreRegToReg
+from .gemm import Gemm, TiledGemm, RegisterGemm, SparseGemm
 from .clear_registers import ClearRegisters
 from .sync_threads import SyncThreads
+from .async_copy import CommitAsyncCopies, WaitAsyncCopies
 from .builders import GetElementPtrBuilder
 from .builders import ShrMemAllocBuilder, RegistersAllocBuilder
 from .builders import GemmBuilder
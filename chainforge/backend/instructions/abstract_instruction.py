@@ -25,6 +25,10 @@ class AbstractInstruction(ABC):
   def __str__(self) -> str:
     pass
 
+  def get_shr_mem_accesses(self):
+    """Returns a list of `ShrMemAccess` which models shared memory traffic of an instruction"""
+    return []
+
   def gen_mask_threads(self, num_threads) -> str:
     return f'if ({self._vm.lexic.thread_idx_x} < {num_threads})'
 
@@ -53,6 +57,34 @@ class AbstractShrMemWrite(AbstractInstruction):
     self._shr_mem_offset = offset
     self._is_ready = True
 
+  def get_shr_mem_offset(self) -> Union[int, None]:
+    return self._shr_mem_offset
+
+  def get_shm_volume(self) -> int:
+    return self._shm_volume
+
+  def get_vector_width(self) -> int:
+    """Returns num. elements moved by a single shr. mem. access. One means scalar accesses"""
+    return 1
+
+  def get_max_vector_width(self) -> int:
+    """Returns an upper bound of `get_vector_width` over all layouts of `dest`"""
+    return 1
+
+  def is_async(self) -> bool:
+    """Returns True if written data becomes visible only after `WaitAsyncCopies`"""
+    return False
+
+  def is_paddable(self) -> bool:
+    """Returns True if the leading dimension of `dest` can be changed"""
+    return False
+
+  def get_min_dest_lead_dim(self) -> int:
+    raise NotImplementedError()
+
+  def set_dest_lead_dim(self, lead_dim: int) -> None:
+    raise NotImplementedError()
+
   @abstractmethod
   def get_dest(self):
     pass
@@ -36,11 +36,20 @@ class RegisterAlloc(AbstractInstruction):
       result = f'{self._context.fp_as_str()} {self._dest.obj.name}[{self._dest.obj.size}]{init_values_list};'
     writer(result)
 
+  def get_dest(self) -> Symbol:
+    return self._dest
+
+  def get_init_value(self) -> Union[float, None]:
+    return self._init_value
+
   def __str__(self) -> str:
     return f'{self._dest.obj.name} = alloc_regs {self._dest.obj.size};'
 
 
 class ShrMemAlloc(AbstractInstruction):
+  # NOTE: 16 bytes are required by wide (vectorized) loads to shr. mem.
+  ALIGNMENT = 16
+
   def __init__(self,
                context: Context,
                dest: Symbol,
@@ -53,14 +62,17 @@ class ShrMemAlloc(AbstractInstruction):
 
   def gen_code(self, writer: Writer):
     shrmem_obj = self._dest.obj
-    common_shrmem = f'total_{shrmem_obj.name}'
+    common_shrmem = shrmem_obj.get_common_name()
     common_shrmem_size = shrmem_obj.get_total_size()
 
-    alignment = 8
-    type_as_str = f'{self._vm.lexic.shr_mem_kw} __align__({alignment}) {self._fp_as_str}'
-    writer(f'{type_as_str} {common_shrmem}[{common_shrmem_size}];')
+    writer(self._vm.lexic.get_shr_mem_decl(fp_type=self._fp_as_str,
+                                           name=common_shrmem,
+                                           size=common_shrmem_size,
+                                           alignment=ShrMemAlloc.ALIGNMENT))
 
     address = f'{shrmem_obj.get_size_per_mult()} * {self._vm.lexic.thread_idx_y}'
+    if shrmem_obj.get_block_shared_size():
+      address = f'{shrmem_obj.get_block_shared_size()} + {address}'
     writer(f'{self._fp_as_str} * {shrmem_obj.name} = &{common_shrmem}[{address}];')
 
   def is_ready(self):
@@ -70,5 +82,8 @@ class ShrMemAlloc(AbstractInstruction):
     else:
       return False
 
+  def get_dest(self) -> Symbol:
+    return self._dest
+
   def __str__(self):
     return f'{self._dest.name} = alloc_shr [{self._dest.obj.get_total_size_as_str()}];'
@@ -0,0 +1,46 @@
+from typing import List
+from chainforge.common import Context
+from chainforge.backend.symbol import Symbol
+from chainforge.backend.writer import Writer
+from .abstract_instruction import AbstractInstruction
+
+
+class CommitAsyncCopies(AbstractInstruction):
+  """Closes a group of async. copies issued by preceding shr. mem. loaders"""
+
+  def __init__(self, context: Context):
+    super(CommitAsyncCopies, self).__init__(context)
+    self._is_ready = True
+
+  def gen_code(self, writer: Writer):
+    writer(f'{self._vm.lexic.get_async_copy_commit()};')
+
+  def __str__(self) -> str:
+    return 'async_commit;'
+
+
+class WaitAsyncCopies(AbstractInstruction):
+  """Waits until at most `num_pending` most recent groups of async. copies are in flight.
+
+  Note, a thread waits only for its own copies. Data becomes visible to other threads of
+  a mult. after the next SyncThreads
+  """
+
+  def __init__(self, context: Context, num_pending: int, dests: List[Symbol]):
+    super(WaitAsyncCopies, self).__init__(context)
+    self._num_pending: int = num_pending
+    self._dests: List[Symbol] = dests
+    self._is_ready = True
+
+  def get_num_pending(self) -> int:
+    return self._num_pending
+
+  def get_dests(self) -> List[Symbol]:
+    """Returns shr. mem. symbols which are completely written after the instruction"""
+    return self._dests
+
+  def gen_code(self, writer: Writer):
+    writer(f'{self._vm.lexic.get_async_copy_wait(self._num_pending)};')
+
+  def __str__(self) -> str:
+    return f'async_wait {self._num_pending};'
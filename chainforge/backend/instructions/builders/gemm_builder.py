@@ -1,16 +1,18 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Union
 from chainforge.common import Context, VM
 from chainforge.backend.scopes import Scopes
 from chainforge.backend.symbol import Symbol, SymbolType
-from chainforge.backend.instructions import Gemm
+from chainforge.backend.instructions import Gemm, TiledGemm, SparseGemm
 from chainforge.backend.instructions.loaders import shm_mem_loader_factory, AbstractShrMemLoader
 from chainforge.backend.instructions.loaders import ShrMemLoaderType
 from chainforge.backend.instructions import ClearRegisters
 from chainforge.backend.instructions import StoreRegToGlb, StoreRegToShr
 from chainforge.backend.instructions import SyncThreads
-from chainforge.common.matrix import Matrix
-from chainforge.backend.exceptions import InternalError
+from chainforge.common.matrix import Matrix, SparseMatrix
+from chainforge.backend.exceptions import InternalError, GenerationError
+from chainforge.backend.constants import ConstantValues
 from chainforge.common.descriptions import GemmDescr
+from chainforge.common.tiling import RegisterTile
 from .allocator_builder import AbstractBuilder
 
 
@@ -20,11 +22,13 @@ class GemmBuilder(AbstractBuilder):
                scopes: Scopes,
                register_array: Symbol,
                shr_mem: Symbol,
-               num_threads: int):
+               num_threads: int,
+               constants: Union[Dict[int, ConstantValues], None] = None):
     super(GemmBuilder, self).__init__(context, scopes)
     self._dest_regs = register_array
     self._shr_mem = shr_mem
     self._num_threads = num_threads
+    self._constants: Dict[int, ConstantValues] = constants if constants else {}
 
     self._counter = 0
     self._loaders_cache: Dict[Symbol, AbstractShrMemLoader] = {}
@@ -33,17 +37,24 @@ class GemmBuilder(AbstractBuilder):
     self._op2 = None
     self._dest_obj = None
     self._descr = None
+    self._register_tile = None
 
     self._mem_region_a = None
     self._mem_region_b = None
 
-  def build(self, op1: Symbol, op2: Symbol, dest_obj: Matrix, descr: GemmDescr):
+  def build(self,
+            op1: Symbol,
+            op2: Symbol,
+            dest_obj: Matrix,
+            descr: GemmDescr,
+            register_tile: Union[RegisterTile, None] = None):
     self._reset()
 
     self._op1 = op1
     self._op2 = op2
     self._dest_obj = dest_obj
     self._descr = descr
+    self._register_tile = register_tile if register_tile else RegisterTile()
 
     self._mem_region_a = None
     self._mem_region_b = None
@@ -98,7 +109,11 @@ class GemmBuilder(AbstractBuilder):
       raise InternalError(f'gemm-builder: op1 ({self._op1.name}) must be either in shr or glb mem.')
 
   def _make_load_op2(self):
-    if self._op2.stype == SymbolType.Global:
+    if self._op2.stype == SymbolType.Global and self._get_op2_values() is not None:
+      # Note: values of a constant operand are embedded into the gemm. Thus, there is nothing to load
+      self._mem_region_b = self._op2
+
+    elif self._op2.stype == SymbolType.Global:
       self._mem_region_b, load_op2 = self._make_loader_and_symbol(self._op2, self._descr.trans_b)
       self._loaders_cache[self._mem_region_b] = load_op2
       self._instructions.append(load_op2)
@@ -122,35 +137,83 @@ class GemmBuilder(AbstractBuilder):
                                      load_and_transpose=is_transpose)
     return shr_mem_region, load_op
 
+  def _get_op2_values(self) -> Union[ConstantValues, None]:
+    """Returns values of `op2` if they can be used as immediates"""
+    return self._get_constant_values(self._op2)
+
+  def _get_constant_values(self, operand: Symbol) -> Union[ConstantValues, None]:
+    if operand.stype != SymbolType.Global or not self._register_tile.is_trivial(self._descr.get_n()):
+      return None
+    return self._constants.get(id(operand.obj), None)
+
   def _check_register_array(self):
     if self._dest_regs.stype != SymbolType.Register:
       raise InternalError('gemm-builder: reg_array must be in registers')
 
   def _make_gemm(self):
-    self._instructions.append(Gemm(context=self._context,
-                                   trans_a=self._descr.trans_a,
-                                   trans_b=self._descr.trans_b,
-                                   op1=self._mem_region_a,
-                                   op2=self._mem_region_b,
-                                   dest=self._dest_regs,
-                                   prefer_align=self._descr.prefer_align))
+    if self._is_sparse():
+      gemm = self._make_sparse_gemm()
+    elif self._register_tile.is_trivial(self._descr.get_n()):
+      gemm = Gemm(context=self._context,
+                  trans_a=self._descr.trans_a,
+                  trans_b=self._descr.trans_b,
+                  op1=self._mem_region_a,
+                  op2=self._mem_region_b,
+                  dest=self._dest_regs,
+                  prefer_align=self._descr.prefer_align,
+                  op1_values=self._get_constant_values(self._mem_region_a),
+                  op2_values=self._get_op2_values())
+    else:
+      gemm = TiledGemm(context=self._context,
+                       trans_a=self._descr.trans_a,
+                       trans_b=self._descr.trans_b,
+                       op1=self._mem_region_a,
+                       op2=self._mem_region_b,
+                       dest=self._dest_regs,
+                       prefer_align=self._descr.prefer_align,
+                       register_tile=self._register_tile,
+                       num_threads=self._num_threads)
+    self._instructions.append(gemm)
+
+  def _is_sparse(self) -> bool:
+    return any([isinstance(region.obj, SparseMatrix) for region in [self._mem_region_a, self._mem_region_b]])
+
+  def _make_sparse_gemm(self) -> SparseGemm:
+    if isinstance(self._mem_region_a.obj, SparseMatrix) and self._descr.trans_a:
+      raise GenerationError(f'gemm-builder: sparse `op1` ({self._op1.name}) cannot be transposed')
+
+    if not self._register_tile.is_trivial(self._descr.get_n()):
+      raise GenerationError(f'gemm-builder: a gemm with sparse operands requires a trivial register tile, '
+                            f'given: {self._register_tile}')
+
+    return SparseGemm(context=self._context,
+                      trans_a=self._descr.trans_a,
+                      trans_b=self._descr.trans_b,
+                      op1=self._mem_region_a,
+                      op2=self._mem_region_b,
+                      dest=self._dest_regs)
 
   def _make_store(self):
     if self._dest_obj in self._scopes:
       dest_symbol = self._scopes.get_symbol(self._dest_obj)
       if dest_symbol.stype == SymbolType.SharedMem:
+        if self._descr.epilogue is not None:
+          raise InternalError(f'gemm-builder: an epilogue requires `res` ({dest_symbol.name}) in glb. mem.')
         self._instructions.append(StoreRegToShr(context=self._context,
                                                 src=self._dest_regs,
                                                 dest=dest_symbol,
                                                 shr_mem=self._shr_mem,
-                                                num_threads=self._num_threads))
+                                                num_threads=self._num_threads,
+                                                register_tile=self._register_tile))
       elif dest_symbol.stype == SymbolType.Global:
         self._instructions.append(StoreRegToGlb(context=self._context,
                                                 src=self._dest_regs,
                                                 dest=dest_symbol,
                                                 alpha=self._descr.alpha,
                                                 beta=self._descr.beta,
-                                                num_threads=self._num_threads))
+                                                num_threads=self._num_threads,
+                                                register_tile=self._register_tile,
+                                                **self._get_epilogue_operands()))
       else:
         raise InternalError(f'gemm-builder: `res` must be either in shr. or glb. mem., given: {dest_symbol.stype}')
     else:
@@ -165,7 +228,25 @@ class GemmBuilder(AbstractBuilder):
                                               src=self._dest_regs,
                                               dest=dest_symbol,
                                               shr_mem=self._shr_mem,
-                                              num_threads=self._num_threads))
+                                              num_threads=self._num_threads,
+                                              register_tile=self._register_tile))
+
+  def _get_epilogue_operands(self):
+    epilogue = self._descr.epilogue
+    if epilogue is None:
+      return {}
+
+    scale = None if epilogue.scale is None else self._get_glb_symbol(epilogue.scale)
+    return {'scale': scale,
+            'addends': [self._get_glb_symbol(matrix) for matrix in epilogue.addends],
+            'outputs': [(self._get_glb_symbol(matrix), beta) for matrix, beta in epilogue.outputs]}
+
+  def _get_glb_symbol(self, matrix: Matrix) -> Symbol:
+    symbol = self._scopes.get_symbol(matrix)
+    if symbol.stype == SymbolType.SharedMem and symbol in self._loaders_cache:
+      # NOTE: epilogue operands are accessed in glb. mem. even if they have been loaded to shr. mem.
+      symbol = self._loaders_cache[symbol].get_src()
+    return symbol
 
   def _clear_registers(self):
     self._instructions.append(ClearRegisters(context=self._context, src=self._dest_regs))
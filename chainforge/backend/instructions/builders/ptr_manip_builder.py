@@ -1,3 +1,4 @@
+from typing import Union
 from chainforge.common import Context, VM
 from chainforge.backend.scopes import Scopes, Symbol
 from chainforge.common.matrix import Matrix
@@ -11,7 +12,7 @@ class GetElementPtrBuilder(AbstractBuilder):
   def __init__(self, context: Context, scopes: Scopes):
     super(GetElementPtrBuilder, self).__init__(context, scopes)
 
-  def build(self, src: Symbol):
+  def build(self, src: Symbol, constant_name: Union[str, None] = None):
     self._reset()
     if src.stype != SymbolType.Batch:
       raise InternalError("src operand is not in a batch")
@@ -24,5 +25,5 @@ class GetElementPtrBuilder(AbstractBuilder):
                   obj=src.obj)
 
     self._scopes.add_symbol(dest)
-    self._instructions.append(GetElementPtr(self._context, src, dest))
+    self._instructions.append(GetElementPtr(self._context, src, dest, constant_name))
     src.add_user(self)
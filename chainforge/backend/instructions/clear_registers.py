@@ -27,5 +27,8 @@ class ClearRegisters(AbstractInstruction):
       fp_prefix = 'f' if self._context.fp_type == FloatingPointType.FLOAT else ''
       writer(f'{self._src.name}[i] = 0.0{fp_prefix};')
 
+  def get_src(self) -> Symbol:
+    return self._src
+
   def __str__(self) -> str:
     return f'clear_regs {self._src.name}[{self._src.obj.size}];'
@@ -1,13 +1,24 @@
+from typing import Union
 from chainforge.common import Context
-from chainforge.common.matrix import Matrix
+from chainforge.common.matrix import Matrix, SparseMatrix
+from chainforge.common.tiling import RegisterTile
 from chainforge.backend.symbol import Symbol, SymbolType, DataView
+from chainforge.backend.data_types import ShrMemAccess
 from chainforge.backend.exceptions import InternalError, GenerationError
 from chainforge.backend.writer import Writer
+from chainforge.backend.constants import ConstantValues, gen_fp_literal
 from .abstract_instruction import AbstractInstruction
+from .store import snapshot_symbol
 from copy import deepcopy
 
 
 class Gemm(AbstractInstruction):
+  """Each thread accumulates a row of results in registers.
+
+  Values of constant operands can be given at generation time. In this case, the loop along `k`
+  is fully unrolled. Iterations are skipped if the corresponding column of `op1` or row of `op2`
+  is zero. Non-zero elements of `op2` are embedded into the code as immediates
+  """
   def __init__(self,
                context: Context,
                trans_a: bool,
@@ -15,12 +26,16 @@ class Gemm(AbstractInstruction):
                op1: Symbol,
                op2: Symbol,
                dest: Symbol,
-               prefer_align: bool):
+               prefer_align: bool,
+               op1_values: Union[ConstantValues, None] = None,
+               op2_values: Union[ConstantValues, None] = None):
     super(Gemm, self).__init__(context)
     self._trans_a = trans_a
     self._trans_b = trans_b
     self._op1 = op1
     self._op2 = op2
+    self._op1_values = op1_values
+    self._op2_values = op2_values
     self._prefer_align = prefer_align
     self._is_ready = True
     self._user_options = context.get_user_options()
@@ -32,11 +47,10 @@ class Gemm(AbstractInstruction):
     else:
       self._dest = dest
 
-    if not isinstance(self._op1.obj, Matrix):
-       raise InternalError('gemm: op1 is not a matrix')
-
-    if not isinstance(self._op2.obj, Matrix):
-      raise InternalError('gemm: op2 is not a matrix')
+    self._check_operands()
+    for operand, values in [(op1, op1_values), (op2, op2_values)]:
+      if values is not None and operand.stype != SymbolType.Global:
+        raise InternalError(f'gemm: constant operand ({operand.name}) must be in glb. mem.')
 
     op1.add_user(self)
     op2.add_user(self)
@@ -44,6 +58,13 @@ class Gemm(AbstractInstruction):
 
     self._analyze()
 
+  def _check_operands(self):
+    if not isinstance(self._op1.obj, Matrix):
+       raise InternalError('gemm: op1 is not a matrix')
+
+    if not isinstance(self._op2.obj, Matrix):
+      raise InternalError('gemm: op2 is not a matrix')
+
   def _analyze(self):
     self._op1_view = self._op1.data_view
     self._op2_view = self._op2.data_view
@@ -95,14 +116,21 @@ class Gemm(AbstractInstruction):
 
     with writer.block(self.gen_mask_threads(self._op1_view.get_dim_size(0))):
       k_range = self._op1_view.get_dim_size(1)
+      if self._op1_values is not None or self._op2_values is not None:
+        self._gen_unrolled_loop(writer, k_range)
+        return
+
       writer.insert_pragma_unroll()
       with writer.block(f'for (int k = 0; k < {k_range}; ++k)'):
-        address = self._op1_view.get_address(row_idx=self._vm.lexic.thread_idx_x, column_idx='k')
-        writer(f'{self._fp_as_str} value = {self._op1.name}[{address}];')
+        writer(f'{self._fp_as_str} value = {self._get_op1_element(k="k")};')
 
         writer.new_line()
         self._gen_inner_loop(writer, op1_element='value', k='k')
 
+  def _get_op1_element(self, k):
+    address = self._op1_view.get_address(row_idx=self._vm.lexic.thread_idx_x, column_idx=k)
+    return f'{self._op1.name}[{address}]'
+
   def _gen_inner_loop(self, writer, op1_element, k):
     writer.insert_pragma_unroll()
     with writer.block(f'for (int n = 0; n < {self._n_range}; ++n)'):
@@ -114,6 +142,54 @@ class Gemm(AbstractInstruction):
       dest_address = '' if self._dest.obj.size == 1 else '[n]'
       writer(f'{self._dest.name}{dest_address} += {op1_element} * {self._op2.name}[{address}];')
 
+  def _gen_unrolled_loop(self, writer, k_range):
+    for k in self._get_used_k(k_range):
+      with writer.block():
+        if self._op2_values is None:
+          writer(f'const int k = {k};')
+          writer(f'{self._fp_as_str} value = {self._get_op1_element(k="k")};')
+          self._gen_inner_loop(writer, op1_element='value', k='k')
+          continue
+
+        writer(f'const {self._fp_as_str} value = {self._get_op1_element(k=k)};')
+        for n, coefficient in self._get_op2_terms(k):
+          dest = self._dest.name if self._dest.obj.size == 1 else f'{self._dest.name}[{n}]'
+          if coefficient == 1.0:
+            writer(f'{dest} += value;')
+          elif coefficient == -1.0:
+            writer(f'{dest} -= value;')
+          else:
+            writer(f'{dest} += value * {gen_fp_literal(coefficient, self._context.fp_type)};')
+
+  def _get_used_k(self, k_range):
+    """Returns iterations along `k` which contribute to the result"""
+    used = []
+    for k in range(k_range):
+      if self._op1_values is not None:
+        m_range = self._op1_view.get_dim_size(0)
+        column = [self._op1_values.get_value(self._op1_view.get_element_address(row, k))
+                  for row in range(m_range)]
+        if not any(column):
+          continue
+
+      if self._op2_values is not None and not self._get_op2_terms(k):
+        continue
+      used.append(k)
+    return used
+
+  def _get_op2_terms(self, k):
+    """Returns non-zero elements of a row of op2, i.e. pairs of `n` and a value"""
+    terms = []
+    for n in range(self._n_range):
+      if self._is_layout_as_requested:
+        address = self._op2.data_view.get_element_address(k, n)
+      else:
+        address = self._op2.data_view.get_element_address(n, k)
+      value = self._op2_values.get_value(address)
+      if value != 0.0:
+        terms.append((n, value))
+    return terms
+
   def _check(self):
     view_op1 = self._op1.data_view
     view_op2 = self._op2.data_view
@@ -144,7 +220,14 @@ class Gemm(AbstractInstruction):
         raise GenerationError(f'gemm: mismatch of contraction length '
                               f'k_range_op1( {k_range_op1} ) != k_range_op2( {k_range_op2} )')
 
-    op2_columns = view_op2.get_dim_size(1)
+    self._check_register_size()
+
+  def _check_register_size(self):
+    # NOTE: op2 in glb. mem. (e.g., constant) keeps its layout even if it is transposed by the gemm
+    if self._op2.stype == SymbolType.Global:
+      op2_columns = self._n_range
+    else:
+      op2_columns = self._op2.data_view.get_dim_size(1)
     if op2_columns > self._dest.obj.size:
       msg = f'{op2_columns} > {self._dest.obj.size}'
       raise InternalError(f'gemm: contraction length is bigger than reg. size i.e, {msg}')
@@ -155,5 +238,416 @@ class Gemm(AbstractInstruction):
   def get_op2(self):
     return self._op2
 
+  def get_op1_values(self) -> Union[ConstantValues, None]:
+    return self._op1_values
+
+  def get_op2_values(self) -> Union[ConstantValues, None]:
+    return self._op2_values
+
+  def replace_operand(self, old: Symbol, new: Symbol) -> None:
+    """Replaces an operand with a symbol which has the same data view (e.g., an identical copy)"""
+    if self._op1 is old:
+      self._op1 = new
+      if not self._prefer_align:
+        self._op1_view = new.data_view
+    if self._op2 is old:
+      self._op2 = new
+      self._op2_view = new.data_view
+    old.remove_user(self)
+    new.add_user(self)
+
+  def get_dest(self):
+    return self._dest
+
+  def get_op1_view(self):
+    return self._op1_view
+
+  def get_n_range(self):
+    return self._n_range
+
+  def get_register_tile(self) -> RegisterTile:
+    return RegisterTile()
+
+  def get_num_operand_loads(self):
+    m_range, k_range = self._op1_view.get_dim_size(0), self._op1_view.get_dim_size(1)
+    if self._op1_values is not None or self._op2_values is not None:
+      k_range = len(self._get_used_k(k_range))
+    op2_loads = 0 if self._op2_values is not None else m_range * k_range * self._n_range
+    return m_range * k_range, op2_loads
+
+  def get_num_issued_flops(self):
+    m_range, k_range = self._op1_view.get_dim_size(0), self._op1_view.get_dim_size(1)
+    if self._op2_values is not None:
+      return 2 * m_range * sum([len(self._get_op2_terms(k)) for k in self._get_used_k(k_range)])
+    if self._op1_values is not None:
+      k_range = len(self._get_used_k(k_range))
+    return 2 * m_range * k_range * self._n_range
+
+  def is_prefer_align(self):
+    return self._prefer_align
+
+  def is_trans_a(self):
+    return self._trans_a
+
+  def is_trans_b(self):
+    return self._trans_b
+
+  def get_shr_mem_accesses(self):
+    # NOTE: all iterations along `k` access memory banks in the same way
+    tile = self.get_register_tile()
+    m_range = self._op1_view.get_dim_size(0)
+    num_cols = tile.get_cols_per_thread(self._n_range)
+    num_row_groups = tile.get_num_row_groups(m_range)
+    num_active_threads = tile.get_num_active_threads(m_range, self._n_range)
+
+    accesses = []
+    if self._op1.stype == SymbolType.SharedMem:
+      requests = []
+      for row_id in range(tile.rows_per_thread):
+        request = []
+        for tid in range(num_active_threads):
+          row = tid % num_row_groups + row_id * num_row_groups
+          is_active = row < m_range
+          request.append(self._op1_view.get_element_address(row, 0) if is_active else None)
+        requests.append(request)
+      accesses.append(ShrMemAccess(self._op1, is_write=False, requests=requests))
+
+    if self._op2.stype == SymbolType.SharedMem:
+      requests = []
+      op2_view = self._op2.data_view
+      for col_id in range(num_cols):
+        request = []
+        for tid in range(num_active_threads):
+          column = (tid // num_row_groups) * num_cols + col_id
+          if column < self._n_range:
+            if self._is_layout_as_requested:
+              request.append(op2_view.get_element_address(0, column))
+            else:
+              request.append(op2_view.get_element_address(column, 0))
+          else:
+            request.append(None)
+        requests.append(request)
+        if tile.is_trivial(self._n_range):
+          # NOTE: all threads read the same element. Thus, it is enough to model a single column
+          break
+      accesses.append(ShrMemAccess(self._op2, is_write=False, requests=requests))
+    return accesses
+
+  def is_op2_layout_as_requested(self):
+    return self._is_layout_as_requested
+
+  def __str__(self):
+    suffix = ', imm' if self._op2_values is not None else ''
+    return f'{self._dest.name} = gemm {self._op1.name}, {self._op2.name}{suffix};'
+
+
+class TiledGemm(Gemm):
+  """Each thread accumulates a tile of `rows x cols` results in registers.
+
+  Rows of a thread are strided by the num. row groups to keep accesses to `op1` coalesced.
+  Columns of a thread are contiguous. Thus, an element of `op2` is reused for all rows
+  of a tile, and an element of `op1` - for all columns.
+  """
+  def __init__(self,
+               context: Context,
+               trans_a: bool,
+               trans_b: bool,
+               op1: Symbol,
+               op2: Symbol,
+               dest: Symbol,
+               prefer_align: bool,
+               register_tile: RegisterTile,
+               num_threads: int):
+    self._register_tile: RegisterTile = register_tile
+    self._num_threads: int = num_threads
+    super(TiledGemm, self).__init__(context, trans_a, trans_b, op1, op2, dest, prefer_align)
+
+  def gen_code(self, writer: Writer):
+    self._check()
+    m_range = self._op1_view.get_dim_size(0)
+    k_range = self._op1_view.get_dim_size(1)
+    num_rows = self._register_tile.rows_per_thread
+    num_cols = self._register_tile.get_cols_per_thread(self._n_range)
+    num_row_groups = self._register_tile.get_num_row_groups(m_range)
+    num_active_threads = self._register_tile.get_num_active_threads(m_range, self._n_range)
+
+    writer.new_line()
+    writer(f'// gemm: {self._op1.name} x {self._op2.name}')
+    writer(f'// register tile: {num_rows}x{num_cols}')
+    if self._gemm_meta_data:
+      writer(f'// meta: {self._gemm_meta_data}')
+
+    with writer.block(self.gen_mask_threads(num_active_threads)):
+      tid = self._vm.lexic.thread_idx_x
+      writer(f'const int rowGroup = {tid} % {num_row_groups};')
+      writer(f'const int colGroup = {tid} / {num_row_groups};')
+
+      writer.insert_pragma_unroll()
+      with writer.block(f'for (int k = 0; k < {k_range}; ++k)'):
+        writer(f'{self._fp_as_str} values[{num_rows}];')
+        writer.insert_pragma_unroll()
+        with writer.block(f'for (int r = 0; r < {num_rows}; ++r)'):
+          writer(f'const int row = rowGroup + r * {num_row_groups};')
+          address = self._op1_view.get_address(row_idx='row', column_idx='k')
+          value = f'{self._op1.name}[{address}]'
+          if num_rows * num_row_groups != m_range:
+            value = f'(row < {m_range}) ? {value} : {self._fp_as_str}(0)'
+          writer(f'values[r] = {value};')
+
+        writer.new_line()
+        writer.insert_pragma_unroll()
+        with writer.block(f'for (int c = 0; c < {num_cols}; ++c)'):
+          writer(f'const int n = colGroup * {num_cols} + c;')
+          if num_cols * self._register_tile.get_num_col_groups(self._n_range) != self._n_range:
+            with writer.block(f'if (n < {self._n_range})'):
+              self._gen_tile_update(writer, num_rows, num_cols)
+          else:
+            self._gen_tile_update(writer, num_rows, num_cols)
+
+  def _gen_tile_update(self, writer, num_rows, num_cols):
+    if self._is_layout_as_requested:
+      address = self._op2.data_view.get_address(row_idx='k', column_idx='n')
+    else:
+      address = self._op2.data_view.get_address(row_idx='n', column_idx='k')
+    writer(f'const {self._fp_as_str} value = {self._op2.name}[{address}];')
+
+    writer.insert_pragma_unroll()
+    with writer.block(f'for (int r = 0; r < {num_rows}; ++r)'):
+      dest_address = '' if self._dest.obj.size == 1 else f'[r * {num_cols} + c]'
+      writer(f'{self._dest.name}{dest_address} += values[r] * value;')
+
+  def _check(self):
+    super(TiledGemm, self)._check()
+    m_range = self._op1_view.get_dim_size(0)
+    num_active_threads = self._register_tile.get_num_active_threads(m_range, self._n_range)
+    if num_active_threads > self._num_threads:
+      raise GenerationError(f'gemm: register tile {self._register_tile} requires '
+                            f'{num_active_threads} threads, but only {self._num_threads} are available')
+
+  def _check_register_size(self):
+    acc_size = self._register_tile.get_accumulator_size(self._n_range)
+    if acc_size > self._dest.obj.size:
+      msg = f'{acc_size} > {self._dest.obj.size}'
+      raise InternalError(f'gemm: register tile is bigger than reg. size i.e, {msg}')
+
+  def get_register_tile(self) -> RegisterTile:
+    return self._register_tile
+
+  def get_num_operand_loads(self):
+    m_range, k_range = self._op1_view.get_dim_size(0), self._op1_view.get_dim_size(1)
+    num_row_groups = self._register_tile.get_num_row_groups(m_range)
+    num_col_groups = self._register_tile.get_num_col_groups(self._n_range)
+    return m_range * k_range * num_col_groups, num_row_groups * k_range * self._n_range
+
+  def __str__(self):
+    return f'{self._dest.name} = gemm {self._op1.name}, {self._op2.name}, tile {self._register_tile};'
+
+
+class RegisterGemm(Gemm):
+  """Gemm which takes `op1` from registers.
+
+  A thread holds the row of `op1` which has the same index as the thread, i.e. `op1[k]` of
+  a thread is the element `(threadIdx.x, k)`. This is the layout of results of a gemm with a
+  trivial register tile. The data view of `op1` is captured at construction because the register
+  array is reused by other instructions
+  """
+  def __init__(self,
+               context: Context,
+               trans_b: bool,
+               op1: Symbol,
+               op2: Symbol,
+               dest: Symbol,
+               prefer_align: bool,
+               op2_values: Union[ConstantValues, None] = None):
+    super(RegisterGemm, self).__init__(context,
+                                       trans_a=False,
+                                       trans_b=trans_b,
+                                       op1=snapshot_symbol(op1),
+                                       op2=op2,
+                                       dest=dest,
+                                       prefer_align=prefer_align,
+                                       op2_values=op2_values)
+
+  def _check_operands(self):
+    if self._op1.stype != SymbolType.Register:
+      raise InternalError(f'gemm: op1 ({self._op1.name}) is not in registers')
+
+    if self._op1.data_view.get_offset():
+      raise InternalError(f'gemm: rows of op1 ({self._op1.name}) must start at the first thread')
+
+    if not isinstance(self._op2.obj, Matrix):
+      raise InternalError('gemm: op2 is not a matrix')
+
+  def _get_op1_element(self, k):
+    return self._op1.name if self._op1.obj.size == 1 else f'{self._op1.name}[{k}]'
+
+  def _check_register_size(self):
+    super(RegisterGemm, self)._check_register_size()
+    k_range = self._op1_view.get_dim_size(1)
+    if k_range > self._op1.obj.size:
+      raise InternalError(f'gemm: op1 ({self._op1.name}) holds {self._op1.obj.size} registers, '
+                          f'but the contraction length is {k_range}')
+
+  def __str__(self):
+    suffix = ', imm' if self._op2_values is not None else ''
+    return f'{self._dest.name} = gemm_r {self._op1.name}, {self._op2.name}{suffix};'
+
+
+class SparseGemm(Gemm):
+  """Gemm with at least one sparse operand (see `SparseMatrix`).
+
+  The loop along `k` is fully unrolled. Non-zeros are addressed by their positions in the packed
+  storage. Thus, only non-zeros of `op2` are loaded and multiplied, and iterations without
+  contributions are skipped. Non-zeros of a column of a sparse `op1` form runs of consecutive
+  rows which are stored contiguously. A thread reads its element from the run which covers
+  its row, and takes zero otherwise
+  """
+  def __init__(self,
+               context: Context,
+               trans_a: bool,
+               trans_b: bool,
+               op1: Symbol,
+               op2: Symbol,
+               dest: Symbol):
+    super(SparseGemm, self).__init__(context,
+                                     trans_a=trans_a,
+                                     trans_b=trans_b,
+                                     op1=op1,
+                                     op2=op2,
+                                     dest=dest,
+                                     prefer_align=False)
+
+    if trans_a and self._is_sparse(op1):
+      raise InternalError(f'gemm: sparse op1 ({op1.name}) cannot be transposed')
+
+  def _is_sparse(self, operand: Symbol) -> bool:
+    return isinstance(operand.obj, SparseMatrix)
+
+  def gen_code(self, writer: Writer):
+    self._check()
+    writer.new_line()
+    writer(f'// gemm: {self._op1.name} x {self._op2.name}')
+    sparse_operands = [operand.name for operand in [self._op1, self._op2] if self._is_sparse(operand)]
+    writer(f'// sparse operands: {", ".join(sparse_operands)}')
+
+    with writer.block(self.gen_mask_threads(self._op1_view.get_dim_size(0))):
+      for k in self._get_used_k(self._op1_view.get_dim_size(1)):
+        with writer.block():
+          self._gen_op1_value(writer, k)
+          for n, address in self._get_op2_addresses(k):
+            dest = self._dest.name if self._dest.obj.size == 1 else f'{self._dest.name}[{n}]'
+            writer(f'{dest} += value * {self._op2.name}[{address}];')
+
+  def _gen_op1_value(self, writer, k):
+    if not self._is_sparse(self._op1):
+      writer(f'const {self._fp_as_str} value = {self._get_op1_element(k=k)};')
+      return
+
+    tid = self._vm.lexic.thread_idx_x
+    runs = self._get_op1_runs(k)
+    if len(runs) == 1 and runs[0][:2] == (0, self._op1_view.get_dim_size(0)):
+      writer(f'const {self._fp_as_str} value = {self._op1.name}[{self._gen_index(tid, runs[0][2])}];')
+      return
+
+    writer(f'{self._fp_as_str} value = {self._fp_as_str}(0);')
+    for index, (begin, end, shift) in enumerate(runs):
+      condition = f'{tid} < {end}' if begin == 0 else f'({tid} >= {begin}) && ({tid} < {end})'
+      statement = 'if' if index == 0 else 'else if'
+      writer(f'{statement} ({condition}) value = {self._op1.name}[{self._gen_index(tid, shift)}];')
+
+  def _gen_index(self, tid, shift):
+    if shift == 0:
+      return tid
+    return f'{tid} + {shift}' if shift > 0 else f'{tid} - {-shift}'
+
+  def _get_op1_runs(self, k):
+    """Returns runs of non-zeros of a column of op1 as `(begin, end, shift)`.
+
+    Rows `[begin, end)` of the run are stored at `row + shift` in the packed storage
+    """
+    bbox = self._op1_view.get_bbox()
+    runs = []
+    for row in range(self._op1_view.get_dim_size(0)):
+      index = self._op1.obj.get_nz_index(bbox[0] + row, bbox[1] + k)
+      if index is None:
+        continue
+
+      shift = index - row
+      if runs and runs[-1][1] == row and runs[-1][2] == shift:
+        runs[-1] = (runs[-1][0], row + 1, shift)
+      else:
+        runs.append((row, row + 1, shift))
+    return runs
+
+  def _get_op2_addresses(self, k):
+    """Returns pairs of `n` and an address of non-zero elements of a row of op2"""
+    op2_view = self._op2.data_view
+    bbox = op2_view.get_bbox()
+    addresses = []
+    for n in range(self._n_range):
+      row, column = (k, n) if self._is_layout_as_requested else (n, k)
+      if self._is_sparse(self._op2):
+        address = self._op2.obj.get_nz_index(bbox[0] + row, bbox[1] + column)
+      else:
+        address = op2_view.get_element_address(row, column)
+
+      if address is not None:
+        addresses.append((n, address))
+    return addresses
+
+  def _get_used_k(self, k_range):
+    used = []
+    for k in range(k_range):
+      if self._is_sparse(self._op1) and not self._get_op1_runs(k):
+        continue
+      if self._get_op2_addresses(k):
+        used.append(k)
+    return used
+
+  def _check_register_size(self):
+    # NOTE: a sparse op2 keeps its layout in shr. mem. even if it is transposed by the gemm
+    if self._n_range > self._dest.obj.size:
+      msg = f'{self._n_range} > {self._dest.obj.size}'
+      raise InternalError(f'gemm: contraction length is bigger than reg. size i.e, {msg}')
+
+  def get_num_operand_loads(self):
+    m_range = self._op1_view.get_dim_size(0)
+    op1_loads, op2_loads = 0, 0
+    for k in self._get_used_k(self._op1_view.get_dim_size(1)):
+      if self._is_sparse(self._op1):
+        op1_loads += sum([end - begin for begin, end, _ in self._get_op1_runs(k)])
+      else:
+        op1_loads += m_range
+      op2_loads += m_range * len(self._get_op2_addresses(k))
+    return op1_loads, op2_loads
+
+  def get_num_issued_flops(self):
+    m_range = self._op1_view.get_dim_size(0)
+    num_terms = sum([len(self._get_op2_addresses(k)) for k in self._get_used_k(self._op1_view.get_dim_size(1))])
+    return 2 * m_range * num_terms
+
+  def get_shr_mem_accesses(self):
+    # NOTE: the first used iteration along `k` is modeled
+    used_k = self._get_used_k(self._op1_view.get_dim_size(1))
+    if not used_k:
+      return []
+
+    m_range = self._op1_view.get_dim_size(0)
+    accesses = []
+    if self._op1.stype == SymbolType.SharedMem:
+      request = [None] * m_range
+      if self._is_sparse(self._op1):
+        for begin, end, shift in self._get_op1_runs(used_k[0]):
+          request[begin:end] = [row + shift for row in range(begin, end)]
+      else:
+        request = [self._op1_view.get_element_address(row, used_k[0]) for row in range(m_range)]
+      accesses.append(ShrMemAccess(self._op1, is_write=False, requests=[request]))
+
+    if self._op2.stype == SymbolType.SharedMem:
+      # NOTE: all threads read the same element
+      _, address = self._get_op2_addresses(used_k[0])[0]
+      accesses.append(ShrMemAccess(self._op2, is_write=False, requests=[[address] * m_range]))
+    return accesses
+
   def __str__(self):
-    return f'{self._dest.name} = gemm {self._op1.name}, {self._op2.name};'
+    return f'{self._dest.name} = gemm_sp {self._op1.name}, {self._op2.name};'
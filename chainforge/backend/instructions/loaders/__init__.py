@@ -1,8 +1,9 @@
 from math import ceil
-from chainforge.common.matrix import Matrix
-from chainforge.backend.exceptions import InternalError
+from chainforge.common.matrix import Matrix, SparseMatrix
+from chainforge.backend.exceptions import InternalError, GenerationError
 from .shr_mem_loader import ExtendedPatchLoader, ExactPatchLoader
 from .shr_trans_mem_loader import ExtendedTransposePatchLoader, ExactTransposePatchLoader
+from .sparse_loader import SparsePatchLoader
 from .abstract_loader import ShrMemLoaderType, AbstractShrMemLoader
 
 
@@ -17,11 +18,22 @@ def shm_mem_loader_factory(context, dest, src, shr_mem, num_threads, load_and_tr
   if not isinstance(src.obj, Matrix):
     raise InternalError('shm-factory: `src` operand is not a matrix')
 
-  # Use an extended loader if the tail of a active threads can touch the next column
-  # Otherwise, use an exact one
-  num_loads_per_column = ceil(src.obj.get_actual_num_rows() / num_threads) * num_threads
+  if isinstance(src.obj, SparseMatrix):
+    # NOTE: gemms read non-zeros in their packed order. Thus, there is nothing to transpose
+    return SparsePatchLoader(**params)
 
-  if src.obj.num_rows > num_loads_per_column:
+  loader_kind = context.get_user_options().shr_mem_loader
+  if loader_kind == 'auto':
+    # Use an extended loader if the tail of a active threads can touch the next column
+    # Otherwise, use an exact one
+    num_loads_per_column = ceil(src.obj.get_actual_num_rows() / num_threads) * num_threads
+    is_exact = src.obj.num_rows > num_loads_per_column
+  elif loader_kind in ['exact', 'extended']:
+    is_exact = loader_kind == 'exact'
+  else:
+    raise GenerationError(f'unknown shr. mem. loader `{loader_kind}`, expected: auto, exact or extended')
+
+  if is_exact:
     if load_and_transpose:
       return ExactTransposePatchLoader(**params)
     else:
@@ -2,6 +2,7 @@ from abc import abstractmethod
 from typing import Union
 import enum
 from chainforge.common.matrix import Matrix
+from chainforge.common.basic_types import FloatingPointType
 from chainforge.backend.instructions import AbstractShrMemWrite
 from chainforge.backend.symbol import SymbolType, Symbol
 from chainforge.backend.exceptions import InternalError
@@ -13,6 +14,9 @@ class ShrMemLoaderType(enum.Enum):
 
 
 class AbstractShrMemLoader(AbstractShrMemWrite):
+  MAX_VECTOR_SIZE = 16
+  MAX_MODELED_HOPS = 8
+
   def __init__(self, **kwargs):
     super(AbstractShrMemLoader, self).__init__(kwargs['context'])
     self._dest = kwargs['dest']
@@ -21,6 +25,8 @@ class AbstractShrMemLoader(AbstractShrMemWrite):
     self._num_threads = kwargs['num_threads']
     self._load_and_transpose = kwargs['load_and_transpose']
     self._manual_unroll_threshold = 4
+    self._is_async: bool = False
+    self._is_block_shared: bool = False
 
     self._check()
     self._lid_dim: Union[int, None] = None
@@ -35,7 +41,8 @@ class AbstractShrMemLoader(AbstractShrMemWrite):
   def gen_code(self, writer) -> None:
     writer.new_line()
     lhs = f'{self._fp_as_str}* {self._vm.lexic.restrict_kw} {self._dest.name}'
-    rhs = f'{self._shr_mem.name}[{self._shr_mem_offset}]'
+    shr_mem_name = self._shr_mem.obj.get_common_name() if self._is_block_shared else self._shr_mem.name
+    rhs = f'{shr_mem_name}[{self._shr_mem_offset}]'
     writer(f'{lhs} = &{rhs};')
 
   def get_src(self) -> Symbol:
@@ -44,10 +51,84 @@ class AbstractShrMemLoader(AbstractShrMemWrite):
   def get_dest(self) -> Symbol:
     return self._dest
 
+  def get_shr_mem(self) -> Symbol:
+    return self._shr_mem
+
   @abstractmethod
   def get_loader_type(self) -> ShrMemLoaderType:
     pass
 
+  def is_async(self) -> bool:
+    return self._is_async
+
+  def set_async(self, is_async: bool) -> None:
+    self._is_async = is_async
+
+  def is_block_shared(self) -> bool:
+    """Returns True if `dest` is shared by all mults of a block and loaded by all their threads"""
+    return self._is_block_shared
+
+  def set_block_shared(self, is_block_shared: bool) -> None:
+    self._is_block_shared = is_block_shared
+
+  def _get_tid(self) -> str:
+    if self._is_block_shared:
+      return f'({self._vm.lexic.thread_idx_x} + {self._num_threads} * {self._vm.lexic.thread_idx_y})'
+    return self._vm.lexic.thread_idx_x
+
+  def _get_num_copy_threads(self) -> int:
+    if self._is_block_shared:
+      return self._num_threads * self._shr_mem.obj.get_mults_per_block()
+    return self._num_threads
+
+  def _get_fp_size(self) -> int:
+    return 4 if self._context.fp_type == FloatingPointType.FLOAT else 8
+
+  def _gen_copy(self, writer, lhs, rhs, num_bytes) -> None:
+    if self._is_async:
+      writer(f'{self._vm.lexic.get_async_copy(f"&{lhs}", f"&{rhs}", num_bytes)};')
+    else:
+      writer(f'{lhs} = {rhs};')
+
+  def _get_modeled_hops(self, num_items):
+    """Returns thread-to-item mapping of the first hops which are used to model bank conflicts"""
+    num_hops = min((num_items + self._num_threads - 1) // self._num_threads,
+                   AbstractShrMemLoader.MAX_MODELED_HOPS)
+    hops = []
+    for hop in range(num_hops):
+      items = [tid + hop * self._num_threads for tid in range(self._num_threads)]
+      hops.append([item if item < num_items else None for item in items])
+    return hops
+
+  def _get_max_vector_width(self) -> int:
+    if not self._context.get_user_options().enable_vectorized_loads:
+      return 1
+
+    fp_size = self._get_fp_size()
+    vector_size = min(AbstractShrMemLoader.MAX_VECTOR_SIZE, self._vm.hw_descr.mem_access_align_size)
+    return max(vector_size // fp_size, 1)
+
+  def _is_shr_mem_aligned(self, width) -> bool:
+    # NOTE: the layout of shr. mem. may not be known yet (e.g., during padding).
+    # In this case, the check is optimistic
+    if self._is_block_shared:
+      return self._shr_mem_offset % width == 0
+
+    shr_mem_obj = self._shr_mem.obj
+    size_per_mult = shr_mem_obj.get_size_per_mult()
+    is_mult_aligned = shr_mem_obj.get_mults_per_block() == 1 or not size_per_mult or size_per_mult % width == 0
+    return self._shr_mem_offset % width == 0 and is_mult_aligned
+
+  def _gen_alignment_check(self, width) -> str:
+    fp_size = self._get_fp_size()
+    return f'(reinterpret_cast<size_t>({self._src.name}) % {width * fp_size}) == 0'
+
+  def _gen_vector_ptrs(self, writer, width, src_offset) -> None:
+    vector_type = self._vm.lexic.get_vector_type(self._fp_as_str, width)
+    src_address = f'&{self._src.name}[{src_offset}]' if src_offset else self._src.name
+    writer(f'const {vector_type}* srcVec = reinterpret_cast<const {vector_type}*>({src_address});')
+    writer(f'{vector_type}* destVec = reinterpret_cast<{vector_type}*>({self._dest.name});')
+
   def _check(self) -> None:
     if self._src.stype != SymbolType.Global:
       raise InternalError('shr-load: `src` operand is not in global mem.')
@@ -1,5 +1,6 @@
 from chainforge.backend.writer import Writer
 from chainforge.backend.symbol import DataView
+from chainforge.backend.data_types import ShrMemAccess
 from .abstract_loader import AbstractShrMemLoader, ShrMemLoaderType
 
 
@@ -29,30 +30,85 @@ class ExtendedPatchLoader(AbstractShrMemLoader):
   def get_loader_type(self):
     return ShrMemLoaderType.NOT_TRANSPOSED
 
+  def get_vector_width(self) -> int:
+    width = self._get_max_vector_width()
+    src_offset = self._src.data_view.get_offset()
+    if width > 1 and src_offset % width == 0 and self._is_shr_mem_aligned(width):
+      return width
+    return 1
+
+  def get_shr_mem_accesses(self):
+    width = self.get_vector_width()
+    requests = self._get_modeled_hops(self._shm_volume // width)
+    requests = [[None if item is None else item * width for item in hop] for hop in requests]
+    return [ShrMemAccess(self._dest, is_write=True, requests=requests, elems_per_thread=width)]
+
   def gen_code(self, writer: Writer):
     super(ExtendedPatchLoader, self).gen_code(writer)
-    writer(f'// loading {self._src.name} to {self._dest.name}: # no trans, extended')
+    width = self.get_vector_width()
+    if width > 1:
+      writer(f'// loading {self._src.name} to {self._dest.name}: # no trans, extended, vectorized')
+      with writer.block(f'if ({self._gen_alignment_check(width)})'):
+        self._gen_vector_loads(writer, width)
+      with writer.block('else'):
+        self._gen_scalar_loads(writer)
+    else:
+      writer(f'// loading {self._src.name} to {self._dest.name}: # no trans, extended')
+      self._gen_scalar_loads(writer)
+
+  def _gen_vector_loads(self, writer: Writer, width: int):
+    tid, num_threads = self._get_tid(), self._get_num_copy_threads()
+    src_offset = self._src.data_view.get_offset()
+    self._gen_vector_ptrs(writer, width, src_offset)
+    vector_bytes = width * self._get_fp_size()
 
+    num_vectors = self._shm_volume // width
+    num_hops = int(num_vectors / num_threads)
+    if num_hops > 0:
+      writer.insert_pragma_unroll()
+      with writer.block(f'for (int i = 0; i < {num_hops}; ++i)'):
+        index = f'{tid} + i * {num_threads}'
+        self._gen_copy(writer, f'destVec[{index}]', f'srcVec[{index}]', vector_bytes)
+
+    if (num_vectors % num_threads) != 0:
+      residue = num_vectors - num_hops * num_threads
+      with writer.block(f'if ({tid} < {residue})'):
+        index = f'{tid} + {num_hops * num_threads}'
+        self._gen_copy(writer, f'destVec[{index}]', f'srcVec[{index}]', vector_bytes)
+
+    # the scalar tail which does not fill an entire vector
+    tail = self._shm_volume % width
+    if tail:
+      src_offset = f'{src_offset} + ' if src_offset else ''
+      with writer.block(f'if ({tid} < {tail})'):
+        index = f'{tid} + {num_vectors * width}'
+        self._gen_copy(writer,
+                       f'{self._dest.name}[{index}]',
+                       f'{self._src.name}[{src_offset}{index}]',
+                       self._get_fp_size())
+
+  def _gen_scalar_loads(self, writer: Writer):
+    tid, num_threads = self._get_tid(), self._get_num_copy_threads()
     src_offset = self._src.data_view.get_offset()
     src_offset = f'{src_offset} + ' if src_offset else ''
 
-    num_hops = int(self._shm_volume / self._num_threads)
+    num_hops = int(self._shm_volume / num_threads)
     if num_hops > 0:
       writer.insert_pragma_unroll()
       with writer.block(f'for (int i = 0; i < {num_hops}; ++i)'):
-        index = f'{self._vm.lexic.thread_idx_x} + i * {self._num_threads}'
+        index = f'{tid} + i * {num_threads}'
         lhs = f'{self._dest.name}[{index}]'
         rhs = f'{self._src.name}[{src_offset}{index}]'
-        writer(f'{lhs} = {rhs};')
+        self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
     # the last hop to fill shared mem with data
-    if (self._shm_volume % self._num_threads) != 0:
-      residue = self._shm_volume - num_hops * self._num_threads
-      with writer.block(f'if ({self._vm.lexic.thread_idx_x} < {residue})'):
-        index = f'{self._vm.lexic.thread_idx_x} + {num_hops * self._num_threads}'
+    if (self._shm_volume % num_threads) != 0:
+      residue = self._shm_volume - num_hops * num_threads
+      with writer.block(f'if ({tid} < {residue})'):
+        index = f'{tid} + {num_hops * num_threads}'
         lhs = f'{self._dest.name}[{index}]'
         rhs = f'{self._src.name}[{src_offset}{index}]'
-        writer(f'{lhs} = {rhs};')
+        self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
   def __str__(self):
     return f'{self._dest.name} = load_g2s_ext {self._shr_mem.name}, {self._src.name};'
@@ -77,41 +133,119 @@ class ExactPatchLoader(AbstractShrMemLoader):
   def get_loader_type(self):
     return ShrMemLoaderType.NOT_TRANSPOSED
 
+  def get_vector_width(self) -> int:
+    width = self._get_max_vector_width()
+    src_view, dest_view = self._src.data_view, self._dest.data_view
+    is_src_aligned = src_view.get_offset() % width == 0 and src_view.get_lead_dim() % width == 0
+    is_dest_aligned = dest_view.get_lead_dim() % width == 0 and src_view.get_dim_size(0) % width == 0
+    if width > 1 and is_src_aligned and is_dest_aligned and self._is_shr_mem_aligned(width):
+      return width
+    return 1
+
+  def get_max_vector_width(self) -> int:
+    return self._get_max_vector_width()
+
+  def is_paddable(self) -> bool:
+    return True
+
+  def get_min_dest_lead_dim(self) -> int:
+    return self._src.data_view.get_dim_size(0)
+
+  def set_dest_lead_dim(self, lead_dim: int) -> None:
+    self._dest.data_view.reset_lead_dim(lead_dim)
+    self._shm_volume = self._dest.data_view.get_volume()
+
+  def get_shr_mem_accesses(self):
+    width = self.get_vector_width()
+    num_rows = self._src.data_view.get_dim_size(0)
+    if width > 1:
+      # NOTE: vectors of all columns are distributed among threads at once
+      num_rows //= width
+      lead_dim = self._dest.data_view.get_lead_dim()
+      hops = self._get_modeled_hops(num_rows * self._src.data_view.get_dim_size(1))
+      requests = [[None if item is None else (item % num_rows) * width + (item // num_rows) * lead_dim
+                   for item in hop] for hop in hops]
+    else:
+      # NOTE: columns are loaded one after another. Thus, it is enough to model the first one
+      requests = self._get_modeled_hops(num_rows)
+    return [ShrMemAccess(self._dest, is_write=True, requests=requests, elems_per_thread=width)]
+
   def gen_code(self, writer: Writer):
     super(ExactPatchLoader, self).gen_code(writer)
-    writer(f'// loading {self._src.name} to {self._dest.name}: # no trans, exact.')
+    width = self.get_vector_width()
+    if width > 1:
+      writer(f'// loading {self._src.name} to {self._dest.name}: # no trans, exact, vectorized')
+      with writer.block(f'if ({self._gen_alignment_check(width)})'):
+        self._gen_vector_loads(writer, width)
+      with writer.block('else'):
+        self._gen_scalar_loads(writer)
+    else:
+      writer(f'// loading {self._src.name} to {self._dest.name}: # no trans, exact.')
+      self._gen_scalar_loads(writer)
+
+  def _gen_vector_loads(self, writer: Writer, width: int):
+    tid, num_threads = self._get_tid(), self._get_num_copy_threads()
+    self._gen_vector_ptrs(writer, width, self._src.data_view.get_offset())
+
+    # NOTE: num. rows and both leading dimensions are multiples of `width`. Thus, columns do not
+    # have tails and all vectors of a patch are distributed among threads at once
+    vectors_per_column = self._src.data_view.get_dim_size(0) // width
+    dest_lead_dim = self._dest.data_view.get_lead_dim() // width
+    src_lead_dim = self._src.data_view.get_lead_dim() // width
+    num_vectors = vectors_per_column * self._src.data_view.get_dim_size(1)
+
+    def gen_copy(index):
+      writer(f'const int column = ({index}) / {vectors_per_column};')
+      writer(f'const int row = ({index}) % {vectors_per_column};')
+      self._gen_copy(writer,
+                     f'destVec[row + column * {dest_lead_dim}]',
+                     f'srcVec[row + column * {src_lead_dim}]',
+                     width * self._get_fp_size())
+
+    num_hops = int(num_vectors / num_threads)
+    if num_hops > 0:
+      writer.insert_pragma_unroll()
+      with writer.block(f'for (int i = 0; i < {num_hops}; ++i)'):
+        gen_copy(f'{tid} + i * {num_threads}')
+
+    if (num_vectors % num_threads) != 0:
+      residue = num_vectors - num_hops * num_threads
+      with writer.block(f'if ({tid} < {residue})'):
+        gen_copy(f'{tid} + {num_hops * num_threads}')
 
+  def _gen_scalar_loads(self, writer: Writer):
+    tid, num_threads = self._get_tid(), self._get_num_copy_threads()
     num_data_rows = self._src.data_view.get_dim_size(0)
     src_offset = self._src.data_view.get_offset()
     src_offset = f'{src_offset} + ' if src_offset else ''
 
     with writer.block(f'for (int i = 0; i < {self._src.data_view.get_dim_size(1)}; ++i)'):
 
-      num_hops = int(num_data_rows / self._num_threads)
+      num_hops = int(num_data_rows / num_threads)
       if num_hops > 0:
 
         writer.insert_pragma_unroll()
         with writer.block(f'for (int counter = 0; counter < {num_hops}; ++counter)'):
-          shr_mem_index = f'{self._vm.lexic.thread_idx_x} + '
-          shr_mem_index += f'counter * {self._num_threads} + i * {self._dest.data_view.get_lead_dim()}'
+          shr_mem_index = f'{tid} + '
+          shr_mem_index += f'counter * {num_threads} + i * {self._dest.data_view.get_lead_dim()}'
           lhs = f'{self._dest.name}[{shr_mem_index}]'
 
-          glob_mem_index = f'{self._vm.lexic.thread_idx_x} + '
-          glob_mem_index += f'counter * {self._num_threads} + i * {self._src.data_view.get_lead_dim()}'
+          glob_mem_index = f'{tid} + '
+          glob_mem_index += f'counter * {num_threads} + i * {self._src.data_view.get_lead_dim()}'
           rhs = f'{self._src.name}[{src_offset}{glob_mem_index}]'
-          writer(f'{lhs} = {rhs};')
+          self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
       # the last hop to fill shared mem with data
-      if (num_data_rows % self._num_threads) != 0:
-        residue = num_data_rows - num_hops * self._num_threads
-        with writer.block(f'if ({self._vm.lexic.thread_idx_x} < {residue})'):
-          finial_offset = num_hops * self._num_threads
-          shr_mem_index = f'{self._vm.lexic.thread_idx_x} + {finial_offset} + i * {self._dest.data_view.get_lead_dim()}'
+      if (num_data_rows % num_threads) != 0:
+        residue = num_data_rows - num_hops * num_threads
+        with writer.block(f'if ({tid} < {residue})'):
+          finial_offset = num_hops * num_threads
+          shr_mem_index = f'{tid} + {finial_offset} + i * {self._dest.data_view.get_lead_dim()}'
           lhs = f'{self._dest.name}[{shr_mem_index}]'
 
-          glb_mem_index = f'{self._vm.lexic.thread_idx_x} + {finial_offset} + i * {self._src.data_view.get_lead_dim()}'
+          glb_mem_index = f'{tid} + {finial_offset} + i * {self._src.data_view.get_lead_dim()}'
           rhs = f'{self._src.name}[{src_offset}{glb_mem_index}]'
-          writer(f'{lhs} = {rhs};')
+          self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
   def __str__(self):
     return f'{self._dest.name} = load_g2s {self._shr_mem.name}, {self._src.name};'
@@ -1,30 +1,36 @@
 from chainforge.backend.writer import Writer
 from chainforge.backend.symbol import DataView
+from chainforge.backend.data_types import ShrMemAccess
 from .abstract_loader import AbstractShrMemLoader, ShrMemLoaderType
 
 
-def _find_next_prime(number):
-  factor = 2
-  return _find_prime_in_range(number, factor * number)
+class AbstractTransposePatchLoader(AbstractShrMemLoader):
+  """Transposes a matrix on the fly. The leading dimension of `dest` is padded
+  by the bank conflict optimizer (see ShrMemPaddingOpt)
+  """
+
+  def is_paddable(self) -> bool:
+    return True
 
+  def get_min_dest_lead_dim(self) -> int:
+    return self._matrix.get_actual_num_cols()
 
-def _find_prime_in_range(source, target):
-  for number in range(source, target):
-    for i in range(2, number):
-      if number % i == 0:
-        break
-    else:
-      return number
+  def set_dest_lead_dim(self, lead_dim: int) -> None:
+    self._dest.data_view.reset_lead_dim(lead_dim)
+    self._shm_volume = lead_dim * self._matrix.num_rows
 
+  def get_loader_type(self):
+    return ShrMemLoaderType.TRANSPOSED
 
-class ExtendedTransposePatchLoader(AbstractShrMemLoader):
+
+class ExtendedTransposePatchLoader(AbstractTransposePatchLoader):
   """A strategy which loads an entire matrix into shared memory and transposes it on the fly
   """
 
   def __init__(self, **kwargs):
     super(ExtendedTransposePatchLoader, self).__init__(**kwargs)
 
-    optimal_num_cols = _find_next_prime(self._matrix.get_actual_num_cols())
+    optimal_num_cols = self.get_min_dest_lead_dim()
     self._shm_volume = optimal_num_cols * self._matrix.num_rows
 
     src_bbox = self._matrix.get_bbox()
@@ -39,14 +45,21 @@ class ExtendedTransposePatchLoader(AbstractShrMemLoader):
                                     is_transposed=True,
                                     bbox=dest_bbox)
 
-  def get_loader_type(self):
-    return ShrMemLoaderType.TRANSPOSED
+  def get_shr_mem_accesses(self):
+    src_lead_dim = self._src.data_view.get_lead_dim()
+    dest_lead_dim = self._dest.data_view.get_lead_dim()
+    requests = []
+    for hop in self._get_modeled_hops(self._shm_volume):
+      requests.append([None if index is None else (index % src_lead_dim) * dest_lead_dim + index // src_lead_dim
+                       for index in hop])
+    return [ShrMemAccess(self._dest, is_write=True, requests=requests)]
 
   def gen_code(self, writer: Writer):
+    tid, num_threads = self._get_tid(), self._get_num_copy_threads()
     super(ExtendedTransposePatchLoader, self).gen_code(writer)
     writer(f'// loading {self._src.name} to {self._dest.name}: # trans, extended')
 
-    num_hops = int(self._shm_volume / self._num_threads)
+    num_hops = int(self._shm_volume / num_threads)
     tmp_var = 'index'
 
     src_lead_dim = self._src.data_view.get_lead_dim()
@@ -62,42 +75,42 @@ class ExtendedTransposePatchLoader(AbstractShrMemLoader):
         # for-block: main part
         writer.insert_pragma_unroll()
         with writer.block(f'for (int i = 0; i < {num_hops}; ++i)'):
-          writer(f'{tmp_var} = {self._vm.lexic.thread_idx_x} + i * {self._num_threads};')
+          writer(f'{tmp_var} = {tid} + i * {num_threads};')
 
           shr_mem_index = f'({tmp_var} % {src_lead_dim}) * {dest_lead_dim}'
           shr_mem_index += f' + {tmp_var} / {src_lead_dim}'
           lhs = f'{self._dest.name}[{shr_mem_index}]'
 
-          glb_mem_index = f'{self._vm.lexic.thread_idx_x} + i * {self._num_threads}'
+          glb_mem_index = f'{tid} + i * {num_threads}'
           rhs = f'{self._src.name}[{src_offset}{glb_mem_index}]'
-          writer(f'{lhs} = {rhs};')
+          self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
       # if-block: residual part
-      if (self._shm_volume % self._num_threads) != 0:
-        residual = self._shm_volume - num_hops * self._num_threads
-        with writer.block(f'if ({self._vm.lexic.thread_idx_x} < {residual})'):
-          writer(f'{tmp_var} = {self._vm.lexic.thread_idx_x} + {num_hops * self._num_threads};')
+      if (self._shm_volume % num_threads) != 0:
+        residual = self._shm_volume - num_hops * num_threads
+        with writer.block(f'if ({tid} < {residual})'):
+          writer(f'{tmp_var} = {tid} + {num_hops * num_threads};')
 
           shr_mem_index = f'({tmp_var} % {src_lead_dim}) * {dest_lead_dim}'
           shr_mem_index += f' + {tmp_var} / {src_lead_dim}'
           lhs = f'{self._dest.name}[{shr_mem_index}]'
 
-          glb_mem_index = f'{self._vm.lexic.thread_idx_x} + {num_hops * self._num_threads}'
+          glb_mem_index = f'{tid} + {num_hops * num_threads}'
           rhs = f'{self._src.name}[{src_offset}{glb_mem_index}]'
-          writer(f'{lhs} = {rhs};')
+          self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
   def __str__(self):
     return f'{self._dest.name} = load_g2s_trans_ext {self._shr_mem.name}, {self._src.name};'
 
 
-class ExactTransposePatchLoader(AbstractShrMemLoader):
+class ExactTransposePatchLoader(AbstractTransposePatchLoader):
   """A strategy which loads only a necessary part of a matrix into shared memory
   and transposes it on the fly
   """
 
   def __init__(self, **kwargs):
     super(ExactTransposePatchLoader, self).__init__(**kwargs)
-    optimal_num_cols = _find_next_prime(self._matrix.get_actual_num_cols())
+    optimal_num_cols = self.get_min_dest_lead_dim()
     self._shm_volume = optimal_num_cols * self._matrix.num_rows
 
     src_bbox = self._matrix.get_bbox()
@@ -112,11 +125,17 @@ class ExactTransposePatchLoader(AbstractShrMemLoader):
                                     is_transposed=True,
                                     bbox=dest_bbox)
 
-
-  def get_loader_type(self):
-    return ShrMemLoaderType.TRANSPOSED
+  def get_shr_mem_accesses(self):
+    # NOTE: columns are loaded one after another. Thus, it is enough to model the first one
+    num_rows = self._src.data_view.get_dim_size(0)
+    dest_lead_dim = self._dest.data_view.get_lead_dim()
+    requests = []
+    for hop in self._get_modeled_hops(num_rows):
+      requests.append([None if index is None else index * dest_lead_dim for index in hop])
+    return [ShrMemAccess(self._dest, is_write=True, requests=requests)]
 
   def gen_code(self, writer: Writer):
+    tid, num_threads = self._get_tid(), self._get_num_copy_threads()
     super(ExactTransposePatchLoader, self).gen_code(writer)
     writer(f'// loading {self._src.name} to {self._dest.name}: # trans, exact')
 
@@ -128,13 +147,13 @@ class ExactTransposePatchLoader(AbstractShrMemLoader):
     src_offset = f'{src_offset} + ' if src_offset else ''
 
     with writer.block(f'for (int i = 0; i < {src_view.get_dim_size(1)}; ++i)'):
-      num_hops = int(src_view.get_dim_size(0) / self._num_threads)
+      num_hops = int(src_view.get_dim_size(0) / num_threads)
       if num_hops > 0:
 
         # for-block: main part
         writer.insert_pragma_unroll()
         with writer.block(f'for (int counter = 0; counter < {num_hops}; ++counter)'):
-          thread_idx = f'{self._vm.lexic.thread_idx_x} + counter * {self._num_threads}'
+          thread_idx = f'{tid} + counter * {num_threads}'
           writer(f'int {tmp_var} = {thread_idx} + i * {src_view.get_dim_size(0)};')
 
           shr_mem_index = f'({tmp_var} % {src_view.get_dim_size(0)}) * {dest_view.get_lead_dim()} + '
@@ -143,15 +162,15 @@ class ExactTransposePatchLoader(AbstractShrMemLoader):
 
           glb_mem_index = f'{thread_idx} + i * {src_view.get_lead_dim()}'
           rhs = f'{self._src.name}[{src_offset}{glb_mem_index}]'
-          writer(f'{lhs} = {rhs};')
+          self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
       # if-block: residual part
-      if (src_view.get_dim_size(0) % self._num_threads) != 0:
-        residual = src_view.get_dim_size(0) - num_hops * self._num_threads
+      if (src_view.get_dim_size(0) % num_threads) != 0:
+        residual = src_view.get_dim_size(0) - num_hops * num_threads
 
-        with writer.block(f'if ({self._vm.lexic.thread_idx_x} < {residual})'):
-          finial_offset = num_hops * self._num_threads
-          thread_idx = f'{self._vm.lexic.thread_idx_x} + {finial_offset}'
+        with writer.block(f'if ({tid} < {residual})'):
+          finial_offset = num_hops * num_threads
+          thread_idx = f'{tid} + {finial_offset}'
           writer(f'int {tmp_var} = {thread_idx} + i * {src_view.get_dim_size(0)};')
 
           shr_mem_index = f'({tmp_var} % {src_view.get_dim_size(0)}) * {dest_view.get_lead_dim()} + '
@@ -160,7 +179,7 @@ class ExactTransposePatchLoader(AbstractShrMemLoader):
 
           glb_mem_index = f'{thread_idx} + i * {src_view.get_lead_dim()}'
           rhs = f'{self._src.name}[{src_offset}{glb_mem_index}]'
-          writer(f'{lhs} = {rhs};')
+          self._gen_copy(writer, lhs, rhs, self._get_fp_size())
 
   def __str__(self):
     return f'{self._dest.name} = load_g2s_trans {self._shr_mem.name}, {self._src.name};'
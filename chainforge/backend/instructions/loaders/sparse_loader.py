@@ -0,0 +1,56 @@
+from chainforge.backend.writer import Writer
+from chainforge.backend.symbol import DataView
+from chainforge.backend.data_types import ShrMemAccess
+from .abstract_loader import AbstractShrMemLoader, ShrMemLoaderType
+
+
+class SparsePatchLoader(AbstractShrMemLoader):
+  """A strategy which loads only non-zeros of a sparse matrix into shared memory.
+
+  Non-zeros are stored contiguously in glb. mem. (see `SparseMatrix`). Thus, they are copied
+  as a flat array and keep their packed order in shr. mem.
+  """
+
+  def __init__(self, **kwargs):
+    super(SparsePatchLoader, self).__init__(**kwargs)
+    self._shm_volume = self._matrix.get_nnz()
+
+    # NOTE: views describe the logical shape of the matrix. Gemms find non-zeros
+    # with the help of the sparsity pattern
+    self._src.data_view = DataView(rows=self._matrix.num_rows,
+                                   columns=self._matrix.num_cols,
+                                   is_transposed=False,
+                                   bbox=self._matrix.get_bbox())
+
+    self._dest.data_view = DataView(rows=self._matrix.num_rows,
+                                    columns=self._matrix.num_cols,
+                                    is_transposed=False,
+                                    bbox=self._matrix.get_bbox())
+
+  def get_loader_type(self):
+    return ShrMemLoaderType.NOT_TRANSPOSED
+
+  def get_shr_mem_accesses(self):
+    requests = self._get_modeled_hops(self._shm_volume)
+    return [ShrMemAccess(self._dest, is_write=True, requests=requests)]
+
+  def gen_code(self, writer: Writer):
+    super(SparsePatchLoader, self).gen_code(writer)
+    writer(f'// loading {self._src.name} to {self._dest.name}: # sparse, nnz: {self._shm_volume}')
+    tid, num_threads = self._get_tid(), self._get_num_copy_threads()
+
+    num_hops = int(self._shm_volume / num_threads)
+    if num_hops > 0:
+      writer.insert_pragma_unroll()
+      with writer.block(f'for (int i = 0; i < {num_hops}; ++i)'):
+        index = f'{tid} + i * {num_threads}'
+        self._gen_copy(writer, f'{self._dest.name}[{index}]', f'{self._src.name}[{index}]', self._get_fp_size())
+
+    if (self._shm_volume % num_threads) != 0:
+      residue = self._shm_volume - num_hops * num_threads
+      with writer.block(f'if ({tid} < {residue})'):
+        index = f'{tid} + {num_hops * num_threads}'
+        self._gen_copy(writer, f'{self._dest.name}[{index}]', f'{self._src.name}[{index}]', self._get_fp_size())
+
+  def __str__(self):
+    return f'{self._dest.name} = load_g2s_sparse {self._shr_mem.name}, {self._src.name};'
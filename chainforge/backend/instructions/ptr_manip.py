@@ -1,7 +1,8 @@
+from typing import Union
 from chainforge.common import Context
 from chainforge.common.matrix import Matrix
-from chainforge.common.basic_types import Addressing
-from chainforge.common.aux import get_2d_block_id, get_extra_offset_name
+from chainforge.common.basic_types import Addressing, GeneralLexicon
+from chainforge.common.aux import get_extra_offset_name
 from chainforge.common.basic_types import DataFlowDirection
 from chainforge.backend.symbol import Symbol, SymbolType, DataView
 from chainforge.backend.writer import Writer
@@ -10,10 +11,16 @@ from .abstract_instruction import AbstractInstruction
 
 
 class GetElementPtr(AbstractInstruction):
+  """Computes the address of a batch element.
+
+  If `constant_name` is given, the element is taken from an array in constant memory
+  instead of a kernel argument (see `Generator.set_constant_values`)
+  """
   def __init__(self,
                context: Context,
                src: Symbol,
-               dest: Symbol):
+               dest: Symbol,
+               constant_name: Union[str, None] = None):
     super(GetElementPtr, self).__init__(context)
 
     if src.stype != SymbolType.Batch:
@@ -33,8 +40,12 @@ class GetElementPtr(AbstractInstruction):
                               is_transposed=False,
                               bbox=src.obj.get_bbox())
 
+    if constant_name is not None and src.obj.addressing != Addressing.NONE:
+      raise InternalError(f'ptr: constant `src` ({src.name}) must not have addressing')
+
     self._dest = dest
     self._src = src
+    self._constant_name = constant_name
     self._is_ready = True
 
     src.add_user(self)
@@ -42,11 +53,11 @@ class GetElementPtr(AbstractInstruction):
 
   def gen_code(self, writer: Writer):
     extra_offset = get_extra_offset_name(self._src)
-    batch_id = get_2d_block_id(self._vm)
+    batch_id = GeneralLexicon.BATCH_ID_NAME
     matrix = self._src.obj
     address = ''
     if matrix.addressing == Addressing.STRIDED:
-      offset = f'({batch_id}) * {matrix.get_real_volume()}'
+      offset = f'{batch_id} * {matrix.get_real_volume()}'
       address = f'{offset} + {extra_offset}'
     elif matrix.addressing == Addressing.PTR_BASED:
       address = f'{batch_id}][{extra_offset}'
@@ -55,11 +66,21 @@ class GetElementPtr(AbstractInstruction):
     else:
       GenerationError(f'unknown addressing of `src` operand, given {matrix.addressing}')
 
-    rhs = f'&{self._src.name}[{address}]'
+    src_name = self._constant_name if self._constant_name else self._src.name
+    rhs = f'&{src_name}[{address}]'
 
     lhs = 'const ' if matrix.direction == DataFlowDirection.SOURCE else ''
     lhs += f'{self._fp_as_str} * const {self._vm.lexic.restrict_kw} {self._dest.name}'
     writer(f'{lhs} = {rhs};')
 
+  def get_src(self) -> Symbol:
+    return self._src
+
+  def get_dest(self) -> Symbol:
+    return self._dest
+
+  def get_constant_name(self) -> Union[str, None]:
+    return self._constant_name
+
   def __str__(self) -> str:
     return f'{self._dest.name} = getelementptr_b2g {self._src.name};'
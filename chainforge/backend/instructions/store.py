@@ -1,12 +1,74 @@
-from typing import Union
+from typing import Union, List, Tuple
 from chainforge.common import Context
 from chainforge.common.matrix import Matrix
-from chainforge.backend.data_types import RegMemObject
+from chainforge.common.tiling import RegisterTile
+from chainforge.backend.data_types import RegMemObject, ShrMemAccess
 from chainforge.backend.symbol import Symbol, SymbolType, DataView
 from chainforge.backend.exceptions import InternalError
 from chainforge.backend.writer import Writer
 from .abstract_instruction import AbstractInstruction, AbstractShrMemWrite
-from copy import deepcopy
+from copy import copy, deepcopy
+
+
+def snapshot_symbol(symbol: Symbol) -> Symbol:
+  """Returns a copy of a symbol which keeps its current data view.
+
+  Note, users of a symbol are shared with the original. Copying them would copy
+  the entire IR built so far
+  """
+  result = copy(symbol)
+  result.data_view = deepcopy(symbol.data_view)
+  return result
+
+
+def gen_tiled_store(instr, writer: Writer, thread_idx: str, register_tile: RegisterTile, gen_assignment) -> None:
+  """Generates a loop nest which stores results of a register-tiled gemm.
+
+  The thread-to-result mapping must be the same as the one of the gemm which produced
+  the registers. Thus, it is derived from the data view of the register array.
+
+  Args:
+    instr: a store instruction
+    writer: code writer
+    thread_idx: name of the thread index
+    register_tile: register tile of the producing gemm
+    gen_assignment: a callback which writes an assignment for given
+                    destination row, column and register subscript
+  """
+  src = instr.get_src()
+  src_view = src.data_view
+  src_bbox = src_view.get_bbox()
+  m_range, n_range = src_view.get_lead_dim(), src_view.get_dim_size(1)
+  num_dest_cols = instr.get_dest().data_view.get_dim_size(1)
+
+  num_rows = register_tile.rows_per_thread
+  num_cols = register_tile.get_cols_per_thread(n_range)
+  num_row_groups = register_tile.get_num_row_groups(m_range)
+  num_col_groups = register_tile.get_num_col_groups(n_range)
+
+  with writer.block(instr.gen_mask_threads(num_row_groups * num_col_groups)):
+    writer(f'const int rowGroup = {thread_idx} % {num_row_groups};')
+    writer(f'const int colGroup = {thread_idx} / {num_row_groups};')
+
+    writer.insert_pragma_unroll()
+    with writer.block(f'for (int r = 0; r < {num_rows}; ++r)'):
+      writer(f'const int row = rowGroup + r * {num_row_groups};')
+      with writer.block(f'if ((row >= {src_bbox[0]}) && (row < {src_bbox[2]}))'):
+        writer.insert_pragma_unroll()
+        with writer.block(f'for (int c = 0; c < {num_cols}; ++c)'):
+          writer(f'const int n = colGroup * {num_cols} + c;')
+
+          dest_row_idx = 'row'
+          thread_id_displacement = src_view.get_offset()
+          if thread_id_displacement:
+            dest_row_idx += f' - {thread_id_displacement}'
+          src_address = '' if src.obj.size == 1 else f'[r * {num_cols} + c]'
+
+          if num_cols * num_col_groups != num_dest_cols:
+            with writer.block(f'if (n < {num_dest_cols})'):
+              gen_assignment(dest_row_idx, 'n', src_address)
+          else:
+            gen_assignment(dest_row_idx, 'n', src_address)
 
 
 class StoreRegToShr(AbstractShrMemWrite):
@@ -15,7 +77,8 @@ class StoreRegToShr(AbstractShrMemWrite):
                src: Symbol,
                dest: Symbol,
                shr_mem: Symbol,
-               num_threads: int):
+               num_threads: int,
+               register_tile: Union[RegisterTile, None] = None):
     super(StoreRegToShr, self).__init__(context)
 
     if src.stype != SymbolType.Register:
@@ -44,10 +107,12 @@ class StoreRegToShr(AbstractShrMemWrite):
                               bbox=bbox)
 
     self._dest: Symbol = dest
-    self._src: Symbol = deepcopy(src)
+    self._src: Symbol = snapshot_symbol(src)
     self._shr_mem: Symbol = shr_mem
     self._num_threads: int = num_threads
     self._shr_mem_offset: Union[int, None] = None
+    self._register_tile: RegisterTile = register_tile if register_tile else RegisterTile()
+    self._min_lead_dim: int = num_rows
     view: DataView = self._dest.data_view
     self._shm_volume: int = view.get_volume()
 
@@ -61,6 +126,14 @@ class StoreRegToShr(AbstractShrMemWrite):
     dest_view = self._dest.data_view
     src_bbox = self._src.data_view.get_bbox()
 
+    if not self._register_tile.is_trivial(self._src.data_view.get_dim_size(1)):
+      def gen_assignment(dest_row_idx, column_idx, src_address):
+        dest_addr = dest_view.get_address(row_idx=dest_row_idx, column_idx=column_idx)
+        writer(f'{self._dest.name}[{dest_addr}] = {self._src.name}{src_address};')
+
+      gen_tiled_store(self, writer, self._vm.lexic.thread_idx_x, self._register_tile, gen_assignment)
+      return
+
     with writer.block(self.gen_range_mask_threads(begin=src_bbox[0], end=src_bbox[2])):
       writer.insert_pragma_unroll()
       loop = f'for (int i = 0; i < {dest_view.get_dim_size(1)}; ++i)'
@@ -76,9 +149,57 @@ class StoreRegToShr(AbstractShrMemWrite):
         rhs = f'{self._src.name}[i]'
         writer(f'{lhs} = {rhs};')
 
+  def get_src(self) -> Symbol:
+    return self._src
+
   def get_dest(self) -> Symbol:
     return self._dest
 
+  def get_shr_mem(self) -> Symbol:
+    return self._shr_mem
+
+  def get_register_tile(self) -> RegisterTile:
+    return self._register_tile
+
+  def is_paddable(self) -> bool:
+    return True
+
+  def get_min_dest_lead_dim(self) -> int:
+    return self._min_lead_dim
+
+  def set_dest_lead_dim(self, lead_dim: int) -> None:
+    self._dest.data_view.reset_lead_dim(lead_dim)
+    self._shm_volume = self._dest.data_view.get_volume()
+
+  def get_shr_mem_accesses(self):
+    src_view = self._src.data_view
+    src_bbox = src_view.get_bbox()
+    displacement = src_view.get_offset()
+    m_range, n_range = src_view.get_lead_dim(), src_view.get_dim_size(1)
+    num_dest_cols = self._dest.data_view.get_dim_size(1)
+
+    tile = self._register_tile
+    num_cols = tile.get_cols_per_thread(n_range)
+    num_row_groups = tile.get_num_row_groups(m_range)
+    num_active_threads = tile.get_num_active_threads(m_range, n_range)
+
+    # NOTE: a request per register of a tile
+    requests = []
+    for row_id in range(tile.rows_per_thread):
+      for col_id in range(num_cols):
+        request = []
+        for tid in range(self._num_threads):
+          row = tid % num_row_groups + row_id * num_row_groups
+          column = (tid // num_row_groups) * num_cols + col_id
+          is_active = tid < num_active_threads and src_bbox[0] <= row < src_bbox[2] and column < num_dest_cols
+          address = self._dest.data_view.get_element_address(row - displacement, column) if is_active else None
+          request.append(address)
+        requests.append(request)
+        if tile.is_trivial(n_range):
+          # NOTE: all columns of a trivial tile are accessed in the same way
+          break
+    return [ShrMemAccess(self._dest, is_write=True, requests=requests)]
+
   def __str__(self) -> str:
     return f'{self._dest.name} = store_r2s {self._shr_mem.name}, {self._src.name};'
 
@@ -90,7 +211,16 @@ class StoreRegToGlb(AbstractInstruction):
                dest: Symbol,
                alpha: float,
                beta: float,
-               num_threads: int):
+               num_threads: int,
+               register_tile: Union[RegisterTile, None] = None,
+               scale: Union[Symbol, None] = None,
+               addends: Union[List[Symbol], None] = None,
+               outputs: Union[List[Tuple[Symbol, float]], None] = None):
+    """
+    :param scale: per-batch scalar (i.e., a 1x1 matrix in glb. mem.) of an epilogue
+    :param addends: matrices in glb. mem. which are added to results
+    :param outputs: extra matrices in glb. mem. with their betas which receive results
+    """
     super(StoreRegToGlb, self).__init__(context)
 
     if src.stype != SymbolType.Register:
@@ -108,19 +238,31 @@ class StoreRegToGlb(AbstractInstruction):
     if dest.data_view.get_dim_size(0) != src.data_view.get_dim_size(0):
       raise InternalError('store: `src` and `dest` do not match in size aling dim `0`')
 
-    src.add_user(self)
-    dest.add_user(self)
+    addends = addends if addends else []
+    outputs = outputs if outputs else []
+    epilogue_symbols = [] if scale is None else [scale]
+    epilogue_symbols.extend(addends + [symbol for symbol, _ in outputs])
+    for symbol in epilogue_symbols:
+      if symbol.stype != SymbolType.Global or not isinstance(symbol.obj, Matrix):
+        raise InternalError(f'store: epilogue operand `{symbol.name}` is not a matrix in glb. memory')
 
-    dest.data_view = DataView(rows=dest.obj.num_rows,
-                              columns=dest.obj.num_cols,
-                              is_transposed=False,
-                              bbox=dest.obj.get_bbox())
+    src.add_user(self)
+    for symbol in [dest] + epilogue_symbols:
+      symbol.add_user(self)
+      symbol.data_view = DataView(rows=symbol.obj.num_rows,
+                                  columns=symbol.obj.num_cols,
+                                  is_transposed=False,
+                                  bbox=symbol.obj.get_bbox())
 
     self._dest: Symbol = dest
-    self._src: Symbol = deepcopy(src)
+    self._src: Symbol = snapshot_symbol(src)
     self._alpha = alpha
     self._beta = beta
+    self._scale: Union[Symbol, None] = scale
+    self._addends: List[Symbol] = addends
+    self._outputs: List[Tuple[Symbol, float]] = outputs
     self._num_threads: int = num_threads
+    self._register_tile: RegisterTile = register_tile if register_tile else RegisterTile()
     self._is_ready: bool = True
 
   def gen_code(self, writer: Writer) -> None:
@@ -129,6 +271,14 @@ class StoreRegToGlb(AbstractInstruction):
 
     writer('// write results back to glb. memory')
     src_bbox = self._src.data_view.get_bbox()
+
+    if not self._register_tile.is_trivial(self._src.data_view.get_dim_size(1)):
+      def gen_assignment(dest_row_idx, column_idx, src_address):
+        self._gen_assignment(writer, dest_row_idx, column_idx, src_address)
+
+      gen_tiled_store(self, writer, self._vm.lexic.thread_idx_x, self._register_tile, gen_assignment)
+      return
+
     with writer.block(self.gen_range_mask_threads(begin=src_bbox[0], end=src_bbox[2])):
 
       writer.insert_pragma_unroll()
@@ -139,16 +289,122 @@ class StoreRegToGlb(AbstractInstruction):
         if thread_id_displacement:
           dest_row_idx += f' - {thread_id_displacement}'
 
-        dest_addr = dest_view.get_address(row_idx=dest_row_idx, column_idx='n')
-        lhs = f'{self._dest.name}[{dest_addr}]'
-
         src_address = '' if self._src.obj.size == 1 else '[n]'
-        rhs = f'{self._alpha} * {self._src.name}{src_address}'
+        self._gen_assignment(writer, dest_row_idx, 'n', src_address)
 
-        if self._beta != 0.0:
-            rhs += f' + {self._beta} * {lhs}'
+  def _gen_assignment(self, writer: Writer, dest_row_idx: str, column_idx: str, src_address: str) -> None:
+    def get_element(symbol: Symbol) -> str:
+      address = symbol.data_view.get_address(row_idx=dest_row_idx, column_idx=column_idx)
+      return f'{symbol.name}[{address}]'
 
-        writer(f'{lhs} = {rhs};')
+    rhs = f'{self._alpha} * {self._src.name}{src_address}'
+    if self._scale is not None:
+      rhs = f'{self._scale.name}[{self._scale.data_view.get_element_address(0, 0)}] * {rhs}'
+
+    for addend in self._addends:
+      rhs += f' + {get_element(addend)}'
+
+    if not self._outputs:
+      lhs = get_element(self._dest)
+      if self._beta != 0.0:
+        rhs += f' + {self._beta} * {lhs}'
+      writer(f'{lhs} = {rhs};')
+      return
+
+    # NOTE: all outputs receive the same value. Thus, it is computed once
+    writer(f'const {self._fp_as_str} result = {rhs};')
+    for symbol, beta in [(self._dest, self._beta)] + self._outputs:
+      lhs = get_element(symbol)
+      update = f' + {beta} * {lhs}' if beta != 0.0 else ''
+      writer(f'{lhs} = result{update};')
+
+  def get_src(self) -> Symbol:
+    return self._src
+
+  def get_dest(self) -> Symbol:
+    return self._dest
+
+  def get_dests(self) -> List[Symbol]:
+    """Returns all matrices written by the instruction i.e., `dest` and extra outputs"""
+    return [self._dest] + [symbol for symbol, _ in self._outputs]
+
+  def get_scale(self) -> Union[Symbol, None]:
+    return self._scale
+
+  def get_addends(self) -> List[Symbol]:
+    return self._addends
+
+  def get_outputs(self) -> List[Tuple[Symbol, float]]:
+    return self._outputs
+
+  def has_epilogue(self) -> bool:
+    return self._scale is not None or bool(self._addends) or bool(self._outputs)
+
+  def get_alpha(self):
+    return self._alpha
+
+  def get_beta(self):
+    return self._beta
+
+  def get_register_tile(self) -> RegisterTile:
+    return self._register_tile
+
+  def __str__(self) -> str:
+    if not self.has_epilogue():
+      return f'{self._dest.name} = store_r2g {self._src.name};'
+
+    operands = [self._src.name]
+    operands.extend([f'scale({self._scale.name})'] if self._scale is not None else [])
+    operands.extend([f'add({symbol.name})' for symbol in self._addends])
+    operands.extend([f'out({symbol.name})' for symbol, _ in self._outputs])
+    return f'{self._dest.name} = store_r2g {", ".join(operands)};'
+
+
+class StoreRegToReg(AbstractInstruction):
+  """Copies the first `num_elements` registers of each thread to another register array"""
+
+  def __init__(self,
+               context: Context,
+               src: Symbol,
+               dest: Symbol,
+               num_elements: int):
+    super(StoreRegToReg, self).__init__(context)
+
+    if src.stype != SymbolType.Register:
+      raise InternalError('store: operand `src` is not in registers')
+
+    if dest.stype != SymbolType.Register:
+      raise InternalError('store: operand `dest` is not in registers')
+
+    if num_elements > min(src.obj.size, dest.obj.size):
+      raise InternalError(f'store: cannot copy {num_elements} registers '
+                          f'from {src.name}[{src.obj.size}] to {dest.name}[{dest.obj.size}]')
+
+    src.add_user(self)
+    dest.add_user(self)
+
+    self._src: Symbol = src
+    self._dest: Symbol = dest
+    self._num_elements: int = num_elements
+    self._is_ready: bool = True
+
+  def gen_code(self, writer: Writer) -> None:
+    writer.new_line()
+    writer(f'// copying registers: from {self._src.name} to {self._dest.name}')
+    writer.insert_pragma_unroll()
+    with writer.block(f'for (int i = 0; i < {self._num_elements}; ++i)'):
+      dest_address = '' if self._dest.obj.size == 1 else '[i]'
+      src_address = '' if self._src.obj.size == 1 else '[i]'
+      writer(f'{self._dest.name}{dest_address} = {self._src.name}{src_address};')
+
+  def get_src(self) -> Symbol:
+    return self._src
+
+  def get_dest(self) -> Symbol:
+    return self._dest
+
+  def get_num_elements(self) -> int:
+    return self._num_elements
 
   def __str__(self) -> str:
-    return f'{self._dest.name} = store_r2g {self._src.name};'
+    return f'{self._dest.name} = store_r2r {self._src.name}[{self._num_elements}];'
@@ -0,0 +1,460 @@
+from typing import List, Dict, Tuple, Union
+import numpy as np
+from chainforge.common import Context, Addressing, DataFlowDirection, FloatingPointType, SparseMatrix
+from chainforge.common.tiling import RegisterTile
+from .symbol import Symbol, SymbolType, DataView
+from .instructions import AbstractInstruction, GetElementPtr, Gemm, TiledGemm, RegisterGemm, SparseGemm
+from .instructions import StoreRegToShr, StoreRegToGlb, StoreRegToReg, ClearRegisters, SyncThreads
+from .instructions import CommitAsyncCopies, WaitAsyncCopies
+from .instructions.allocate import RegisterAlloc, ShrMemAlloc
+from .instructions.loaders import ExtendedPatchLoader, ExactPatchLoader
+from .instructions.loaders import ExtendedTransposePatchLoader, ExactTransposePatchLoader, SparsePatchLoader
+from .exceptions import InternalError
+
+
+class InterpreterStats:
+  """Counts memory accesses and floating point operations per batch element"""
+
+  def __init__(self):
+    self.glb_loads: int = 0
+    self.glb_stores: int = 0
+    self.shr_loads: int = 0
+    self.shr_stores: int = 0
+    self.flops: int = 0
+    self.num_barriers: int = 0
+
+  def to_dict(self) -> Dict[str, int]:
+    return dict(vars(self))
+
+  def __str__(self) -> str:
+    return ', '.join([f'{key}: {value}' for key, value in vars(self).items()])
+
+
+class IrInterpreter:
+  """Executes an optimized instruction list on the host for an entire batch at once.
+
+  All threads of a mult. execute an instruction before the next one starts. Per-thread
+  register arrays are emulated as an array of shape (batch, threads, size) and shared memory
+  of a mult. as an array of shape (batch, size per mult.). Global memory is given
+  by user buffers which are laid out as expected by the generated launcher.
+  Note: the lock-step execution hides data races which a real device would expose.
+  Values of constant matrices (see `Generator.set_constant_values`) are given by matrix names
+  and do not need to be passed to `run`
+  """
+
+  def __init__(self,
+               context: Context,
+               instructions: List[AbstractInstruction],
+               num_threads: int,
+               constants: Union[Dict[str, List[float]], None] = None):
+    self._context: Context = context
+    self._instrs: List[AbstractInstruction] = instructions
+    self._num_threads: int = num_threads
+    self._constants: Dict[str, List[float]] = constants if constants else {}
+    self._dtype = np.float32 if context.fp_type == FloatingPointType.FLOAT else np.float64
+
+    self._data: Dict[str, object] = {}
+    self._offsets: Dict[str, int] = {}
+    self._scalars: Dict[str, float] = {}
+    self._elements: Union[np.ndarray, None] = None
+    self._batches: Dict[str, Tuple[Symbol, np.ndarray]] = {}
+    self._memory: Dict[str, Tuple[np.ndarray, int]] = {}
+    self._registers: Dict[str, np.ndarray] = {}
+    self._stats: InterpreterStats = InterpreterStats()
+
+    self._handlers = [(GetElementPtr, self._exec_get_element_ptr),
+                      (RegisterAlloc, self._exec_register_alloc),
+                      (ShrMemAlloc, self._exec_shr_mem_alloc),
+                      (ExtendedPatchLoader, self._exec_extended_loader),
+                      (ExactPatchLoader, self._exec_exact_loader),
+                      (ExtendedTransposePatchLoader, self._exec_extended_trans_loader),
+                      (ExactTransposePatchLoader, self._exec_exact_trans_loader),
+                      (SparsePatchLoader, self._exec_sparse_loader),
+                      (Gemm, self._exec_gemm),
+                      (TiledGemm, self._exec_gemm),
+                      (RegisterGemm, self._exec_register_gemm),
+                      (SparseGemm, self._exec_sparse_gemm),
+                      (StoreRegToShr, self._exec_store_reg_to_shr),
+                      (StoreRegToReg, self._exec_store_reg_to_reg),
+                      (StoreRegToGlb, self._exec_store_reg_to_glb),
+                      (ClearRegisters, self._exec_clear_registers),
+                      (SyncThreads, self._exec_sync_threads),
+                      (CommitAsyncCopies, self._exec_async_copy_barrier),
+                      (WaitAsyncCopies, self._exec_async_copy_barrier)]
+
+  @classmethod
+  def from_generator(cls, generator):
+    instructions = generator.get_instructions()
+    if not instructions:
+      raise RuntimeError('generator does not hold any instructions. Call generate first')
+    return cls(generator.get_context(),
+               instructions,
+               generator.get_num_threads(),
+               generator.get_constant_values())
+
+  def run(self,
+          data: Dict[str, object],
+          num_elements: int,
+          offsets: Union[Dict[str, int], None] = None,
+          scalars: Union[Dict[str, float], None] = None,
+          flags: Union[np.ndarray, None] = None) -> None:
+    """
+    :param data: batches given by either matrix names (e.g., `A`) or aliases. A strided batch
+                 is a flat array, a pointer-based one is a list of flat arrays and a matrix
+                 without addressing is a single flat array. Results are written in place
+    :param num_elements: num. elements in a batch
+    :param offsets: extra offsets given by the same keys as `data`
+    :param scalars: values of symbolic alpha and beta
+    :param flags: optional per-element flags. Zero means an element is skipped
+    """
+    self._data = data
+    self._offsets = offsets if offsets else {}
+    self._scalars = scalars if scalars else {}
+    if flags is None:
+      self._elements = np.arange(num_elements)
+    else:
+      self._elements = np.nonzero(np.asarray(flags)[:num_elements])[0]
+
+    self._batches = {}
+    self._memory = {}
+    self._registers = {}
+    self._stats = InterpreterStats()
+
+    for instr in self._instrs:
+      self._get_handler(instr)(instr)
+
+    for symbol, values in self._batches.values():
+      if symbol.obj.direction == DataFlowDirection.SINK:
+        self._scatter_batch(symbol, values)
+
+  def get_stats(self) -> InterpreterStats:
+    return self._stats
+
+  def _get_handler(self, instr):
+    for instr_type, handler in self._handlers:
+      if type(instr) is instr_type:
+        return handler
+    raise InternalError(f'interpreter: unsupported instruction: {instr}')
+
+  def _find_by_symbol(self, table: Dict[str, object], symbol: Symbol, default=None):
+    for key in [symbol.name, symbol.obj.alias]:
+      if key in table:
+        return table[key]
+    if default is None:
+      raise KeyError(f'interpreter: no data provided for {symbol.name} (alias: {symbol.obj.alias})')
+    return default
+
+  def _get_scalar(self, scalar) -> float:
+    if isinstance(scalar, (float, int)):
+      return scalar
+    if str(scalar) not in self._scalars:
+      raise KeyError(f'interpreter: no value provided for scalar {scalar}')
+    return self._scalars[str(scalar)]
+
+  def _gather_batch(self, symbol: Symbol) -> np.ndarray:
+    matrix = symbol.obj
+    volume = matrix.get_real_volume()
+    if symbol.name in self._constants:
+      return np.asarray(self._constants[symbol.name], dtype=self._dtype)[None, :volume]
+
+    buffer = self._find_by_symbol(self._data, symbol)
+    offset = self._find_by_symbol(self._offsets, symbol, default=0)
+
+    if matrix.addressing == Addressing.STRIDED:
+      indices = self._elements[:, None] * volume + offset + np.arange(volume)[None, :]
+      return np.asarray(buffer)[indices].astype(self._dtype)
+    elif matrix.addressing == Addressing.PTR_BASED:
+      values = [np.asarray(buffer[element])[offset:offset + volume] for element in self._elements]
+      return np.array(values, dtype=self._dtype).reshape(len(self._elements), volume)
+    elif matrix.addressing == Addressing.NONE:
+      values = np.asarray(buffer)[:volume].astype(self._dtype)[None, :]
+      if matrix.direction == DataFlowDirection.SINK:
+        values = np.repeat(values, len(self._elements), axis=0)
+      return values
+    else:
+      raise InternalError(f'interpreter: unknown addressing of {symbol.name}')
+
+  def _scatter_batch(self, symbol: Symbol, values: np.ndarray) -> None:
+    matrix = symbol.obj
+    volume = matrix.get_real_volume()
+    buffer = self._find_by_symbol(self._data, symbol)
+    offset = self._find_by_symbol(self._offsets, symbol, default=0)
+
+    if matrix.addressing == Addressing.STRIDED:
+      indices = self._elements[:, None] * volume + offset + np.arange(volume)[None, :]
+      buffer[indices] = values
+    elif matrix.addressing == Addressing.PTR_BASED:
+      for index, element in enumerate(self._elements):
+        buffer[element][offset:offset + volume] = values[index]
+    elif matrix.addressing == Addressing.NONE:
+      if len(self._elements):
+        # NOTE: all elements write to the same location. The last one wins
+        buffer[:volume] = values[-1]
+
+  def _get_addresses(self, view: DataView, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    return view.get_offset() + rows + columns * view.get_lead_dim()
+
+  def _exec_get_element_ptr(self, instr: GetElementPtr):
+    src = instr.get_src()
+    values = self._gather_batch(src)
+    self._batches[src.name] = (src, values)
+    self._memory[instr.get_dest().name] = (values, 0)
+
+  def _exec_register_alloc(self, instr: RegisterAlloc):
+    dest = instr.get_dest()
+    num_threads = self._num_threads
+    for item in self._instrs:
+      if isinstance(item, Gemm):
+        m_range = item.get_op1_view().get_dim_size(0)
+        num_threads = max(num_threads, item.get_register_tile().get_num_active_threads(m_range,
+                                                                                         item.get_n_range()))
+    self._registers[dest.name] = np.zeros((len(self._elements), num_threads, dest.obj.size),
+                                          dtype=self._dtype)
+
+  def _exec_shr_mem_alloc(self, instr: ShrMemAlloc):
+    dest = instr.get_dest()
+    # NOTE: each element gets its own copy of the block-shared region followed by per-mult. data
+    size = dest.obj.get_block_shared_size() + dest.obj.get_size_per_mult()
+    self._memory[dest.name] = (np.zeros((len(self._elements), size), dtype=self._dtype), 0)
+
+  def _copy_to_shr_mem(self, instr, dest_indices: np.ndarray, src_indices: np.ndarray) -> None:
+    src = instr.get_src()
+    src_values, src_base = self._memory[src.name]
+
+    # NOTE: extended loaders may read beyond a matrix. Such data lands in padding
+    is_inside = src_indices < src.obj.get_real_volume()
+    dest_indices, src_indices = dest_indices[is_inside], src_indices[is_inside]
+
+    shr_mem, _ = self._memory[instr.get_shr_mem().name]
+    base = instr.get_shr_mem_offset()
+    if not instr.is_block_shared():
+      base += instr.get_shr_mem().obj.get_block_shared_size()
+    shr_mem[:, base + dest_indices] = src_values[:, src_base + src_indices]
+    self._memory[instr.get_dest().name] = (shr_mem, base)
+
+    self._stats.glb_loads += src_indices.size
+    self._stats.shr_stores += dest_indices.size
+
+  def _exec_extended_loader(self, instr: ExtendedPatchLoader):
+    indices = np.arange(instr.get_shm_volume())
+    src_offset = instr.get_src().data_view.get_offset()
+    self._copy_to_shr_mem(instr, dest_indices=indices, src_indices=src_offset + indices)
+
+  def _exec_exact_loader(self, instr: ExactPatchLoader):
+    src_view = instr.get_src().data_view
+    dest_view = instr.get_dest().data_view
+    rows = np.arange(src_view.get_dim_size(0))[:, None]
+    columns = np.arange(src_view.get_dim_size(1))[None, :]
+    dest_indices = rows + columns * dest_view.get_lead_dim()
+    src_indices = self._get_addresses(src_view, rows, columns)
+    self._copy_to_shr_mem(instr, dest_indices.ravel(), src_indices.ravel())
+
+  def _exec_extended_trans_loader(self, instr: ExtendedTransposePatchLoader):
+    src_view = instr.get_src().data_view
+    src_lead_dim = src_view.get_lead_dim()
+    dest_lead_dim = instr.get_dest().data_view.get_lead_dim()
+    indices = np.arange(instr.get_shm_volume())
+    dest_indices = (indices % src_lead_dim) * dest_lead_dim + indices // src_lead_dim
+    self._copy_to_shr_mem(instr, dest_indices, src_view.get_offset() + indices)
+
+  def _exec_exact_trans_loader(self, instr: ExactTransposePatchLoader):
+    src_view = instr.get_src().data_view
+    dest_lead_dim = instr.get_dest().data_view.get_lead_dim()
+    rows = np.arange(src_view.get_dim_size(0))[:, None]
+    columns = np.arange(src_view.get_dim_size(1))[None, :]
+    dest_indices = rows * dest_lead_dim + columns
+    src_indices = self._get_addresses(src_view, rows, columns)
+    self._copy_to_shr_mem(instr, dest_indices.ravel(), src_indices.ravel())
+
+  def _exec_sparse_loader(self, instr: SparsePatchLoader):
+    indices = np.arange(instr.get_shm_volume())
+    self._copy_to_shr_mem(instr, dest_indices=indices, src_indices=indices)
+
+  def _exec_gemm(self, instr: Gemm):
+    op1_view = instr.get_op1_view()
+    op1_values, op1_base = self._memory[instr.get_op1().name]
+    m_range, k_range = op1_view.get_dim_size(0), op1_view.get_dim_size(1)
+    rows = np.arange(m_range)[:, None]
+    columns = np.arange(k_range)[None, :]
+    lhs = op1_values[:, op1_base + self._get_addresses(op1_view, rows, columns)]
+    self._multiply(instr, lhs)
+
+  def _exec_sparse_gemm(self, instr: SparseGemm):
+    op1_view = instr.get_op1_view()
+    m_range, k_range = op1_view.get_dim_size(0), op1_view.get_dim_size(1)
+    rows = np.arange(m_range)[:, None]
+    columns = np.arange(k_range)[None, :]
+    lhs = self._gather_operand(instr.get_op1(), op1_view, rows, columns)
+
+    n_range = instr.get_n_range()
+    op2_view = instr.get_op2().data_view
+    k_indices = np.arange(k_range)[:, None]
+    n_indices = np.arange(n_range)[None, :]
+    if instr.is_op2_layout_as_requested():
+      rhs = self._gather_operand(instr.get_op2(), op2_view, k_indices, n_indices)
+    else:
+      rhs = self._gather_operand(instr.get_op2(), op2_view, n_indices, k_indices)
+    self._multiply(instr, lhs, rhs)
+
+  def _gather_operand(self, symbol: Symbol, view: DataView, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Returns a dense patch of an operand. Zeros of a sparse matrix are not read"""
+    values, base = self._memory[symbol.name]
+    if not isinstance(symbol.obj, SparseMatrix):
+      return values[:, base + self._get_addresses(view, rows, columns)]
+
+    rows, columns = np.broadcast_arrays(rows, columns)
+    bbox = view.get_bbox()
+    indices = np.array([symbol.obj.get_nz_index(bbox[0] + row, bbox[1] + column)
+                        for row, column in zip(rows.ravel(), columns.ravel())])
+    is_nonzero = np.array([index is not None for index in indices], dtype=bool)
+
+    patch = np.zeros((values.shape[0], rows.size), dtype=self._dtype)
+    patch[:, is_nonzero] = values[:, base + indices[is_nonzero].astype(int)]
+    return patch.reshape((values.shape[0],) + rows.shape)
+
+  def _exec_register_gemm(self, instr: RegisterGemm):
+    op1_view = instr.get_op1_view()
+    m_range, k_range = op1_view.get_dim_size(0), op1_view.get_dim_size(1)
+    registers = self._registers[instr.get_op1().name]
+    self._multiply(instr, registers[:, :m_range, :k_range])
+
+  def _multiply(self, instr: Gemm, lhs: np.ndarray, rhs: Union[np.ndarray, None] = None):
+    op1_view = instr.get_op1_view()
+    m_range, k_range = op1_view.get_dim_size(0), op1_view.get_dim_size(1)
+    n_range = instr.get_n_range()
+
+    if rhs is None:
+      op2_view = instr.get_op2().data_view
+      if instr.get_op2_values() is not None:
+        # NOTE: a pointer to immediates may have been removed
+        op2_values, op2_base = np.asarray(instr.get_op2_values().get_values(), dtype=self._dtype)[None, :], 0
+      else:
+        op2_values, op2_base = self._memory[instr.get_op2().name]
+      k_indices = np.arange(k_range)[:, None]
+      n_indices = np.arange(n_range)[None, :]
+      if instr.is_op2_layout_as_requested():
+        op2_indices = self._get_addresses(op2_view, k_indices, n_indices)
+      else:
+        op2_indices = self._get_addresses(op2_view, n_indices, k_indices)
+      rhs = op2_values[:, op2_base + op2_indices]
+
+    result = lhs @ rhs
+    tile = instr.get_register_tile()
+    threads, rows, columns, reg_indices = self._get_tile_mapping(tile, m_range, n_range)
+    registers = self._registers[instr.get_dest().name]
+    registers[:, threads, reg_indices] += result[:, rows, columns]
+
+    op1_loads, op2_loads = instr.get_num_operand_loads()
+    self._count_reads(instr.get_op1(), op1_loads)
+    self._count_reads(instr.get_op2(), op2_loads)
+    self._stats.flops += instr.get_num_issued_flops()
+
+  def _get_tile_mapping(self,
+                        tile: RegisterTile,
+                        m_range: int,
+                        n_range: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns thread ids, result rows, result columns and register indices of a register tile"""
+    num_rows = tile.rows_per_thread
+    num_cols = tile.get_cols_per_thread(n_range)
+    num_row_groups = tile.get_num_row_groups(m_range)
+    num_threads = tile.get_num_active_threads(m_range, n_range)
+
+    threads = np.arange(num_threads)[:, None, None]
+    row_ids = np.arange(num_rows)[None, :, None]
+    col_ids = np.arange(num_cols)[None, None, :]
+    rows = threads % num_row_groups + row_ids * num_row_groups
+    columns = (threads // num_row_groups) * num_cols + col_ids
+    reg_indices = row_ids * num_cols + col_ids
+
+    shape = (num_threads, num_rows, num_cols)
+    threads, rows, columns, reg_indices = [np.broadcast_to(item, shape).ravel()
+                                           for item in [threads, rows, columns, reg_indices]]
+    is_inside = (rows < m_range) & (columns < n_range)
+    return threads[is_inside], rows[is_inside], columns[is_inside], reg_indices[is_inside]
+
+  def _count_reads(self, symbol: Symbol, num_reads: int) -> None:
+    if symbol.stype == SymbolType.SharedMem:
+      self._stats.shr_loads += num_reads
+    elif symbol.stype != SymbolType.Register:
+      self._stats.glb_loads += num_reads
+
+  def _get_store_indices(self, instr) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    threads, reg_indices, rows, columns = self._get_store_mapping(instr)
+    dest_indices = self._get_addresses(instr.get_dest().data_view, rows, columns)
+    return threads, reg_indices, dest_indices
+
+  def _get_store_mapping(self, instr) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns thread ids, register indices, destination rows and columns of a store"""
+    src_view = instr.get_src().data_view
+    src_bbox = src_view.get_bbox()
+    displacement = src_view.get_offset()
+    dest_view = instr.get_dest().data_view
+
+    mapping = self._get_tile_mapping(instr.get_register_tile(),
+                                     m_range=src_view.get_lead_dim(),
+                                     n_range=src_view.get_dim_size(1))
+    threads, rows, columns, reg_indices = mapping
+    is_inside = (rows >= src_bbox[0]) & (rows < src_bbox[2]) & (columns < dest_view.get_dim_size(1))
+    threads, rows, columns, reg_indices = [item[is_inside] for item in mapping]
+
+    return threads, reg_indices, rows - displacement, columns
+
+  def _exec_store_reg_to_shr(self, instr: StoreRegToShr):
+    threads, reg_indices, dest_indices = self._get_store_indices(instr)
+    registers = self._registers[instr.get_src().name]
+
+    shr_mem, _ = self._memory[instr.get_shr_mem().name]
+    base = instr.get_shr_mem_offset() + instr.get_shr_mem().obj.get_block_shared_size()
+    shr_mem[:, base + dest_indices] = registers[:, threads, reg_indices]
+    self._memory[instr.get_dest().name] = (shr_mem, base)
+    self._stats.shr_stores += dest_indices.size
+
+  def _exec_store_reg_to_glb(self, instr: StoreRegToGlb):
+    threads, reg_indices, rows, columns = self._get_store_mapping(instr)
+    registers = self._registers[instr.get_src().name]
+    volume = rows.size
+
+    alpha = self._get_scalar(instr.get_alpha())
+    result = alpha * registers[:, threads, reg_indices]
+    self._stats.flops += volume
+
+    scale = instr.get_scale()
+    if scale is not None:
+      scale_values, scale_base = self._memory[scale.name]
+      scale_address = scale_base + scale.data_view.get_element_address(0, 0)
+      result *= scale_values[:, scale_address][:, None]
+      self._stats.glb_loads += 1
+      self._stats.flops += volume
+
+    for addend in instr.get_addends():
+      addend_values, addend_base = self._memory[addend.name]
+      result += addend_values[:, addend_base + self._get_addresses(addend.data_view, rows, columns)]
+      self._stats.glb_loads += volume
+      self._stats.flops += volume
+
+    outputs = [(instr.get_dest(), self._get_scalar(instr.get_beta()))] + instr.get_outputs()
+    for symbol, beta in outputs:
+      values, base = self._memory[symbol.name]
+      indices = base + self._get_addresses(symbol.data_view, rows, columns)
+      if beta != 0.0:
+        values[:, indices] = result + beta * values[:, indices]
+        self._stats.glb_loads += volume
+        self._stats.flops += 2 * volume
+      else:
+        values[:, indices] = result
+      self._stats.glb_stores += volume
+
+  def _exec_store_reg_to_reg(self, instr: StoreRegToReg):
+    num_elements = instr.get_num_elements()
+    src = self._registers[instr.get_src().name]
+    self._registers[instr.get_dest().name][:, :, :num_elements] = src[:, :, :num_elements]
+
+  def _exec_clear_registers(self, instr: ClearRegisters):
+    self._registers[instr.get_src().name].fill(0.0)
+
+  def _exec_sync_threads(self, instr: SyncThreads):
+    self._stats.num_barriers += 1
+
+  def _exec_async_copy_barrier(self, instr):
+    # NOTE: loaders complete immediately in the lock-step execution
+    pass
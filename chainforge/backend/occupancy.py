@@ -0,0 +1,66 @@
+from math import ceil
+from typing import Dict, Union
+from chainforge.common.vm.hw_descr import HwDecription
+
+
+class Occupancy:
+  def __init__(self,
+               blocks_per_sm: int,
+               warps_per_block: int,
+               max_warps_per_sm: int,
+               limiting_factor: str):
+    self.blocks_per_sm: int = blocks_per_sm
+    self.warps_per_block: int = warps_per_block
+    self.active_warps_per_sm: int = blocks_per_sm * warps_per_block
+    self.max_warps_per_sm: int = max_warps_per_sm
+    self.limiting_factor: str = limiting_factor
+
+  def get_ratio(self) -> float:
+    return self.active_warps_per_sm / self.max_warps_per_sm
+
+  def to_dict(self) -> Dict[str, Union[int, float, str]]:
+    return {'blocks_per_sm': self.blocks_per_sm,
+            'warps_per_block': self.warps_per_block,
+            'active_warps_per_sm': self.active_warps_per_sm,
+            'max_warps_per_sm': self.max_warps_per_sm,
+            'occupancy': self.get_ratio(),
+            'limiting_factor': self.limiting_factor}
+
+
+def compute_occupancy(hw_descr: HwDecription,
+                      threads_per_block: int,
+                      shr_mem_per_block: int,
+                      regs_per_thread: int = 0) -> Occupancy:
+  """Computes theoretical occupancy of a streaming multiprocessor (compute unit)
+
+  Args:
+    hw_descr: hardware description
+    threads_per_block: num. threads in a block
+    shr_mem_per_block: shared memory per block in bytes
+    regs_per_thread: num. 32-bit registers per thread. Zero means unknown
+
+  Returns:
+    theoretical occupancy. Note, `max_local_mem_size_per_block` and `max_reg_per_block`
+    are used as per-SM budgets because per-SM values are not listed in hw. descriptions
+  """
+  warp_size = hw_descr.vec_unit_length
+  warps_per_block = int(ceil(threads_per_block / warp_size))
+  max_warps_per_sm = hw_descr.max_threads_per_sm // warp_size
+
+  limits = {'blocks': hw_descr.max_block_per_sm,
+            'threads': max_warps_per_sm // warps_per_block if warps_per_block else 0}
+
+  if threads_per_block > hw_descr.max_threads_per_block:
+    limits['threads'] = 0
+
+  if shr_mem_per_block > 0:
+    limits['shared_memory'] = hw_descr.max_local_mem_size_per_block // shr_mem_per_block
+
+  if regs_per_thread > 0:
+    limits['registers'] = hw_descr.max_reg_per_block // (regs_per_thread * warps_per_block * warp_size)
+
+  limiting_factor = min(limits, key=limits.get)
+  return Occupancy(blocks_per_sm=limits[limiting_factor],
+                   warps_per_block=warps_per_block,
+                   max_warps_per_sm=max_warps_per_sm,
+                   limiting_factor=limiting_factor)
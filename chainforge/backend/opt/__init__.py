@@ -1 +1,9 @@
 from .optimizer import OptimizationStage
+from .bank_conflicts import BankConflictAnalysis, ShrMemPaddingOpt
+from .prefetch import PrefetchOpt
+from .interval_allocation import IntervalShrMemOpt
+from .load_cse import LoadCSEOpt
+from .register_tmps import RegisterTmpOpt
+from .hoist_invariants import HoistInvariantsOpt, BlockSharedInvariantsOpt
+from .pass_manager import PassManager, PassState, PassInfo, Analysis
+from .pass_manager import register_pass, register_pipeline, get_pipeline, get_registered_passes
@@ -0,0 +1,133 @@
+from math import ceil
+from typing import List, Dict, Tuple, Union
+from chainforge.common import FloatingPointType
+from chainforge.backend.data_types import ShrMemAccess
+from chainforge.backend.instructions import AbstractShrMemWrite, Gemm
+from chainforge.backend.symbol import Symbol
+from .abstract import AbstractOptStage, Context, AbstractInstruction
+
+
+NUM_BANKS = 32
+BANK_WIDTH = 4
+
+
+def compute_conflict_degree(addresses: List[Union[int, None]],
+                            elems_per_thread: int,
+                            words_per_elem: int) -> int:
+  """Computes the num. serialized shared memory transactions of a single request of `NUM_BANKS` threads
+
+  Threads which access the same word are served by a broadcast. The result is normalized by
+  the num. words per thread. Thus, a conflict-free request of wide (e.g., 64-bit) elements
+  also has degree 1.
+  """
+  words_per_thread = elems_per_thread * words_per_elem
+  words = set()
+  for address in addresses:
+    if address is None:
+      continue
+    first_word = address * words_per_elem
+    words.update(range(first_word, first_word + words_per_thread))
+
+  words_per_bank = [0] * NUM_BANKS
+  for word in words:
+    words_per_bank[word % NUM_BANKS] += 1
+
+  max_words = max(words_per_bank)
+  return max(1, int(ceil(max_words / words_per_thread)))
+
+
+class BankConflictAnalysis(AbstractOptStage):
+  """Models 32-bank shared memory accesses of all instructions and computes their conflict degree"""
+
+  def __init__(self, context: Context, instructions: List[AbstractInstruction]):
+    super(BankConflictAnalysis, self).__init__(context)
+    self._instrs: List[AbstractInstruction] = instructions
+    self._words_per_elem: int = (4 if context.fp_type == FloatingPointType.FLOAT else 8) // BANK_WIDTH
+    self._records: List[Dict[str, Union[str, int]]] = []
+    self._cache: Dict[Tuple, int] = {}
+
+  def apply(self) -> None:
+    self._records = []
+    for instr in self._instrs:
+      for access in instr.get_shr_mem_accesses():
+        self._records.append({'instr': str(instr),
+                              'symbol': access.symbol.name,
+                              'access': 'write' if access.is_write else 'read',
+                              'conflict_degree': self.get_degree(access)})
+
+  def get_records(self) -> List[Dict[str, Union[str, int]]]:
+    return self._records
+
+  def get_max_degree(self) -> int:
+    return max([record['conflict_degree'] for record in self._records], default=1)
+
+  def get_degree(self, access: ShrMemAccess) -> int:
+    degree = 1
+    for request in access.requests:
+      for begin in range(0, len(request), NUM_BANKS):
+        # NOTE: addresses are relative to symbols. Thus, gemms of the same shape repeat requests
+        key = (tuple(request[begin:begin + NUM_BANKS]), access.elems_per_thread)
+        if key not in self._cache:
+          self._cache[key] = compute_conflict_degree(list(key[0]),
+                                                     access.elems_per_thread,
+                                                     self._words_per_elem)
+        degree = max(degree, self._cache[key])
+    return degree
+
+
+class ShrMemPaddingOpt(AbstractOptStage):
+  """Pads leading dimensions of shared memory regions to remove bank conflicts.
+
+  For each region which can be padded, the writes of its producer and the reads of all gemms
+  which use the region are modeled for all leading dimensions within `NUM_BANKS` elements of
+  the minimal one. The smallest leading dimension with the lowest total conflict degree
+  is taken. Ties are broken in favor of layouts which keep vectorized loads. The search stops
+  at the first conflict-free layout with the widest possible vectors.
+  """
+
+  def __init__(self, context: Context, instructions: List[AbstractInstruction]):
+    super(ShrMemPaddingOpt, self).__init__(context)
+    self._instrs: List[AbstractInstruction] = instructions
+    self._analysis = BankConflictAnalysis(context, instructions)
+    self._paddings: Dict[str, int] = {}
+
+  def apply(self) -> None:
+    for instr in self._instrs:
+      if isinstance(instr, AbstractShrMemWrite) and instr.is_paddable():
+        symbol = instr.get_dest()
+        if self._is_view_copied(symbol):
+          continue
+        self._pad(instr, symbol)
+
+  def get_paddings(self) -> Dict[str, int]:
+    return self._paddings
+
+  def _pad(self, producer: AbstractShrMemWrite, symbol: Symbol) -> None:
+    min_lead_dim = producer.get_min_dest_lead_dim()
+    best_key, best_lead_dim = None, min_lead_dim
+    for lead_dim in range(min_lead_dim, min_lead_dim + NUM_BANKS):
+      producer.set_dest_lead_dim(lead_dim)
+      accesses = self._get_accesses(symbol)
+      degree = sum([self._analysis.get_degree(access) for access in accesses])
+      key = (degree, -producer.get_vector_width(), lead_dim)
+      if best_key is None or key < best_key:
+        best_key, best_lead_dim = key, lead_dim
+
+      if degree == len(accesses) and producer.get_vector_width() == producer.get_max_vector_width():
+        break
+
+    producer.set_dest_lead_dim(best_lead_dim)
+    self._paddings[symbol.name] = best_lead_dim - min_lead_dim
+
+  def _get_accesses(self, symbol: Symbol) -> List[ShrMemAccess]:
+    accesses = []
+    for user in symbol.get_user_list():
+      accesses.extend([access for access in user.get_shr_mem_accesses() if access.symbol is symbol])
+    return accesses
+
+  def _is_view_copied(self, symbol: Symbol) -> bool:
+    # NOTE: an aligned gemm keeps a copy of the `op1` data view which would not see a new layout
+    for user in symbol.get_user_list():
+      if isinstance(user, Gemm) and user.is_prefer_align() and user.get_op1() is symbol:
+        return True
+    return False
@@ -33,6 +33,9 @@ class GraphColoring:
     self._stack: VertexStack = VertexStack()
     self._vertex2color_map: Dict[Vertex, Union[int, None]] = {v: None for v in self._graph}
 
+    # NOTE: vertices which are still in the graph, accessed by their ids
+    self._id2vertex: Dict[int, Vertex] = {v.get_id(): v for v in self._graph}
+
   def apply(self) -> Dict[Vertex, object]:
     self._graph = sorted(self._graph, key=lambda x: x.get_num_neighbours(), reverse=True)
 
@@ -65,16 +68,17 @@ class GraphColoring:
       if not vertex.get_neighbors() == set():
         if self._max_num_colors > vertex.get_num_neighbours():
           candidate = self._graph.pop(index)
+          self._id2vertex.pop(candidate.get_id())
           self._stack.add_edges(candidate)
           self._remove_edges(candidate)
           return True
     return False
 
   def _remove_edges(self, vertex) -> None:
-    for neighbour in vertex.get_neighbors():
-      for item in self._graph:
-        if neighbour == item:
-          item.remove_neighbour(vertex)
+    for neighbour in list(vertex.get_neighbors()):
+      item = self._id2vertex.get(neighbour.get_id())
+      if item is not None:
+        item.remove_neighbour(vertex)
 
   def _restore_graph_and_color(self) -> None:
     vertex = self._stack.pop_edges()
@@ -90,7 +94,7 @@ class GraphColoring:
     self._vertex2color_map[vertex] = free_colors.pop()
 
   def _add_edges_to_graph(self, vertex) -> None:
-    for neighbour in vertex.get_neighbors():
-      for item in self._graph:
-        if item == neighbour:
-          item.add_neighbor(vertex)
+    for neighbour in list(vertex.get_neighbors()):
+      item = self._id2vertex.get(neighbour.get_id())
+      if item is not None:
+        item.add_neighbor(vertex)
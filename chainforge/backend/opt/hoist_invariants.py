@@ -0,0 +1,103 @@
+from typing import List, Set
+from chainforge.common import Addressing
+from chainforge.backend.instructions import GetElementPtr, StoreRegToGlb
+from chainforge.backend.instructions.allocate import RegisterAlloc, ShrMemAlloc
+from chainforge.backend.instructions.loaders import AbstractShrMemLoader
+from chainforge.backend.symbol import Symbol, SymbolType
+from .abstract import AbstractTransformer, Context, AbstractInstruction
+
+
+def _get_written_matrices(instructions: List[AbstractInstruction]) -> Set[int]:
+  written = set()
+  for instr in instructions:
+    if isinstance(instr, StoreRegToGlb):
+      written.update([id(dest.obj) for dest in instr.get_dests()])
+  return written
+
+
+def _is_batch_invariant(instr: AbstractInstruction, written: Set[int]) -> bool:
+  if isinstance(instr, (RegisterAlloc, ShrMemAlloc)):
+    return True
+
+  if isinstance(instr, GetElementPtr):
+    return instr.get_src().obj.addressing == Addressing.NONE
+
+  if isinstance(instr, AbstractShrMemLoader):
+    src = instr.get_src()
+    is_invariant = src.stype == SymbolType.Global and src.obj.addressing == Addressing.NONE
+    return is_invariant and id(src.obj) not in written and not instr.is_async()
+
+  return False
+
+
+def get_num_invariant_instrs(instructions: List[AbstractInstruction]) -> int:
+  """Returns the length of the longest prefix of batch-invariant instructions.
+
+  The prefix consists of allocations, pointers to matrices without addressing (i.e., shared by
+  all batch elements) and loads of such matrices which are not written by the kernel.
+  A persistent kernel executes the prefix once, before its loop over batch elements
+  """
+  written = _get_written_matrices(instructions)
+  for index, instr in enumerate(instructions):
+    if not _is_batch_invariant(instr, written):
+      return index
+  return len(instructions)
+
+
+def is_block_shared(symbol: Symbol) -> bool:
+  """Returns True if a shr. mem. symbol belongs to the region shared by all mults of a block"""
+  first_user = symbol.get_fist_user()
+  return isinstance(first_user, AbstractShrMemLoader) and first_user.is_block_shared()
+
+
+class HoistInvariantsOpt(AbstractTransformer):
+  """Moves batch-invariant instructions to the beginning of the instruction list.
+
+  The relative order of moved instructions is kept. Thus, pointers and allocations still
+  precede the loaders which use them. Data loaded by a moved loader must survive all
+  iterations of a persistent kernel. LivenessAnalysis takes care of this (see
+  `get_num_invariant_instrs`)
+  """
+
+  def __init__(self, context: Context, instructions: List[AbstractInstruction]):
+    super(HoistInvariantsOpt, self).__init__(context, instructions)
+    self._num_hoisted: int = 0
+
+  def apply(self) -> None:
+    written = _get_written_matrices(self._instrs)
+    invariants, others = [], []
+    for instr in self._instrs:
+      if _is_batch_invariant(instr, written):
+        invariants.append(instr)
+      else:
+        others.append(instr)
+
+    self._instrs = invariants + others
+    self._num_hoisted = len(invariants)
+
+  def get_num_hoisted(self) -> int:
+    return self._num_hoisted
+
+
+class BlockSharedInvariantsOpt(AbstractTransformer):
+  """Places data of batch-invariant loaders into a shr. mem. region shared by all mults of a block.
+
+  Only loaders within the batch-invariant prefix are considered (see `HoistInvariantsOpt`).
+  The generator emits the prefix before the guards of batch elements, followed by a block-wide
+  barrier. Thus, all threads of a block take part in the loads. Offsets within the region are
+  assigned together with the shr. mem. layout (see `ShrMemOpt`)
+  """
+
+  def __init__(self, context: Context, instructions: List[AbstractInstruction]):
+    super(BlockSharedInvariantsOpt, self).__init__(context, instructions)
+    self._num_shared: int = 0
+
+  def apply(self) -> None:
+    num_invariant_instrs = get_num_invariant_instrs(self._instrs)
+    for instr in self._instrs[:num_invariant_instrs]:
+      if isinstance(instr, AbstractShrMemLoader):
+        instr.set_block_shared(True)
+        self._num_shared += 1
+
+  def get_num_shared(self) -> int:
+    return self._num_shared
@@ -0,0 +1,104 @@
+import heapq
+from typing import List, Dict, Tuple, Union
+from chainforge.backend.symbol import Symbol
+from chainforge.backend.data_types import ShrMemObject
+from .abstract import AbstractOptStage, Context
+
+
+class LiveInterval:
+  def __init__(self, symbol: Symbol, begin: int, end: int, size: int):
+    self.symbol: Symbol = symbol
+    self.begin: int = begin
+    self.end: int = end
+    self.size: int = size
+    self.offset: Union[int, None] = None
+    self.neighbours: List[LiveInterval] = []
+
+  def overlaps(self, other) -> bool:
+    return self.begin <= other.end and other.begin <= self.end
+
+  def __str__(self) -> str:
+    return f'{self.symbol.name}: [{self.begin}, {self.end}], size = {self.size}, offset = {self.offset}'
+
+
+class IntervalShrMemOpt(AbstractOptStage):
+  """Places each shr. mem. symbol at an individual offset.
+
+  Symbols of straight-line code are live within intervals of program points given by
+  LivenessAnalysis. Intervals are placed in decreasing order of their sizes. Each interval
+  takes the smallest gap (best-fit) between already placed intervals which overlap with it
+  in time. If there is no such gap, it is placed on top of them.
+
+  The result is applied only if it requires less shr. mem. than the region-based layout
+  which is already assigned by ShrMemOpt.
+  """
+
+  def __init__(self,
+               context: Context,
+               shr_mem_obj: ShrMemObject,
+               live_intervals: Dict[Symbol, Tuple[int, int]]):
+    super(IntervalShrMemOpt, self).__init__(context)
+
+    self._shr_mem_obj: ShrMemObject = shr_mem_obj
+    self._live_intervals: Dict[Symbol, Tuple[int, int]] = live_intervals
+    self._intervals: List[LiveInterval] = []
+    self._size: int = 0
+    self._region_based_size: int = 0
+
+  def apply(self) -> None:
+    self._region_based_size = self._shr_mem_obj.get_size_per_mult()
+    self._intervals = self._compute_intervals()
+    self._find_neighbours()
+
+    for interval in sorted(self._intervals, key=lambda item: (-item.size, item.begin, item.end, item.symbol.name)):
+      interval.offset = self._find_offset(interval)
+      self._size = max(self._size, interval.offset + interval.size)
+
+    if self._size < self._region_based_size:
+      self._shr_mem_obj.set_size_per_mult(self._size)
+      for interval in self._intervals:
+        interval.symbol.get_fist_user().set_shr_mem_offset(interval.offset)
+
+  def get_size(self) -> int:
+    return self._size
+
+  def get_region_based_size(self) -> int:
+    return self._region_based_size
+
+  def get_intervals(self) -> List[LiveInterval]:
+    return self._intervals
+
+  def _compute_intervals(self) -> List[LiveInterval]:
+    intervals = []
+    for symbol, (begin, end) in self._live_intervals.items():
+      size = symbol.get_fist_user().compute_shared_mem_size()
+      intervals.append(LiveInterval(symbol, begin, end, size))
+    return intervals
+
+  def _find_neighbours(self) -> None:
+    """Finds overlapping intervals with a sweep. Thus, the cost is proportional
+    to the num. overlapping pairs rather than to the squared num. intervals
+    """
+    active: List[Tuple[int, int, LiveInterval]] = []
+    for index, interval in enumerate(sorted(self._intervals, key=lambda item: item.begin)):
+      while active and active[0][0] < interval.begin:
+        heapq.heappop(active)
+
+      for _, _, other in active:
+        other.neighbours.append(interval)
+        interval.neighbours.append(other)
+      heapq.heappush(active, (interval.end, index, interval))
+
+  def _find_offset(self, interval: LiveInterval) -> int:
+    occupied: List[Tuple[int, int]] = sorted([(item.offset, item.offset + item.size)
+                                              for item in interval.neighbours if item.offset is not None])
+
+    best_offset, best_gap = None, None
+    prev_end = 0
+    for begin, end in occupied:
+      gap = begin - prev_end
+      if gap >= interval.size and (best_gap is None or gap < best_gap):
+        best_offset, best_gap = prev_end, gap
+      prev_end = max(prev_end, end)
+
+    return prev_end if best_offset is None else best_offset
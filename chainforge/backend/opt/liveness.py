@@ -1,41 +1,67 @@
-from typing import List, Dict, Set, Union
-from copy import copy
+from typing import List, Dict, Set, Tuple, Union
 from collections import OrderedDict
 from chainforge.backend.symbol import Symbol
 from chainforge.backend.instructions import Gemm, StoreRegToShr
 from chainforge.backend.instructions.loaders import AbstractShrMemLoader
 from chainforge.backend.symbol import SymbolType
 from .abstract import AbstractOptStage, Context, AbstractInstruction
+from .hoist_invariants import get_num_invariant_instrs, is_block_shared
 
 
 class LivenessAnalysis(AbstractOptStage):
+  """Computes live intervals of shr. mem. symbols.
+
+  The IR is straight-line code and each symbol is defined only once. Thus, a symbol is live
+  within a single interval `[begin, end]` of program points which starts right after its
+  definition and ends at its last use. Intervals are computed with a single backward pass.
+
+  A persistent kernel repeats all instructions but its batch-invariant prefix. Thus, symbols
+  defined within the prefix are live till the end of the instruction list. Block-shared symbols
+  are not a part of per-mult. regions and, thus, are skipped
+  """
+
   def __init__(self, context: Context, instructions: List[AbstractInstruction]):
     super(LivenessAnalysis, self).__init__(context)
 
     self._instrs: List[AbstractInstruction] = instructions
-    self._map: Dict[int, Set[Symbol]] = OrderedDict()
+    self._intervals: Dict[Symbol, Tuple[int, int]] = OrderedDict()
     self._live_map: Union[Dict[int, Set[Symbol]], None] = None
 
   def apply(self) -> None:
-    self._map = {len(self._instrs): set()}
+    last_uses: Dict[Symbol, int] = {}
+    intervals: List[Tuple[Symbol, Tuple[int, int]]] = []
 
-    for index, instr in reversed(list(enumerate(self._instrs))):
-      self._map[index] = copy(self._map[index + 1])
+    for index in range(len(self._instrs) - 1, -1, -1):
+      instr = self._instrs[index]
       if isinstance(instr, Gemm):
-        self._check_use(index, instr)
+        for operand in [instr.get_op1(), instr.get_op2()]:
+          if operand.stype == SymbolType.SharedMem and operand not in last_uses:
+            last_uses[operand] = index
       elif isinstance(instr, (StoreRegToShr, AbstractShrMemLoader)):
-        self._check_define(index, instr)
+        dest = instr.get_dest()
+        if dest in last_uses:
+          interval = (index + 1, last_uses.pop(dest))
+          if not is_block_shared(dest):
+            intervals.append((dest, interval))
 
-    self._live_map = OrderedDict(reversed(list(self._map.items())))
+    if self._context.get_user_options().enable_persistent_threads:
+      num_invariant_instrs = get_num_invariant_instrs(self._instrs)
+      last_index = len(self._instrs) - 1
+      intervals = [(symbol, (begin, last_index if begin <= num_invariant_instrs else end))
+                   for symbol, (begin, end) in intervals]
 
-  def get_live_map(self) -> Dict[int, Set[Symbol]]:
-    return self._live_map
+    self._intervals = OrderedDict(reversed(intervals))
+    self._live_map = None
 
-  def _check_use(self, index, instr) -> None:
-    operands = [instr.get_op1(), instr.get_op2()]
-    for operand in operands:
-      if operand.stype == SymbolType.SharedMem:
-        self._map[index].add(operand)
+  def get_live_intervals(self) -> Dict[Symbol, Tuple[int, int]]:
+    """Returns live intervals (both ends are inclusive) ordered by their beginnings"""
+    return self._intervals
 
-  def _check_define(self, index, instr) -> None:
-    self._map[index].remove(instr.get_dest())
+  def get_live_map(self) -> Dict[int, Set[Symbol]]:
+    """Returns live symbols at each program point. The map is built on demand"""
+    if self._live_map is None:
+      self._live_map = OrderedDict([(index, set()) for index in range(len(self._instrs) + 1)])
+      for symbol, (begin, end) in self._intervals.items():
+        for index in range(begin, end + 1):
+          self._live_map[index].add(symbol)
+    return self._live_map
@@ -0,0 +1,107 @@
+from typing import List, Dict, Tuple
+from chainforge.common import FloatingPointType
+from chainforge.backend.instructions import Gemm, StoreRegToGlb
+from chainforge.backend.instructions.loaders import AbstractShrMemLoader
+from chainforge.backend.symbol import Symbol, DataView
+from .abstract import AbstractTransformer, Context, AbstractInstruction
+
+
+class LoadCSEOpt(AbstractTransformer):
+  """Removes shr. mem. loaders which copy the same global data as a previous loader.
+
+  A copy is available from its loader till a store to the source matrix (or to its alias).
+  A duplicate is removed and its users read the available copy instead. Thus, the live interval
+  of the copy grows up to the last use of the duplicate. A duplicate is kept if the extended
+  interval would make the live shr. mem. exceed the shr. mem. of a block.
+  """
+
+  def __init__(self,
+               context: Context,
+               instructions: List[AbstractInstruction],
+               live_intervals: Dict[Symbol, Tuple[int, int]]):
+    super(LoadCSEOpt, self).__init__(context, instructions)
+
+    fp_size = 4 if context.fp_type == FloatingPointType.FLOAT else 8
+    self._max_size: int = context.get_vm().hw_descr.max_local_mem_size_per_block // fp_size
+    self._intervals: Dict[Symbol, Tuple[int, int]] = dict(live_intervals)
+    self._live_sizes: List[int] = []
+    self._num_removed: int = 0
+
+  def apply(self) -> None:
+    self._live_sizes = self._compute_live_sizes()
+
+    available: Dict[Tuple, AbstractShrMemLoader] = {}
+    removed: List[AbstractShrMemLoader] = []
+    for instr in self._instrs:
+      if isinstance(instr, AbstractShrMemLoader):
+        key = self._make_key(instr)
+        if key in available and self._try_merge(available[key], instr):
+          removed.append(instr)
+        else:
+          available[key] = instr
+
+      elif isinstance(instr, StoreRegToGlb):
+        dest_matrices = [dest.obj for dest in instr.get_dests()]
+        for key, loader in list(available.items()):
+          if any([self._is_same_matrix(loader.get_src().obj, matrix) for matrix in dest_matrices]):
+            del available[key]
+
+    removed_ids = set([id(loader) for loader in removed])
+    self._instrs = [instr for instr in self._instrs if id(instr) not in removed_ids]
+    self._num_removed = len(removed)
+
+  def get_num_removed(self) -> int:
+    return self._num_removed
+
+  def _make_key(self, loader: AbstractShrMemLoader) -> Tuple:
+    return (type(loader),
+            id(loader.get_src()),
+            self._view_to_tuple(loader.get_src().data_view),
+            self._view_to_tuple(loader.get_dest().data_view))
+
+  def _view_to_tuple(self, view: DataView) -> Tuple:
+    return view.get_lead_dim(), view.is_transposed, tuple(view.get_bbox())
+
+  def _is_same_matrix(self, src_matrix, dest_matrix) -> bool:
+    is_aliased = src_matrix.alias is not None and src_matrix.alias == dest_matrix.alias
+    return src_matrix is dest_matrix or is_aliased
+
+  def _compute_live_sizes(self) -> List[int]:
+    changes = [0] * (len(self._instrs) + 2)
+    for symbol, (begin, end) in self._intervals.items():
+      size = symbol.get_fist_user().compute_shared_mem_size()
+      changes[begin] += size
+      changes[end + 1] -= size
+
+    live_sizes, current = [], 0
+    for change in changes[:-1]:
+      current += change
+      live_sizes.append(current)
+    return live_sizes
+
+  def _try_merge(self, origin: AbstractShrMemLoader, duplicate: AbstractShrMemLoader) -> bool:
+    kept, dropped = origin.get_dest(), duplicate.get_dest()
+    if kept not in self._intervals or dropped not in self._intervals:
+      return False
+
+    kept_begin, kept_end = self._intervals[kept]
+    dropped_begin, dropped_end = self._intervals[dropped]
+
+    # NOTE: the copy becomes live in the gap between its last use and the duplicate
+    size = origin.compute_shared_mem_size()
+    gap = range(kept_end + 1, dropped_begin)
+    if any([self._live_sizes[index] + size > self._max_size for index in gap]):
+      return False
+
+    for index in gap:
+      self._live_sizes[index] += size
+    self._intervals[kept] = (kept_begin, max(kept_end, dropped_end))
+    del self._intervals[dropped]
+
+    for user in list(dropped.get_user_list()):
+      if isinstance(user, Gemm):
+        user.replace_operand(dropped, kept)
+
+    duplicate.get_src().remove_user(duplicate)
+    duplicate.get_shr_mem().remove_user(duplicate)
+    return True
@@ -1,13 +1,8 @@
-from typing import List, Dict, Set
+from typing import List, Dict, Union
 from chainforge.common import Context
-from chainforge.backend.symbol import Symbol
 from chainforge.backend.instructions import AbstractInstruction
 from chainforge.backend.data_types import ShrMemObject
-from .liveness import LivenessAnalysis
-from .mem_region_allocation import MemoryRegionAllocation, Region
-from .shr_mem_analyzer import ShrMemOpt
-from .sync_threads import SyncThreadsOpt
-from .remove_redundancy import RemoveRedundancyOpt
+from .pass_manager import PassManager, PassState, get_pipeline
 
 
 class OptimizationStage:
@@ -22,30 +17,49 @@ class OptimizationStage:
     self._num_instrs: int = len(instructions)
     self._user_options = context.get_user_options()
     self._num_threads = num_threads
+    self._shr_mem_sizes: Dict[str, int] = {}
+    self._records: List[Dict[str, Union[str, float, int]]] = []
 
   def optimize(self):
-    opt = LivenessAnalysis(self._context, self._instrs)
-    opt.apply()
-    live_map: Dict[int, Set[Symbol]] = opt.get_live_map()
+    state = PassState(context=self._context,
+                      shr_mem=self._shr_mem,
+                      instructions=self._instrs,
+                      num_threads=self._num_threads)
 
-    opt = MemoryRegionAllocation(self._context, live_map)
-    opt.apply()
-    regions: List[Region] = opt.get_regions()
+    manager = PassManager(state, self._get_pipeline())
+    manager.run()
+    self._instrs = state.instrs
+    self._records = manager.get_records()
 
-    opt = ShrMemOpt(context=self._context,
-                    shr_mem_obj=self._shr_mem,
-                    regions=regions,
-                    live_map=live_map)
-    opt.apply()
-
-    if self._user_options.enable_sync_threads_opt:
-      opt = SyncThreadsOpt(self._context, self._instrs, regions, self._num_threads)
-      opt.apply()
-      self._instrs = opt.get_instructions()
-
-    opt = RemoveRedundancyOpt(self._context, self._instrs)
-    opt.apply()
-    self._instrs = opt.get_instructions()
+    self._shr_mem_sizes = {}
+    region_based = manager.get_pass('region_shr_mem')
+    if region_based:
+      self._shr_mem_sizes['region_based'] = region_based.get_size()
+    interval = manager.get_pass('interval_shr_mem')
+    if interval:
+      self._shr_mem_sizes['interval'] = interval.get_size()
+    self._shr_mem_sizes['selected'] = self._shr_mem.get_size_per_mult()
 
   def get_instructions(self):
     return self._instrs
+
+  def get_shr_mem_sizes(self) -> Dict[str, int]:
+    """Returns shr. mem. per mult. (in elements) required by each allocation strategy"""
+    return self._shr_mem_sizes
+
+  def get_timings(self) -> Dict[str, float]:
+    """Returns wall time (in seconds) spent in each pass during the last `optimize` call"""
+    timings: Dict[str, float] = {}
+    for record in self._records:
+      timings[record['name']] = timings.get(record['name'], 0.0) + record['time']
+    return timings
+
+  def get_pass_records(self) -> List[Dict[str, Union[str, float, int]]]:
+    """Returns name, wall time and num. instructions after each pass in execution order"""
+    return self._records
+
+  def _get_pipeline(self) -> List[str]:
+    pipeline = self._user_options.pipeline
+    if isinstance(pipeline, str):
+      return get_pipeline(pipeline, self._user_options)
+    return list(pipeline)
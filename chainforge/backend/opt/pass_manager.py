@@ -0,0 +1,325 @@
+from copy import copy
+from time import perf_counter
+from typing import List, Dict, Union, Callable, Sequence
+from chainforge.common import Context
+from chainforge.backend.instructions import AbstractInstruction
+from chainforge.backend.data_types import ShrMemObject
+from chainforge.backend.exceptions import GenerationError
+from .abstract import AbstractOptStage, AbstractTransformer
+from .liveness import LivenessAnalysis
+from .mem_region_allocation import MemoryRegionAllocation
+from .shr_mem_analyzer import ShrMemOpt
+from .sync_threads import SyncThreadsOpt
+from .remove_redundancy import RemoveRedundancyOpt
+from .bank_conflicts import ShrMemPaddingOpt
+from .prefetch import PrefetchOpt
+from .interval_allocation import IntervalShrMemOpt
+from .load_cse import LoadCSEOpt
+from .register_tmps import RegisterTmpOpt
+from .hoist_invariants import HoistInvariantsOpt, BlockSharedInvariantsOpt
+
+
+class Analysis:
+  LIVENESS = 'liveness'
+  REGIONS = 'regions'
+  SHR_MEM_LAYOUT = 'shr_mem_layout'
+
+  @classmethod
+  def all(cls) -> List[str]:
+    return [cls.LIVENESS, cls.REGIONS, cls.SHR_MEM_LAYOUT]
+
+
+class PassState:
+  """IR and analysis results shared by all passes of a pipeline"""
+
+  def __init__(self,
+               context: Context,
+               shr_mem: ShrMemObject,
+               instructions: List[AbstractInstruction],
+               num_threads: int):
+    self.context: Context = context
+    self.shr_mem: ShrMemObject = shr_mem
+    self.instrs: List[AbstractInstruction] = instructions
+    self.num_threads: int = num_threads
+    self.analyses: Dict[str, AbstractOptStage] = {}
+
+  def get_analysis(self, name: str) -> AbstractOptStage:
+    if name not in self.analyses:
+      raise GenerationError(f'analysis `{name}` is not available')
+    return self.analyses[name]
+
+
+class PassInfo:
+  """Describes a registered pass.
+
+  `make` builds a pass from the current state. Analyses listed in `requires` are computed
+  before the pass runs (by their providers) if they are not valid. A pass which `provides`
+  an analysis stores itself as its result. Analyses listed in `invalidates` must be
+  recomputed before their next use. A pass which `requires_final_ir` (e.g., shr. mem.
+  allocation) must not be followed by a pass which `rewrites_ir` in a pipeline
+  """
+
+  def __init__(self,
+               name: str,
+               make: Callable[[PassState], AbstractOptStage],
+               requires: Sequence[str] = (),
+               provides: Union[str, None] = None,
+               invalidates: Sequence[str] = (),
+               rewrites_ir: bool = False,
+               requires_final_ir: bool = False):
+    self.name: str = name
+    self.make: Callable[[PassState], AbstractOptStage] = make
+    self.requires: List[str] = list(requires)
+    self.provides: Union[str, None] = provides
+    self.invalidates: List[str] = list(invalidates)
+    self.rewrites_ir: bool = rewrites_ir
+    self.requires_final_ir: bool = requires_final_ir
+
+
+_passes: Dict[str, PassInfo] = {}
+_providers: Dict[str, str] = {}
+_pipelines: Dict[str, Union[List[str], Callable[[object], List[str]]]] = {}
+
+
+def register_pass(name: str,
+                  pass_type: type,
+                  make: Union[Callable[[PassState], AbstractOptStage], None] = None,
+                  requires: Sequence[str] = (),
+                  provides: Union[str, None] = None,
+                  invalidates: Union[Sequence[str], None] = None,
+                  rewrites_ir: Union[bool, None] = None,
+                  requires_final_ir: bool = False) -> None:
+  """Registers a pass under a given name.
+
+  If `make` is not given, `pass_type` must be an AbstractTransformer which is constructed
+  from a context and an instruction list. By default, transformers invalidate all analyses
+  and rewrite the IR
+  """
+  if make is None:
+    if not issubclass(pass_type, AbstractTransformer):
+      raise GenerationError(f'cannot construct pass `{name}` of type {pass_type.__name__} '
+                            f'without `make`')
+    make = lambda state: pass_type(state.context, state.instrs)
+
+  if invalidates is None:
+    invalidates = Analysis.all() if issubclass(pass_type, AbstractTransformer) else []
+  if rewrites_ir is None:
+    rewrites_ir = issubclass(pass_type, AbstractTransformer)
+
+  _passes[name] = PassInfo(name, make, requires, provides, invalidates, rewrites_ir, requires_final_ir)
+  if provides is not None:
+    _providers.setdefault(provides, name)
+
+
+def register_pipeline(name: str, passes: Union[List[str], Callable[[object], List[str]]]) -> None:
+  """Registers a named pipeline as a list of pass names or as a function of user options"""
+  _pipelines[name] = passes
+
+
+def get_pipeline(name: str, options) -> List[str]:
+  if name not in _pipelines:
+    raise GenerationError(f'unknown pipeline `{name}`, expected one of: {", ".join(_pipelines.keys())}')
+  passes = _pipelines[name]
+  return list(passes(options) if callable(passes) else passes)
+
+
+def get_registered_passes() -> List[str]:
+  return list(_passes.keys())
+
+
+class PassManager:
+  """Runs a pipeline of registered passes and records wall time and IR size of each pass.
+
+  Missing analyses are computed right before a pass which requires them. After the pipeline,
+  shr. mem. layout is recomputed if some pass has invalidated it and finalizers are executed
+  """
+
+  def __init__(self, state: PassState, pipeline: List[str]):
+    for name in pipeline:
+      if name not in _passes:
+        raise GenerationError(f'unknown pass `{name}`, expected one of: {", ".join(_passes.keys())}')
+    self._check_order(pipeline)
+
+    self._state: PassState = state
+    self._pipeline: List[str] = pipeline
+    self._records: List[Dict[str, Union[str, float, int]]] = []
+    self._last_run: Dict[str, AbstractOptStage] = {}
+
+  def run(self) -> None:
+    self._records = []
+    self._last_run = {}
+    for name in self._pipeline:
+      self._run_pass(_passes[name])
+    self._ensure(Analysis.SHR_MEM_LAYOUT)
+    for info in _finalizers:
+      self._run_pass(info)
+
+  def get_records(self) -> List[Dict[str, Union[str, float, int]]]:
+    """Returns name, wall time (in seconds) and num. instructions after each executed pass"""
+    return self._records
+
+  def get_pass(self, name: str) -> Union[AbstractOptStage, None]:
+    """Returns the last executed instance of a given pass"""
+    return self._last_run.get(name, None)
+
+  def _check_order(self, pipeline: List[str]) -> None:
+    rewriters = [index for index, name in enumerate(pipeline) if _passes[name].rewrites_ir]
+    if not rewriters:
+      return
+
+    last_rewriter = pipeline[rewriters[-1]]
+    for name in pipeline[:rewriters[-1]]:
+      if _passes[name].requires_final_ir:
+        raise GenerationError(f'pass `{name}` must come after `{last_rewriter}` '
+                              f'because the latter rewrites the IR')
+
+  def _ensure(self, analysis: str, visiting: Union[List[str], None] = None) -> None:
+    if analysis in self._state.analyses:
+      return
+
+    if analysis not in _providers:
+      raise GenerationError(f'no pass provides analysis `{analysis}`')
+
+    visiting = [] if visiting is None else visiting
+    if analysis in visiting:
+      raise GenerationError(f'cyclic dependency between analyses: {" -> ".join(visiting + [analysis])}')
+    self._run_pass(_passes[_providers[analysis]], visiting + [analysis])
+
+  def _run_pass(self, info: PassInfo, visiting: Union[List[str], None] = None) -> None:
+    for analysis in info.requires:
+      self._ensure(analysis, visiting)
+
+    start = perf_counter()
+    opt = info.make(self._state)
+    opt.apply()
+    if isinstance(opt, AbstractTransformer):
+      self._state.instrs = opt.get_instructions()
+    elapsed = perf_counter() - start
+
+    for analysis in info.invalidates:
+      self._state.analyses.pop(analysis, None)
+    if info.provides is not None:
+      self._state.analyses[info.provides] = opt
+
+    self._last_run[info.name] = opt
+    self._records.append({'name': info.name,
+                          'time': elapsed,
+                          'num_instrs': len(self._state.instrs)})
+
+
+register_pass('load_cse', LoadCSEOpt,
+              make=lambda state: LoadCSEOpt(state.context,
+                                            state.instrs,
+                                            state.get_analysis(Analysis.LIVENESS).get_live_intervals()),
+              requires=[Analysis.LIVENESS])
+
+register_pass('register_tmps', RegisterTmpOpt)
+
+register_pass('prefetch', PrefetchOpt)
+
+register_pass('hoist_invariants', HoistInvariantsOpt)
+
+register_pass('block_shared_invariants', BlockSharedInvariantsOpt)
+
+register_pass('shr_mem_padding', ShrMemPaddingOpt,
+              make=lambda state: ShrMemPaddingOpt(state.context, state.instrs),
+              invalidates=[Analysis.SHR_MEM_LAYOUT],
+              rewrites_ir=True)
+
+register_pass('liveness', LivenessAnalysis,
+              make=lambda state: LivenessAnalysis(state.context, state.instrs),
+              provides=Analysis.LIVENESS)
+
+register_pass('region_allocation', MemoryRegionAllocation,
+              make=lambda state: MemoryRegionAllocation(
+                state.context,
+                state.get_analysis(Analysis.LIVENESS).get_live_intervals()),
+              requires=[Analysis.LIVENESS],
+              provides=Analysis.REGIONS,
+              requires_final_ir=True)
+
+register_pass('region_shr_mem', ShrMemOpt,
+              make=lambda state: ShrMemOpt(context=state.context,
+                                           shr_mem_obj=state.shr_mem,
+                                           instructions=state.instrs,
+                                           regions=state.get_analysis(Analysis.REGIONS).get_regions()),
+              requires=[Analysis.REGIONS],
+              provides=Analysis.SHR_MEM_LAYOUT,
+              requires_final_ir=True)
+
+register_pass('interval_shr_mem', IntervalShrMemOpt,
+              make=lambda state: IntervalShrMemOpt(
+                context=state.context,
+                shr_mem_obj=state.shr_mem,
+                live_intervals=state.get_analysis(Analysis.LIVENESS).get_live_intervals()),
+              requires=[Analysis.LIVENESS, Analysis.SHR_MEM_LAYOUT],
+              requires_final_ir=True)
+
+# NOTE: barriers shift program points but keep the order of shr. mem. accesses. Thus,
+# inserting them is not considered as rewriting the IR w.r.t. shr. mem. allocation
+register_pass('sync_threads', SyncThreadsOpt,
+              make=lambda state: SyncThreadsOpt(state.context, state.instrs, state.num_threads),
+              requires=[Analysis.SHR_MEM_LAYOUT],
+              invalidates=[Analysis.LIVENESS],
+              rewrites_ir=False,
+              requires_final_ir=True)
+
+# NOTE: finalizers are not a part of any pipeline and always run last. GemmBuilder emits
+# a trailing ClearRegisters which does not compile for a scalar accumulator
+_finalizers: List[PassInfo] = [PassInfo('remove_redundancy',
+                                        make=lambda state: RemoveRedundancyOpt(state.context, state.instrs),
+                                        invalidates=[Analysis.LIVENESS])]
+
+
+def _default_pipeline(options) -> List[str]:
+  pipeline = []
+  if options.enable_load_cse:
+    pipeline.append('load_cse')
+  if options.enable_register_tmps:
+    pipeline.append('register_tmps')
+  if options.enable_prefetch:
+    pipeline.append('prefetch')
+  if options.enable_persistent_threads or options.enable_block_shared_invariants:
+    pipeline.append('hoist_invariants')
+  if options.enable_block_shared_invariants:
+    pipeline.append('block_shared_invariants')
+  if options.enable_shr_mem_padding:
+    pipeline.append('shr_mem_padding')
+  pipeline.extend(['liveness', 'region_allocation', 'region_shr_mem'])
+  if options.enable_interval_shr_mem_alloc:
+    pipeline.append('interval_shr_mem')
+  if options.enable_sync_threads_opt:
+    pipeline.append('sync_threads')
+  return pipeline
+
+
+def _override_options(options, **kwargs):
+  options = copy(options)
+  for name, value in kwargs.items():
+    setattr(options, name, value)
+  return options
+
+
+def _fast_pipeline(options) -> List[str]:
+  """Skips optimizations which are enabled by default. Explicitly enabled ones are kept"""
+  return _default_pipeline(_override_options(options,
+                                             enable_register_tmps=False,
+                                             enable_shr_mem_padding=False,
+                                             enable_interval_shr_mem_alloc=False,
+                                             enable_sync_threads_opt=False))
+
+
+def _aggressive_pipeline(options) -> List[str]:
+  """Runs all optimizations regardless of their options"""
+  return _default_pipeline(_override_options(options,
+                                             enable_load_cse=True,
+                                             enable_register_tmps=True,
+                                             enable_prefetch=True,
+                                             enable_shr_mem_padding=True,
+                                             enable_interval_shr_mem_alloc=True,
+                                             enable_sync_threads_opt=True))
+
+
+register_pipeline('default', _default_pipeline)
+register_pipeline('fast', _fast_pipeline)
+register_pipeline('aggressive', _aggressive_pipeline)
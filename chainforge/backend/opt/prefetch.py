@@ -0,0 +1,105 @@
+from typing import List, Dict
+from chainforge.backend.instructions import Gemm, SyncThreads, StoreRegToGlb
+from chainforge.backend.instructions import CommitAsyncCopies, WaitAsyncCopies
+from chainforge.backend.instructions.loaders import AbstractShrMemLoader
+from chainforge.backend.symbol import Symbol
+from .abstract import AbstractTransformer, Context, AbstractInstruction
+
+
+class PrefetchOpt(AbstractTransformer):
+  """Double-buffering of gemm operands.
+
+  Shr. mem. loaders of gemm `i + 1` are hoisted above gemm `i` (i.e., right after the loaders
+  of gemm `i`). Thus, global loads of both gemms are in flight at the same time. The hoisted
+  data is live during gemm `i`. As a result, LivenessAnalysis and MemoryRegionAllocation
+  place it into a separate shr. mem. region (i.e., the second buffer).
+
+  If the lexic supports async. copies on a given arch, loaders of each gemm form a group of
+  async. copies. A gemm waits only for its own groups and leaves the prefetched ones in flight.
+  """
+
+  def __init__(self, context: Context, instructions: List[AbstractInstruction]):
+    super(PrefetchOpt, self).__init__(context, instructions)
+
+  def apply(self) -> None:
+    self._hoist_loaders()
+
+    vm = self._context.get_vm()
+    if vm.lexic.supports_async_copy(vm.hw_descr.model):
+      self._make_async_copies()
+
+  def _hoist_loaders(self) -> None:
+    gemms = [instr for instr in self._instrs if isinstance(instr, Gemm)]
+    for current, next in zip(gemms[:-1], gemms[1:]):
+      begin = self._instrs.index(current)
+      end = self._instrs.index(next)
+      insertion_point = self._get_insertion_point(current)
+
+      loaders = []
+      for instr in self._instrs[begin:end]:
+        if isinstance(instr, AbstractShrMemLoader):
+          if not self._is_src_written(instr, self._instrs[insertion_point:self._instrs.index(instr)]):
+            loaders.append(instr)
+
+      for loader in loaders:
+        self._instrs.remove(loader)
+      self._instrs[insertion_point:insertion_point] = loaders
+
+  def _get_insertion_point(self, gemm: Gemm) -> int:
+    """Returns an index right before the barriers which precede a given gemm"""
+    index = self._instrs.index(gemm)
+    while index > 0 and isinstance(self._instrs[index - 1], (SyncThreads, WaitAsyncCopies)):
+      index -= 1
+    return index
+
+  def _is_src_written(self, loader: AbstractShrMemLoader, instrs: List[AbstractInstruction]) -> bool:
+    src_matrix = loader.get_src().obj
+    for instr in instrs:
+      if isinstance(instr, StoreRegToGlb):
+        for dest in instr.get_dests():
+          dest_matrix = dest.obj
+          is_aliased = src_matrix.alias is not None and src_matrix.alias == dest_matrix.alias
+          if dest_matrix is src_matrix or is_aliased:
+            return True
+    return False
+
+  def _make_async_copies(self) -> None:
+    # NOTE: loaders are grouped by the gemm which consumes their data
+    consumers: Dict[Symbol, Gemm] = {}
+    for instr in self._instrs:
+      if isinstance(instr, Gemm):
+        for operand in [instr.get_op1(), instr.get_op2()]:
+          consumers.setdefault(operand, instr)
+
+    groups: List[List[AbstractShrMemLoader]] = []
+    group_consumer = None
+    for instr in self._instrs:
+      if isinstance(instr, AbstractShrMemLoader):
+        instr.set_async(True)
+        consumer = consumers[instr.get_dest()]
+        if not groups or consumer is not group_consumer:
+          groups.append([])
+          group_consumer = consumer
+        groups[-1].append(instr)
+
+    for group in groups:
+      index = self._instrs.index(group[-1])
+      self._instrs.insert(index + 1, CommitAsyncCopies(self._context))
+
+    pending: List[List[Symbol]] = []
+    num_commits = 0
+    for instr in list(self._instrs):
+      if isinstance(instr, CommitAsyncCopies):
+        pending.append([loader.get_dest() for loader in groups[num_commits]])
+        num_commits += 1
+        continue
+
+      if isinstance(instr, Gemm):
+        operands = [instr.get_op1(), instr.get_op2()]
+        needed = [index for index, dests in enumerate(pending) if set(dests) & set(operands)]
+        if needed:
+          last = max(needed)
+          completed = [symbol for dests in pending[:last + 1] for symbol in dests]
+          wait = WaitAsyncCopies(self._context, num_pending=len(pending) - last - 1, dests=completed)
+          self._instrs.insert(self._get_insertion_point(instr), wait)
+          pending = pending[last + 1:]
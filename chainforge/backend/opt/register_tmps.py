@@ -0,0 +1,95 @@
+from typing import List, Tuple
+from copy import deepcopy
+from chainforge.backend.instructions import Gemm, RegisterGemm, StoreRegToShr, StoreRegToReg
+from chainforge.backend.instructions.allocate import RegisterAlloc
+from chainforge.backend.data_types import RegMemObject
+from chainforge.backend.symbol import Symbol, SymbolType
+from .abstract import AbstractTransformer, Context, AbstractInstruction
+
+
+class RegisterTmpOpt(AbstractTransformer):
+  """Keeps temporaries in registers if they do not need to be exchanged between threads.
+
+  A gemm with a trivial register tile leaves row `i` of its result in registers of thread `i`.
+  If the only user of the result is a gemm which takes it as non-transposed `op1`, the same
+  thread reads the same row. In this case, the row is copied to a second register array and
+  the consumer reads it from there. Thus, the store to shr. mem. and the barriers around it
+  are not needed.
+
+  Note, all such temporaries share a single register array. Thus, their lifetimes must not overlap
+  """
+
+  def __init__(self, context: Context, instructions: List[AbstractInstruction]):
+    super(RegisterTmpOpt, self).__init__(context, instructions)
+    self._num_replaced: int = 0
+
+  def apply(self) -> None:
+    candidates = self._find_candidates()
+    self._num_replaced = len(candidates)
+    if not candidates:
+      return
+
+    size = max([store.get_dest().data_view.get_dim_size(1) for store, _ in candidates])
+    regs, alloc = self._make_register_array(size)
+
+    replacements = {}
+    for store, consumer in candidates:
+      tmp = store.get_dest()
+      regs.data_view = deepcopy(tmp.data_view)
+      replacements[id(store)] = StoreRegToReg(context=self._context,
+                                              src=store.get_src(),
+                                              dest=regs,
+                                              num_elements=tmp.data_view.get_dim_size(1))
+      replacements[id(consumer)] = RegisterGemm(context=self._context,
+                                                trans_b=consumer.is_trans_b(),
+                                                op1=regs,
+                                                op2=consumer.get_op2(),
+                                                dest=consumer.get_dest(),
+                                                prefer_align=consumer.is_prefer_align(),
+                                                op2_values=consumer.get_op2_values())
+      for symbol in [store.get_src(), store.get_shr_mem()]:
+        symbol.remove_user(store)
+      for symbol in [consumer.get_op2(), consumer.get_dest()]:
+        symbol.remove_user(consumer)
+
+    last_alloc = [instr for instr in self._instrs if isinstance(instr, RegisterAlloc)][-1]
+    instrs = []
+    for instr in self._instrs:
+      instrs.append(replacements.get(id(instr), instr))
+      if instr is last_alloc:
+        instrs.append(alloc)
+    self._instrs = instrs
+
+  def get_num_replaced(self) -> int:
+    return self._num_replaced
+
+  def _find_candidates(self) -> List[Tuple[StoreRegToShr, Gemm]]:
+    candidates = []
+    busy_until = -1
+    positions = {id(instr): index for index, instr in enumerate(self._instrs)}
+    for index, instr in enumerate(self._instrs):
+      if type(instr) is not StoreRegToShr or index <= busy_until:
+        continue
+
+      src_view = instr.get_src().data_view
+      if not instr.get_register_tile().is_trivial(src_view.get_dim_size(1)) or src_view.get_offset():
+        continue
+
+      tmp = instr.get_dest()
+      users = [user for user in tmp.get_user_list() if user is not instr]
+      if len(users) != 1 or type(users[0]) is not Gemm:
+        continue
+
+      consumer = users[0]
+      if consumer.get_op1() is not tmp or consumer.get_op2() is tmp or consumer.is_trans_a():
+        continue
+
+      candidates.append((instr, consumer))
+      busy_until = positions[id(consumer)]
+    return candidates
+
+  def _make_register_array(self, size: int) -> Tuple[Symbol, RegisterAlloc]:
+    num_arrays = len([instr for instr in self._instrs if isinstance(instr, RegisterAlloc)])
+    name = f'reg{num_arrays}'
+    regs = Symbol(name, SymbolType.Register, RegMemObject(name, size))
+    return regs, RegisterAlloc(self._context, regs, size)
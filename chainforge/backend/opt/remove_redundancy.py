@@ -1,5 +1,6 @@
 from typing import List
-from chainforge.backend.instructions import StoreRegToGlb
+from chainforge.backend.instructions import StoreRegToGlb, ClearRegisters, GetElementPtr, Gemm
+from chainforge.backend.instructions.allocate import ShrMemAlloc
 from .abstract import AbstractTransformer, Context, AbstractInstruction
 
 
@@ -11,11 +12,13 @@ class RemoveRedundancyOpt(AbstractTransformer):
 
   def apply(self) -> None:
     self._remove_bottom_instrs()
+    self._remove_unused_ptrs()
+    self._remove_unused_shr_mem()
 
   def _remove_bottom_instrs(self):
     """
     The last instruction - i.e., clean register - produced by GemmBuilder is redundant and
-    can be removed
+    can be removed unless the kernel is persistent
     """
     num_remove_instrs = 0
     for reversed_index, instr in enumerate(reversed(self._instrs)):
@@ -23,5 +26,38 @@ class RemoveRedundancyOpt(AbstractTransformer):
       if isinstance(instr, StoreRegToGlb):
         break
 
-    for index in range(num_remove_instrs - 1):
-      self._instrs.pop(-1)
+    bottom_instrs = [self._instrs.pop(-1) for _ in range(num_remove_instrs - 1)]
+
+    # NOTE: a persistent kernel reuses registers for the next batch element
+    if self._context.get_user_options().enable_persistent_threads:
+      for instr in reversed(bottom_instrs):
+        if isinstance(instr, ClearRegisters):
+          self._instrs.append(instr)
+
+  def _remove_unused_ptrs(self):
+    """
+    A pointer to a constant matrix is not needed if all gemms take its values as immediates
+    """
+    self._instrs = [instr for instr in self._instrs if not self._is_unused_ptr(instr)]
+
+  def _remove_unused_shr_mem(self):
+    """
+    Shr. mem. is not allocated if nothing is placed there (e.g., all operands are constant)
+    """
+    self._instrs = [instr for instr in self._instrs
+                    if not (isinstance(instr, ShrMemAlloc) and self._has_no_other_users(instr))]
+
+  def _has_no_other_users(self, instr: ShrMemAlloc) -> bool:
+    return all([user is instr for user in instr.get_dest().get_user_list()])
+
+  def _is_unused_ptr(self, instr: AbstractInstruction) -> bool:
+    if not isinstance(instr, GetElementPtr) or instr.get_constant_name() is None:
+      return False
+
+    dest = instr.get_dest()
+    for user in dest.get_user_list():
+      is_immediate = isinstance(user, Gemm) and user.get_op2_values() is not None
+      if user is instr or (is_immediate and user.get_op1() is not dest):
+        continue
+      return False
+    return True
@@ -1,7 +1,6 @@
-from typing import List, Dict, Union, Tuple, Set
-from chainforge.backend.instructions import StoreRegToShr
+from typing import List, Union, Tuple
+from chainforge.backend.instructions import StoreRegToShr, AbstractInstruction
 from chainforge.backend.instructions.loaders import AbstractShrMemLoader
-from chainforge.backend.symbol import Symbol
 from chainforge.backend.data_types import ShrMemObject
 from chainforge.backend.exceptions import GenerationError
 from .abstract import AbstractOptStage, Context
@@ -13,22 +12,28 @@ class ShrMemOpt(AbstractOptStage):
                context: Context,
                shr_mem_obj: ShrMemObject,
                regions: List[Region],
-               live_map: Dict[int, Set[Symbol]]):
+               instructions: Union[List[AbstractInstruction], None] = None):
     super(ShrMemOpt, self).__init__(context)
 
     self._shr_mem_obj: ShrMemObject = shr_mem_obj
     self._regions: List[Region] = regions
-    self._live_map: Dict[int, Set[Symbol]] = live_map
+    self._instrs: List[AbstractInstruction] = instructions if instructions else []
+    self._size: int = 0
 
   def apply(self) -> None:
     self._check_regions()
+    self._assign_block_shared_offsets()
 
     max_memory, mem_per_region = self._compute_total_shr_mem_size()
     self._shr_mem_obj.set_size_per_mult(max_memory)
+    self._size = max_memory
 
     offsets = self._compute_start_addresses(mem_per_region)
     self._assign_offsets(offsets)
 
+  def get_size(self) -> int:
+    return self._size
+
   def _check_regions(self) -> None:
     for region in self._regions:
       for symbol in region:
@@ -52,7 +57,7 @@ class ShrMemOpt(AbstractOptStage):
     num_regions: int = len(mem_per_region)
     offsets: List[int] = [0] * num_regions
     for index in range(1, num_regions):
-      offsets[index] += mem_per_region[index - 1]
+      offsets[index] = offsets[index - 1] + mem_per_region[index - 1]
     return offsets
 
   def _assign_offsets(self, offsets: List[int]):
@@ -60,3 +65,18 @@ class ShrMemOpt(AbstractOptStage):
       for symbol in region:
         shr_mem_instr = symbol.get_fist_user()
         shr_mem_instr.set_shr_mem_offset(offset)
+
+  def _assign_block_shared_offsets(self) -> None:
+    """Places block-shared symbols one after another. They are not a part of any region"""
+    offset = 0
+    for instr in self._instrs:
+      if isinstance(instr, AbstractShrMemLoader) and instr.is_block_shared():
+        if offset:
+          _, offset = self._context.align_range(0, offset)
+        instr.set_shr_mem_offset(offset)
+        offset += instr.compute_shared_mem_size()
+
+    # NOTE: per-mult. regions follow the block-shared one and must stay aligned
+    if offset:
+      _, offset = self._context.align_range(0, offset)
+    self._shr_mem_obj.set_block_shared_size(offset)
@@ -1,19 +1,24 @@
-from typing import List
-from chainforge.backend.instructions import Gemm, SyncThreads, AbstractShrMemWrite
-from chainforge.backend.symbol import SymbolType
+from typing import List, Tuple
+from chainforge.backend.instructions import Gemm, SyncThreads, AbstractShrMemWrite, WaitAsyncCopies
+from chainforge.backend.symbol import Symbol, SymbolType
 from .abstract import AbstractTransformer, Context, AbstractInstruction
-from .mem_region_allocation import Region
+from .hoist_invariants import is_block_shared
 
 
 class SyncThreadsOpt(AbstractTransformer):
+  """Inserts barriers only where threads of a mult. exchange data via shr. mem.
+
+  Note, the pass must run after shr. mem. offsets have been assigned. Symbols interfere if their
+  address ranges overlap. Block-shared symbols are written once, before a block-wide barrier
+  emitted by the generator, and are skipped
+  """
+
   def __init__(self,
                context: Context,
                instructions: List[AbstractInstruction],
-               regions: List[Region],
                num_threads: int):
 
     super(SyncThreadsOpt, self).__init__(context, instructions)
-    self._regions = regions
     self._num_threads = num_threads
 
   def apply(self) -> None:
@@ -23,47 +28,56 @@ class SyncThreadsOpt(AbstractTransformer):
 
   def _insert_sync_before_use(self):
     selected = []
-    writes = []
-    for index, instr in enumerate(self._instrs):
-      if isinstance(instr, AbstractShrMemWrite):
-        writes.append(instr.get_dest())
+    writes = set()
+    for instr in self._instrs:
+      if isinstance(instr, AbstractShrMemWrite) and not instr.is_async():
+        if not is_block_shared(instr.get_dest()):
+          writes.add(instr.get_dest())
+
+      # NOTE: async. writes are complete only after a corresponding wait
+      if isinstance(instr, WaitAsyncCopies):
+        writes.update(instr.get_dests())
 
       if isinstance(instr, Gemm):
         if instr.get_op1() in writes or instr.get_op2() in writes:
           selected.append(instr)
-          writes = []
+          writes = set()
 
     self._insert_sync_instrs(selected)
 
   def _insert_sync_after_use(self):
     selected = []
-    flags = [False] * len(self._regions)
-    for index, instr in enumerate(self._instrs):
+    reads = []
+    for instr in self._instrs:
       if isinstance(instr, Gemm):
         for src in [instr.get_op1(), instr.get_op2()]:
-          if src.stype == SymbolType.SharedMem:
-            flags[self._get_region_id(src)] = True
+          if src.stype == SymbolType.SharedMem and not is_block_shared(src):
+            reads.append(self._get_address_range(src))
 
       if isinstance(instr, SyncThreads):
-        flags = [False] * len(self._regions)
+        reads = []
 
-      if isinstance(instr, AbstractShrMemWrite):
-        dest = instr.get_dest()
-        if flags[self._get_region_id(dest)]:
+      if isinstance(instr, AbstractShrMemWrite) and not is_block_shared(instr.get_dest()):
+        begin, end = self._get_address_range(instr.get_dest())
+        if any([begin < read_end and read_begin < end for read_begin, read_end in reads]):
           selected.append(instr)
-          flags = [False] * len(self._regions)
+          reads = []
 
     self._insert_sync_instrs(selected)
 
   def _insert_sync_instrs(self, selected):
-    for instr in selected:
-      index = self._instrs.index(instr)
-      self._instrs.insert(index, SyncThreads(self._context, self._num_threads))
-
-  def _get_region_id(self, symbol):
-    for region_id, region in enumerate(self._regions):
-      if symbol in region:
-        return region_id
+    selected = set([id(instr) for instr in selected])
+    instrs = []
+    for instr in self._instrs:
+      if id(instr) in selected:
+        instrs.append(SyncThreads(self._context, self._num_threads))
+      instrs.append(instr)
+    self._instrs = instrs
+
+  def _get_address_range(self, symbol: Symbol) -> Tuple[int, int]:
+    shr_mem_instr = symbol.get_fist_user()
+    begin = shr_mem_instr.get_shr_mem_offset()
+    return begin, begin + shr_mem_instr.compute_shared_mem_size()
 
   def _remove_previous_sync_instructions(self):
     self._instrs = [item for item in self._instrs if not isinstance(item, SyncThreads)]
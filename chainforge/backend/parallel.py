@@ -0,0 +1,96 @@
+import os
+from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Type, Union, Dict, Tuple
+from chainforge.common import GemmDescr, Context
+from .generator import Generator
+from .thread_block_policies import AbstractThreadBlockPolicy, OccupancyThreadBlockPolicy
+from .cache import KernelCache, CacheEntry
+
+
+def _generate(generator: Generator) -> Generator:
+  generator.generate()
+  return generator
+
+
+def generate_many(list_of_gemm_lists: List[List[GemmDescr]],
+                  context: Context,
+                  workers: Union[int, None] = None,
+                  kernel_names: Union[List[Union[str, None]], None] = None,
+                  thread_block_policy_type: Type[AbstractThreadBlockPolicy] = OccupancyThreadBlockPolicy,
+                  cache: Union[KernelCache, None] = None) -> List[Generator]:
+  """Generates kernels for independent gemm lists using a pool of processes
+
+  Args:
+    list_of_gemm_lists: gemm lists, each of which results in a separate kernel
+    context: generation context shared by all kernels
+    workers: max. number of processes. `None` means the number of available cpus
+    kernel_names: optional kernel names, given in the same order as `list_of_gemm_lists`
+    thread_block_policy_type: thread-block policy used by all generators
+    cache: optional kernel cache. It is accessed only by the calling process
+
+  Returns:
+    generated generators in the input order. Identical chains are generated only once.
+    Requesters with the same kernel name share the same generator. Otherwise, they get
+    renamed copies of it
+  """
+  if kernel_names is None:
+    kernel_names = [None] * len(list_of_gemm_lists)
+
+  if len(kernel_names) != len(list_of_gemm_lists):
+    raise ValueError(f'expected {len(list_of_gemm_lists)} kernel names, given {len(kernel_names)}')
+
+  # NOTE: matrices can be shared between different gemm lists whereas a generator
+  # renames all matrices of its list. Thus, each generator must own its matrices
+  fingerprints: List[str] = []
+  requesters: List[Generator] = []
+  unique_generators: Dict[str, Generator] = {}
+  for gemm_list, kernel_name in zip(list_of_gemm_lists, kernel_names):
+    generator = Generator(deepcopy(gemm_list), context, thread_block_policy_type)
+    if kernel_name:
+      generator.set_kernel_name(kernel_name)
+    generator.register()
+
+    # NOTE: chains which differ only in their kernel names are generated once and renamed afterwards
+    fingerprint = generator.get_fingerprint(with_name=False)
+    fingerprints.append(fingerprint)
+    requesters.append(generator)
+    if fingerprint not in unique_generators:
+      unique_generators[fingerprint] = generator
+
+  jobs: Dict[str, Generator] = {}
+  for fingerprint, generator in unique_generators.items():
+    if cache is not None and generator.get_fingerprint() in cache:
+      generator.set_cache(cache)
+      generator.generate()
+    else:
+      jobs[fingerprint] = generator
+
+  if workers is None:
+    workers = os.cpu_count()
+  workers = max(1, min(workers, len(jobs)))
+
+  if workers == 1:
+    results = [_generate(generator) for generator in jobs.values()]
+  else:
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+      results = list(executor.map(_generate, jobs.values()))
+
+  for fingerprint, generator in zip(jobs.keys(), results):
+    unique_generators[fingerprint] = generator
+    if cache is not None:
+      cache.put(generator.get_fingerprint(), CacheEntry(kernel=generator.get_kernel(),
+                                                        launcher=generator.get_launcher(),
+                                                        header=generator.get_header()))
+
+  generators: Dict[Tuple[str, str], Generator] = {}
+  for fingerprint, requester in zip(fingerprints, requesters):
+    key = (fingerprint, requester.get_base_name())
+    if key not in generators:
+      generator = unique_generators[fingerprint]
+      if generator.get_base_name() != requester.get_base_name():
+        requester.adopt_src(generator)
+        generator = requester
+      generators[key] = generator
+  return [generators[(fingerprint, requester.get_base_name())]
+          for fingerprint, requester in zip(fingerprints, requesters)]
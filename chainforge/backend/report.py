@@ -0,0 +1,180 @@
+import json
+from typing import List, Dict, Union
+from chainforge.common import Context, GemmDescr, FloatingPointType
+from .data_types import ShrMemObject
+from .symbol import SymbolType
+from .instructions import AbstractInstruction, Gemm, StoreRegToShr, StoreRegToGlb, SyncThreads
+from .instructions.allocate import RegisterAlloc
+from .instructions.loaders import AbstractShrMemLoader, ExactPatchLoader, ExactTransposePatchLoader
+from .occupancy import compute_occupancy
+from .opt.bank_conflicts import BankConflictAnalysis
+
+
+class KernelReport:
+  """Static performance model of a generated kernel.
+
+  Memory traffic is counted per batch element from the final instruction list.
+  If peak performance (flop/s) and memory bandwidth (byte/s) are provided, the report
+  also contains a roofline estimate of the execution time.
+  """
+
+  def __init__(self,
+               context: Context,
+               instructions: List[AbstractInstruction],
+               gemm_list: List[GemmDescr],
+               shr_mem_obj: ShrMemObject,
+               num_threads: int,
+               shr_mem_sizes: Union[Dict[str, int], None] = None,
+               name: Union[str, None] = None,
+               peak_flops: Union[float, None] = None,
+               mem_bandwidth: Union[float, None] = None):
+    self._context: Context = context
+    self._instrs: List[AbstractInstruction] = instructions
+    self._gemm_list: List[GemmDescr] = gemm_list
+    self._shr_mem_obj: ShrMemObject = shr_mem_obj
+    self._num_threads: int = num_threads
+    self._shr_mem_sizes: Dict[str, int] = shr_mem_sizes if shr_mem_sizes else {}
+    self._name: Union[str, None] = name
+    self._peak_flops: Union[float, None] = peak_flops
+    self._mem_bandwidth: Union[float, None] = mem_bandwidth
+    self._fp_size: int = 4 if context.fp_type == FloatingPointType.FLOAT else 8
+
+    self.glb_loads: int = 0
+    self.glb_load_instrs: int = 0
+    self.glb_stores: int = 0
+    self.shr_loads: int = 0
+    self.shr_stores: int = 0
+    self.issued_flops: int = 0
+    self.num_barriers: int = 0
+    self.num_regs: int = 0
+    self._bank_conflicts = BankConflictAnalysis(context, instructions)
+
+    self._analyze()
+    self._bank_conflicts.apply()
+
+  def _analyze(self) -> None:
+    for instr in self._instrs:
+      if isinstance(instr, AbstractShrMemLoader):
+        if isinstance(instr, (ExactPatchLoader, ExactTransposePatchLoader)):
+          src_view = instr.get_src().data_view
+          num_loads = src_view.get_dim_size(0) * src_view.get_dim_size(1)
+        else:
+          num_loads = instr.get_shm_volume()
+        self.glb_loads += num_loads
+        width = instr.get_vector_width()
+        self.glb_load_instrs += num_loads // width + num_loads % width
+        self.shr_stores += num_loads
+
+      elif isinstance(instr, Gemm):
+        op1_loads, op2_loads = instr.get_num_operand_loads()
+        self._count_reads(instr.get_op1(), op1_loads)
+        self._count_reads(instr.get_op2(), op2_loads)
+        self.issued_flops += instr.get_num_issued_flops()
+
+      elif isinstance(instr, StoreRegToShr):
+        self.shr_stores += self._get_store_volume(instr)
+
+      elif isinstance(instr, StoreRegToGlb):
+        volume = self._get_store_volume(instr)
+        self.glb_stores += volume
+        if instr.get_beta() != 0.0:
+          self.glb_loads += volume
+          self.glb_load_instrs += volume
+
+        num_reads = len(instr.get_addends()) * volume
+        num_reads += len([beta for _, beta in instr.get_outputs() if beta != 0.0]) * volume
+        num_reads += 0 if instr.get_scale() is None else 1
+        self.glb_loads += num_reads
+        self.glb_load_instrs += num_reads
+        self.glb_stores += len(instr.get_outputs()) * volume
+
+      elif isinstance(instr, SyncThreads):
+        self.num_barriers += 1
+
+      elif isinstance(instr, RegisterAlloc):
+        self.num_regs += instr.get_dest().obj.size * (self._fp_size // 4)
+
+  def _count_reads(self, symbol, num_reads) -> None:
+    if symbol.stype == SymbolType.SharedMem:
+      self.shr_loads += num_reads
+    elif symbol.stype != SymbolType.Register:
+      self.glb_loads += num_reads
+      self.glb_load_instrs += num_reads
+
+  def _get_store_volume(self, instr) -> int:
+    src_bbox = instr.get_src().data_view.get_bbox()
+    num_rows = src_bbox[2] - src_bbox[0]
+    return num_rows * instr.get_dest().data_view.get_dim_size(1)
+
+  def get_flops(self) -> int:
+    return sum([gemm.compute_flops() for gemm in self._gemm_list])
+
+  def get_glb_bytes(self) -> int:
+    return (self.glb_loads + self.glb_stores) * self._fp_size
+
+  def get_arithmetic_intensity(self) -> float:
+    glb_bytes = self.get_glb_bytes()
+    return self.get_flops() / glb_bytes if glb_bytes else float('inf')
+
+  def get_shr_mem_per_block(self) -> int:
+    return self._shr_mem_obj.get_total_size() * self._fp_size
+
+  def get_threads_per_block(self) -> int:
+    return self._num_threads * self._shr_mem_obj.get_mults_per_block()
+
+  def to_dict(self) -> Dict[str, object]:
+    hw_descr = self._context.get_vm().hw_descr
+    occupancy = compute_occupancy(hw_descr,
+                                  threads_per_block=self.get_threads_per_block(),
+                                  shr_mem_per_block=self.get_shr_mem_per_block(),
+                                  regs_per_thread=self.num_regs)
+
+    report = {
+      'name': self._name,
+      'arch': hw_descr.model,
+      'backend': hw_descr.backend,
+      'fp_type': self._context.fp_as_str(),
+      'num_gemms': len(self._gemm_list),
+      'per_element': {
+        'flops': self.get_flops(),
+        'issued_flops': self.issued_flops,
+        'glb_loads': self.glb_loads,
+        'glb_load_instrs': self.glb_load_instrs,
+        'glb_stores': self.glb_stores,
+        'glb_bytes': self.get_glb_bytes(),
+        'shr_loads': self.shr_loads,
+        'shr_stores': self.shr_stores,
+        'shr_mem_bytes': self._shr_mem_obj.get_size_per_mult() * self._fp_size,
+        'num_barriers': self.num_barriers,
+      },
+      'block': {
+        'threads_per_mult': self._num_threads,
+        'mults_per_block': self._shr_mem_obj.get_mults_per_block(),
+        'threads_per_block': self.get_threads_per_block(),
+        'shr_mem_bytes': self.get_shr_mem_per_block(),
+        'regs_per_thread': self.num_regs,
+      },
+      'occupancy': occupancy.to_dict(),
+      'shr_mem_allocation': {f'{strategy}_bytes': size * self._fp_size
+                             for strategy, size in self._shr_mem_sizes.items()},
+      'bank_conflicts': {
+        'max_degree': self._bank_conflicts.get_max_degree(),
+        'accesses': self._bank_conflicts.get_records(),
+      },
+      'arithmetic_intensity': self.get_arithmetic_intensity(),
+    }
+
+    if self._peak_flops and self._mem_bandwidth:
+      attainable = min(self._peak_flops, self.get_arithmetic_intensity() * self._mem_bandwidth)
+      report['roofline'] = {
+        'peak_flops': self._peak_flops,
+        'mem_bandwidth': self._mem_bandwidth,
+        'ridge_point': self._peak_flops / self._mem_bandwidth,
+        'attainable_flops': attainable,
+        'time_per_element': self.get_flops() / attainable,
+        'is_memory_bound': attainable < self._peak_flops,
+      }
+    return report
+
+  def to_json(self, indent: Union[int, None] = 2) -> str:
+    return json.dumps(self.to_dict(), indent=indent)
@@ -6,10 +6,12 @@ from .symbol import Symbol
 class InverseSymbolTable:
   def __init__(self):
     self._symbols = {}
+    self._names = {}
 
   def pop(self, obj):
     if obj in self._symbols:
-      self._symbols.pop(obj)
+      symbol = self._symbols.pop(obj)
+      self._remove_name(symbol.name)
 
   def items(self):
     return self._symbols.items()
@@ -20,8 +22,19 @@ class InverseSymbolTable:
   def keys(self):
     return self._symbols.keys()
 
+  def has_name(self, name) -> bool:
+    return name in self._names
+
   def __setitem__(self, obj, symbol: Symbol):
+    if obj in self._symbols:
+      self._remove_name(self._symbols[obj].name)
     self._symbols[obj] = symbol
+    self._names[symbol.name] = self._names.get(symbol.name, 0) + 1
+
+  def _remove_name(self, name):
+    self._names[name] -= 1
+    if not self._names[name]:
+      self._names.pop(name)
 
   def __getitem__(self, obj):
     return self._symbols[obj]
@@ -112,7 +125,6 @@ class Scopes:
     return '\n'.join(data)
 
   def _does_name_exist(self, scope_list: List[InverseSymbolTable], name: str):
-    for scope_level, scope in enumerate(scope_list):
-      for item in scope.values():
-        if item.name == name:
-          raise InternalError(f'name has already been occupied: {item.name} - {name}')
+    for scope in scope_list:
+      if scope.has_name(name):
+        raise InternalError(f'name has already been occupied: {name} - {name}')
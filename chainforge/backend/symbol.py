@@ -30,6 +30,12 @@ class DataView:
     self._bbox = bbox
     self._offset = self.get_offset()
 
+  def reset_lead_dim(self, lead_dim):
+    assert lead_dim >= self._bbox[2]
+    self._rows = lead_dim
+    self._lead_dim = lead_dim
+    self._offset = self.get_offset()
+
   def get_offset(self):
     return self._bbox[0] + self._bbox[1] * self._lead_dim
 
@@ -43,6 +49,9 @@ class DataView:
     assert index >= 0 and index < 2
     return self._bbox[2 + index] - self._bbox[index]
 
+  def get_element_address(self, row, column):
+    return self._offset + row + column * self._lead_dim
+
   def get_address(self, row_idx, column_idx):
     addr = f'{row_idx} + {column_idx} * {self._lead_dim}'
     if self._offset:
@@ -67,6 +76,9 @@ class Symbol:
   def add_user(self, user):
     self._users.append(user)
 
+  def remove_user(self, user):
+    self._users = [item for item in self._users if item is not user]
+
   def get_user_list(self):
     # set by instructions
     return self._users
@@ -1,28 +1,118 @@
 from abc import ABC, abstractmethod
-from chainforge.common import Context
+from typing import Union, Type
+from chainforge.common import Context, FloatingPointType
+from .occupancy import compute_occupancy, Occupancy
 
 
 class AbstractThreadBlockPolicy(ABC):
-  def __init__(self, context: Context, mem_per_mult: int, num_threads: int):
+  def __init__(self, context: Context, mem_per_mult: int, num_threads: int, block_shared_size: int = 0):
     self._context: Context = context
     self._mem_per_mult: int = mem_per_mult
     self._num_threads: int = num_threads
+    self._block_shared_size: int = block_shared_size
 
     vm = self._context.get_vm()
     self._max_blocks = vm.hw_descr.max_block_per_sm
     self._max_allowed_mem = vm.hw_descr.max_local_mem_size_per_block
+    self._max_threads_per_sm = vm.hw_descr.max_threads_per_sm
+    self._max_threads_per_block = vm.hw_descr.max_threads_per_block
 
   @abstractmethod
   def get_num_mults_per_block(self):
     pass
 
+  def get_meta_data(self) -> Union[str, None]:
+    return None
+
 
 class SimpleThreadBlockPolicy(AbstractThreadBlockPolicy):
-  def __init__(self, context, mem_size_per_mult, num_threads):
-    super().__init__(context, mem_size_per_mult, num_threads)
+  def __init__(self, context, mem_size_per_mult, num_threads, block_shared_size=0):
+    super().__init__(context, mem_size_per_mult, num_threads, block_shared_size)
 
   def get_num_mults_per_block(self):
     if self._num_threads <= 32:
       return 2
     else:
       return 1
+
+
+class OccupancyThreadBlockPolicy(AbstractThreadBlockPolicy):
+  """Selects num. mults per block which maximizes resident warps per SM
+  under shared memory, thread and block limits.
+
+  Note: several mults are packed into a block only if a mult fits into a single warp.
+  Otherwise, a mult needs block-wide barriers which would diverge for partially filled
+  (or flag-masked) blocks.
+  """
+
+  def __init__(self, context, mem_size_per_mult, num_threads, block_shared_size=0):
+    super().__init__(context, mem_size_per_mult, num_threads, block_shared_size)
+    self._fp_size = 4 if context.fp_type == FloatingPointType.FLOAT else 8
+    self._hw_descr = context.get_vm().hw_descr
+    self._num_mults: Union[int, None] = None
+    self._occupancy: Union[Occupancy, None] = None
+
+  def get_num_mults_per_block(self):
+    if self._num_mults is None:
+      self._select()
+    return self._num_mults
+
+  def get_meta_data(self) -> Union[str, None]:
+    self.get_num_mults_per_block()
+    text = f'mults per block: {self._num_mults}; '
+    text += f'occupancy: {self._occupancy.get_ratio():.2f} '
+    text += f'({self._occupancy.active_warps_per_sm}/{self._occupancy.max_warps_per_sm} warps), '
+    text += f'limited by {self._occupancy.limiting_factor}'
+    return text
+
+  def _select(self) -> None:
+    max_mults = 1
+    if self._num_threads <= self._hw_descr.vec_unit_length:
+      max_mults = max(1, self._max_threads_per_block // self._num_threads)
+
+    for num_mults in range(1, max_mults + 1):
+      shr_mem_per_block = (self._block_shared_size + self._mem_per_mult * num_mults) * self._fp_size
+      if num_mults > 1 and shr_mem_per_block > self._max_allowed_mem:
+        break
+
+      occupancy = compute_occupancy(self._hw_descr,
+                                    threads_per_block=num_mults * self._num_threads,
+                                    shr_mem_per_block=shr_mem_per_block)
+
+      # NOTE: prefer smaller blocks if occupancy is the same
+      if self._occupancy is None or occupancy.active_warps_per_sm > self._occupancy.active_warps_per_sm:
+        self._num_mults = num_mults
+        self._occupancy = occupancy
+
+
+class FixedThreadBlockPolicy(AbstractThreadBlockPolicy):
+  """Packs a given num. mults into a block (see `with_num_mults`).
+
+  The num. is reduced if a mult does not fit into a single warp (see OccupancyThreadBlockPolicy),
+  if a block exceeds the max. num. threads or if its shared memory exceeds the hardware limit
+  """
+  num_mults: int = 1
+
+  def __init__(self, context, mem_size_per_mult, num_threads, block_shared_size=0):
+    super().__init__(context, mem_size_per_mult, num_threads, block_shared_size)
+    self._fp_size = 4 if context.fp_type == FloatingPointType.FLOAT else 8
+    self._hw_descr = context.get_vm().hw_descr
+
+  @classmethod
+  def with_num_mults(cls, num_mults: int) -> Type['FixedThreadBlockPolicy']:
+    return type(f'{cls.__name__}{num_mults}', (cls,), {'num_mults': num_mults})
+
+  def get_num_mults_per_block(self):
+    if self._num_threads > self._hw_descr.vec_unit_length:
+      return 1
+
+    num_mults = max(1, min(self.num_mults, self._max_threads_per_block // self._num_threads))
+    while num_mults > 1:
+      shr_mem_per_block = (self._block_shared_size + self._mem_per_mult * num_mults) * self._fp_size
+      if shr_mem_per_block <= self._max_allowed_mem:
+        break
+      num_mults -= 1
+    return num_mults
+
+  def get_meta_data(self) -> Union[str, None]:
+    return f'mults per block: {self.get_num_mults_per_block()} (requested: {self.num_mults})'
@@ -1 +1,2 @@
 from .writer import Writer, Block
+from .lane_writer import LaneWriter
@@ -0,0 +1,111 @@
+import re
+from io import StringIO
+from typing import Dict, List, Union
+from .writer import Writer
+
+
+class LaneBlock:
+  def __init__(self, writer, block_name=None):
+    self.writer = writer
+    self.block_name = block_name
+
+  def __enter__(self):
+    if self.writer.is_outermost():
+      self.writer.begin_lanes()
+    if self.block_name:
+      self.writer(self.block_name)
+    self.writer('{')
+    self.writer.mv_right()
+    self.writer.depth += 1
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    self.writer.depth -= 1
+    self.writer.mv_left()
+    self.writer('}')
+    if self.writer.is_outermost():
+      self.writer.end_lanes()
+
+  def __call__(self, line):
+    self.writer(line)
+
+
+class LaneWriter(Writer):
+  """Writes code of all threads of a block as loops over SIMD lanes of a single host thread.
+
+  Each block which an instruction opens at its top level becomes a loop over lanes where
+  the lane index is `lane_idx`. Lines outside of blocks (e.g., pointers to shr. mem.) do not
+  depend on a thread and are written once. Registers are stored per lane and bound to their
+  names inside each loop which accesses them. Instructions are executed one after another
+  by all lanes. Thus, barriers are not needed
+  """
+
+  def __init__(self, writer: Writer, lane_idx: str, num_lanes: int, fp_as_str: str, simd_kw: Union[str, None]):
+    super(LaneWriter, self).__init__(writer.factor)
+    self.depth: int = 0
+    self._writer: Writer = writer
+    self._lane_idx: str = lane_idx
+    self._num_lanes: int = num_lanes
+    self._fp_as_str: str = fp_as_str
+    self._simd_kw: Union[str, None] = simd_kw
+    self._registers: Dict[str, int] = {}
+    self._streams: List[StringIO] = []
+
+  def __call__(self, line):
+    self._writer(line)
+
+  def mv_left(self):
+    self._writer.mv_left()
+
+  def mv_right(self):
+    self._writer.mv_right()
+
+  def block(self, block_name=None):
+    return LaneBlock(writer=self, block_name=block_name)
+
+  def insert_pragma_unroll(self):
+    # NOTE: trip counts of loops inside of lanes are known at compile time.
+    # The compiler unrolls them if it is profitable
+    pass
+
+  def get_src(self):
+    return self._writer.get_src()
+
+  def is_outermost(self) -> bool:
+    return self.depth == 0
+
+  def add_registers(self, name: str, size: int) -> None:
+    """Declares registers of all lanes"""
+    extent = f'[{self._num_lanes}]' if size == 1 else f'[{self._num_lanes}][{size}]'
+    self._writer(f'{self._fp_as_str} {self._get_lanes_name(name)}{extent};')
+    self._registers[name] = size
+
+  def begin_lanes(self) -> None:
+    self._streams.append(self._writer.stream)
+    self._writer.stream = StringIO()
+    self._writer.mv_right()
+
+  def end_lanes(self) -> None:
+    body = self._writer.stream.getvalue()
+    self._writer.stream = self._streams.pop()
+    self._writer.mv_left()
+
+    if self._simd_kw:
+      self._writer(self._simd_kw)
+    self._writer(f'for (int {self._lane_idx} = 0; {self._lane_idx} < {self._num_lanes}; ++{self._lane_idx})')
+    self._writer('{')
+    self._writer.mv_right()
+    for name, size in self._registers.items():
+      if re.search(rf'\b{name}\b', body):
+        self._writer(self._gen_binding(name, size))
+    self._writer.stream.write(body)
+    self._writer.mv_left()
+    self._writer('}')
+
+  def _gen_binding(self, name: str, size: int) -> str:
+    lanes = f'{self._get_lanes_name(name)}[{self._lane_idx}]'
+    if size == 1:
+      return f'{self._fp_as_str} &{name} = {lanes};'
+    return f'{self._fp_as_str} (&{name})[{size}] = {lanes};'
+
+  def _get_lanes_name(self, name: str) -> str:
+    return f'{name}Lanes'
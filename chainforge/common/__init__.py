@@ -1,6 +1,7 @@
-from .descriptions import GemmDescr
 from .basic_types import DataFlowDirection, Addressing, FloatingPointType, GeneralLexicon
-from .matrix import Matrix, DenseMatrix
+from .matrix import Matrix, DenseMatrix, SparseMatrix
+from .descriptions import GemmDescr, Epilogue
 from .aux import generate_tmp_matrix
 from .vm import VM, vm_factory
 from .context import Context
+from .tiling import RegisterTile, RegisterTileSelector
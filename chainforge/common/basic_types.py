@@ -54,6 +54,7 @@ class FloatingPointType(enum.Enum):
 
 class GeneralLexicon:
   BATCH_ID_NAME = 'batchId'
+  BATCH_OFFSET_NAME = 'batchOffset'
   NUM_ELEMENTS = 'numElements'
   EXTRA_OFFSET = '_extraOffset'
   STREAM_PTR_STR = 'streamPtr'
@@ -7,10 +7,54 @@ class Options:
   def __init__(self,
                exact_contraction_length=False,
                align_shr_mem=True,
-               enable_sync_threads_opt=True):
+               enable_sync_threads_opt=True,
+               enable_register_tiling=True,
+               enable_vectorized_loads=True,
+               enable_shr_mem_padding=True,
+               enable_prefetch=False,
+               enable_interval_shr_mem_alloc=True,
+               enable_load_cse=False,
+               enable_register_tmps=True,
+               enable_persistent_threads=False,
+               persistent_blocks_per_sm=None,
+               enable_block_shared_invariants=False,
+               max_batch_size=None,
+               shr_mem_loader='auto',
+               pipeline='default'):
     self.exact_contraction_length: bool = exact_contraction_length
     self.align_shr_mem: bool = align_shr_mem
     self.enable_sync_threads_opt = enable_sync_threads_opt
+    self.enable_register_tiling = enable_register_tiling
+    self.enable_vectorized_loads = enable_vectorized_loads
+    self.enable_shr_mem_padding = enable_shr_mem_padding
+    self.enable_prefetch = enable_prefetch
+    self.enable_interval_shr_mem_alloc = enable_interval_shr_mem_alloc
+    self.enable_load_cse = enable_load_cse
+    self.enable_register_tmps = enable_register_tmps
+
+    # NOTE: a persistent kernel loops over batch elements with a grid stride. `None` means that
+    # num. blocks per SM is deduced from the theoretical occupancy of the kernel
+    self.enable_persistent_threads = enable_persistent_threads
+    self.persistent_blocks_per_sm = persistent_blocks_per_sm
+
+    # NOTE: places batch-invariant operands (i.e., without addressing) into a region of shr. mem.
+    # which is shared by all mults of a block and loaded cooperatively by all their threads
+    self.enable_block_shared_invariants = enable_block_shared_invariants
+
+    # NOTE: max. num. elements passed to a kernel. Batch ids and extra offsets are 64-bit only
+    # if strided batches of that size cannot be indexed with 32 bits. Otherwise, they are 32-bit
+    # and a launcher splits larger batches into several launches. If `None`, indices are 32-bit
+    # and a launcher is not checked (as in earlier versions)
+    self.max_batch_size = max_batch_size
+
+    # NOTE: either `exact` (copies only a patch of a matrix), `extended` (copies entire columns
+    # as a flat array) or `auto` (extended if the tail of active threads can touch the next column)
+    self.shr_mem_loader = shr_mem_loader
+
+    # NOTE: either a name of a registered pipeline or a list of registered pass names.
+    # `fast` and `aggressive` override `enable_*` optimization flags; persistent threads
+    # and block-shared invariants are honored by all named pipelines
+    self.pipeline = pipeline
 
 
 class Context:
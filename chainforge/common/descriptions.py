@@ -1,6 +1,79 @@
 from chainforge.backend.exceptions import GenerationError
 from .context import Context
 from .basic_types import DataFlowDirection, FloatingPointType
+from .matrix import SparseMatrix
+
+
+class Epilogue:
+  """Elementwise operations fused into the store of a gemm result to glb. memory:
+
+    res = scale * alpha * op(A) x op(B) + addend_0 + ... + addend_n
+    C = res + beta * C
+    output_i = res + beta_i * output_i
+
+  `scale` is a per-batch scalar given as a batched 1x1 matrix. Addends and outputs are
+  batched matrices of the same (bbox) size as C. An output is given either as a matrix
+  (i.e., beta_i = 0) or as a (matrix, beta_i) tuple
+  """
+
+  def __init__(self, scale=None, addends=None, outputs=None):
+    self.scale = scale
+    if self.scale is not None:
+      self.scale.set_data_flow_direction(DataFlowDirection.SOURCE)
+
+    self.addends = list(addends) if addends else []
+    for matrix in self.addends:
+      matrix.set_data_flow_direction(DataFlowDirection.SOURCE)
+
+    self.outputs = []
+    for item in (outputs if outputs else []):
+      matrix, beta = item if isinstance(item, tuple) else (item, 0.0)
+      matrix.set_data_flow_direction(DataFlowDirection.SINK)
+      self.outputs.append((matrix, beta))
+
+  def get_matrices(self):
+    matrices = [] if self.scale is None else [self.scale]
+    matrices.extend(self.addends)
+    matrices.extend([matrix for matrix, _ in self.outputs])
+    return matrices
+
+  def check(self, mat_c):
+    if mat_c.is_tmp:
+      raise GenerationError('an epilogue can be fused only into a store to glb. memory, '
+                            'given a tmp. matrix')
+
+    if self.scale is not None:
+      if self.scale.get_actual_num_rows() != 1 or self.scale.get_actual_num_cols() != 1:
+        raise GenerationError('epilogue: `scale` must be a 1x1 matrix')
+
+    for matrix in self.get_matrices():
+      if isinstance(matrix, SparseMatrix):
+        raise GenerationError('epilogue: operands cannot be sparse matrices')
+
+    for matrix in self.addends + [matrix for matrix, _ in self.outputs]:
+      if matrix.is_tmp:
+        raise GenerationError('epilogue: addends and outputs cannot be tmp. matrices')
+
+      is_same_size = matrix.get_actual_num_rows() == mat_c.get_actual_num_rows()
+      is_same_size &= matrix.get_actual_num_cols() == mat_c.get_actual_num_cols()
+      if not is_same_size:
+        raise GenerationError('epilogue: addends and outputs must have the same size as C')
+
+    matrices = [mat_c] + self.get_matrices()
+    if len(set([id(matrix) for matrix in matrices])) != len(matrices):
+      raise GenerationError('epilogue: C, scale, addends and outputs must be distinct matrices')
+
+  def compute_flops(self, volume):
+    flops = volume if self.scale is not None else 0
+    flops += volume * len(self.addends)
+    flops += volume * len([beta for _, beta in self.outputs if beta != 0])
+    return flops
+
+  def __str__(self):
+    items = [] if self.scale is None else [f'scale({self.scale})']
+    items.extend([f'add({matrix})' for matrix in self.addends])
+    items.extend([f'out({matrix}, {beta})' for matrix, beta in self.outputs])
+    return ', '.join(items)
 
 
 class GemmDescr:
@@ -13,7 +86,9 @@ class GemmDescr:
                alpha=1.0,
                beta=0.0,
                strict_match: bool = False,
-               prefer_align: bool = False):
+               prefer_align: bool = False,
+               register_tile=None,
+               epilogue=None):
     self.trans_a = trans_a
     self.trans_b = trans_b
     self.mat_a = a
@@ -34,6 +109,12 @@ class GemmDescr:
     self._strict_match = strict_match
     self.prefer_align = prefer_align
 
+    # NOTE: `None` means that a register tile is going to be selected automatically
+    self.register_tile = register_tile
+
+    # NOTE: `None` means that results are stored as `C = alpha * op(A) x op(B) + beta * C`
+    self.epilogue = epilogue
+
     self._check()
     self._analyze()
 
@@ -50,13 +131,26 @@ class GemmDescr:
     else:
       self._n = self.mat_b.get_actual_num_cols()
 
-  def get_num_threads(self, context: Context):
-    num_threads = context.align(num=self._m)
-    return num_threads, self._m
+  def get_num_threads(self, context: Context, tile=None):
+    if tile is None:
+      num_threads = context.align(num=self._m)
+      return num_threads, self._m
+    else:
+      num_active_threads = tile.get_num_active_threads(self._m, self._n)
+      return context.align(num=num_active_threads), num_active_threads
+
+  def get_accumulator_size(self, tile=None):
+    return self._n if tile is None else tile.get_accumulator_size(self._n)
 
-  def get_accumulator_size(self):
+  def get_m(self):
+    return self._m
+
+  def get_n(self):
     return self._n
 
+  def get_k(self):
+    return self._k
+
   def is_strict_math(self):
     return self._strict_match
 
@@ -65,10 +159,14 @@ class GemmDescr:
     suffix_b = '^T' if self.trans_b else ''
     op1 = f'{self.alpha} * {self.mat_a}{suffix_a} x {self.mat_b}{suffix_b}'
     op2 = '' if self.beta == 0 else f' + {self.beta} * {self.mat_c}'
-    return f'{self.mat_c} = {op1}{op2}'
+    epilogue = '' if self.epilogue is None else f' | {self.epilogue}'
+    return f'{self.mat_c} = {op1}{op2}{epilogue}'
 
   def _check(self):
     try:
+      if isinstance(self.mat_c, SparseMatrix):
+        raise GenerationError('Cannot generate a matrix multiplication with a sparse matrix C')
+
       # check whether C and A match each other
       if self.trans_a:
         if self.mat_c.get_actual_num_rows() != self.mat_a.get_actual_num_cols():
@@ -113,6 +211,9 @@ class GemmDescr:
               raise GenerationError("Cannot generate a matrix multiplication with given parameters. "
                                     "Matrix A (NoTrans) and B (NoTrans) do not match")
 
+      if self.epilogue is not None:
+        self.epilogue.check(self.mat_c)
+
     except GenerationError as err:
       print(self.mat_a.gen_descr())
       print(self.mat_b.gen_descr())
@@ -120,7 +221,29 @@ class GemmDescr:
       raise err
 
   def compute_flops(self):
-    flops = (2 * self._k - 1) * self._m * self._n
+    if isinstance(self.mat_a, SparseMatrix) or isinstance(self.mat_b, SparseMatrix):
+      flops = self._compute_sparse_flops()
+    else:
+      flops = (2 * self._k - 1) * self._m * self._n
     if self.beta != 0:
       flops += self._m * self._n
+    if self.epilogue is not None:
+      flops += self.epilogue.compute_flops(self._m * self._n)
+    return flops
+
+  def _compute_sparse_flops(self):
+    """Counts only products of non-zeros (and additions of such products)"""
+    def is_nonzero(matrix, is_trans, row, column):
+      bbox = matrix.get_bbox()
+      row, column = (column, row) if is_trans else (row, column)
+      return matrix.is_nonzero(bbox[0] + row, bbox[1] + column)
+
+    k_range = min(self._k, self.mat_b.get_actual_num_cols() if self.trans_b else self.mat_b.get_actual_num_rows())
+    flops = 0
+    for row in range(self._m):
+      for column in range(self._n):
+        num_products = len([k for k in range(k_range)
+                            if is_nonzero(self.mat_a, self.trans_a, row, k)
+                            and is_nonzero(self.mat_b, self.trans_b, k, column)])
+        flops += max(2 * num_products - 1, 0)
     return flops
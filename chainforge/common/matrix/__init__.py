@@ -1 +1,2 @@
 from .dense import Matrix, DenseMatrix
+from .sparse import SparseMatrix
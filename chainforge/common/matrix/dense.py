@@ -66,6 +66,10 @@ class Matrix():
   def get_bbox(self):
     return self.bbox
 
+  def is_nonzero(self, row: int, column: int) -> bool:
+    """Returns False if an element is known to be zero at generation time"""
+    return True
+
   def _set_name(self, name):
     self.name = name
 
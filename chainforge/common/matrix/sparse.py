@@ -0,0 +1,99 @@
+import hashlib
+from chainforge.backend.exceptions import GenerationError
+from chainforge.common import Addressing
+from typing import Union, List, Tuple, Dict
+from .dense import Matrix
+
+
+class SparseMatrix(Matrix):
+  """A matrix with a sparsity pattern which is known at generation time.
+
+  Only non-zeros are stored in memory. They are packed in the column-major order, i.e. as values
+  of the CSC format. Thus, the volume of a batch element is equal to num. non-zeros.
+  The pattern is given either as a mask (a 2D array-like object of the shape `(num_rows, num_cols)`,
+  e.g., a NumPy array) or as CSR arrays, i.e. `row_ptr` and `col_indices`
+  """
+
+  def __init__(self,
+               num_rows,
+               num_cols,
+               addressing,
+               pattern=None,
+               row_ptr=None,
+               col_indices=None,
+               bbox=None,
+               alias=None,
+               is_tmp=False):
+    super(SparseMatrix, self).__init__(num_rows,
+                                       num_cols,
+                                       addressing,
+                                       bbox,
+                                       alias,
+                                       is_tmp)
+    if is_tmp:
+      raise GenerationError('sparse matrices cannot be tmp. matrices')
+
+    if (pattern is None) == (row_ptr is None or col_indices is None):
+      raise GenerationError('a sparsity pattern must be given either as a mask or as CSR arrays')
+
+    if pattern is not None:
+      nonzeros = self._from_mask(pattern)
+    else:
+      nonzeros = self._from_csr(row_ptr, col_indices)
+
+    self._nonzeros: List[Tuple[int, int]] = sorted(set(nonzeros), key=lambda item: (item[1], item[0]))
+    self._nz_indices: Dict[Tuple[int, int], int] = {item: index for index, item in enumerate(self._nonzeros)}
+
+  def _from_mask(self, pattern) -> List[Tuple[int, int]]:
+    num_rows = len(pattern)
+    num_cols = len(pattern[0]) if num_rows else 0
+    if (num_rows, num_cols) != (self.num_rows, self.num_cols):
+      raise GenerationError(f'shape of the sparsity pattern ({num_rows}, {num_cols}) does not match '
+                            f'the shape of the matrix ({self.num_rows}, {self.num_cols})')
+
+    return [(row, column) for row in range(num_rows) for column in range(num_cols) if pattern[row][column]]
+
+  def _from_csr(self, row_ptr, col_indices) -> List[Tuple[int, int]]:
+    if len(row_ptr) != self.num_rows + 1 or row_ptr[-1] != len(col_indices):
+      raise GenerationError(f'CSR arrays do not describe a matrix with {self.num_rows} rows')
+
+    nonzeros = []
+    for row in range(self.num_rows):
+      for index in range(row_ptr[row], row_ptr[row + 1]):
+        column = int(col_indices[index])
+        if not 0 <= column < self.num_cols:
+          raise GenerationError(f'column index {column} is outside of the matrix')
+        nonzeros.append((row, column))
+    return nonzeros
+
+  def get_nnz(self) -> int:
+    return len(self._nonzeros)
+
+  def get_nonzeros(self) -> List[Tuple[int, int]]:
+    """Returns (row, column) pairs of non-zeros in the order of their storage"""
+    return self._nonzeros
+
+  def get_nz_index(self, row: int, column: int) -> Union[int, None]:
+    """Returns the position of an element in the packed storage or None if the element is zero"""
+    return self._nz_indices.get((row, column), None)
+
+  def is_nonzero(self, row: int, column: int) -> bool:
+    return (row, column) in self._nz_indices
+
+  def get_real_volume(self):
+    return self.get_nnz()
+
+  def is_similar(self, other):
+    is_sparse = isinstance(other, SparseMatrix) and self._nonzeros == other.get_nonzeros()
+    return is_sparse and super(SparseMatrix, self).is_similar(other)
+
+  def gen_descr(self):
+    string = f'{self.name} = {{'
+    string += f'rows: {self.num_rows}, '
+    string += f'cols: {self.num_cols}, '
+    string += f'addr: {Addressing.addr2str(self.addressing)}, '
+    string += f'bbox: {self.bbox}, '
+    string += f'nnz: {self.get_nnz()}, '
+    string += f'pattern: {hashlib.md5(str(self._nonzeros).encode()).hexdigest()[:10]}'
+    string += f'}};'
+    return string
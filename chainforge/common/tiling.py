@@ -0,0 +1,140 @@
+from math import ceil
+from typing import List, Union, Tuple
+from .context import Context
+from .basic_types import FloatingPointType
+
+
+class RegisterTile:
+  """Describes a block of `op1` rows and `op2` columns which a thread accumulates in registers.
+
+  Threads are split into `row groups` and `column groups`. A thread with index `tid` belongs to
+  row group `tid % num_row_groups` and column group `tid / num_row_groups`. It computes rows
+  `row_group + r * num_row_groups` (r < rows_per_thread) and columns
+  `col_group * cols_per_thread + c` (c < cols_per_thread) of the result.
+  `cols_per_thread = None` means that a thread computes all columns.
+  """
+
+  def __init__(self, rows_per_thread: int = 1, cols_per_thread: Union[int, None] = None):
+    if rows_per_thread < 1:
+      raise ValueError(f'rows per thread must be positive, given: {rows_per_thread}')
+    if cols_per_thread is not None and cols_per_thread < 1:
+      raise ValueError(f'cols per thread must be positive, given: {cols_per_thread}')
+
+    self.rows_per_thread: int = rows_per_thread
+    self.cols_per_thread: Union[int, None] = cols_per_thread
+
+  def is_trivial(self, n: int) -> bool:
+    return self.rows_per_thread == 1 and self.get_cols_per_thread(n) == n
+
+  def get_cols_per_thread(self, n: int) -> int:
+    return n if self.cols_per_thread is None else min(self.cols_per_thread, n)
+
+  def get_num_row_groups(self, m: int) -> int:
+    return int(ceil(m / self.rows_per_thread))
+
+  def get_num_col_groups(self, n: int) -> int:
+    return int(ceil(n / self.get_cols_per_thread(n)))
+
+  def get_num_active_threads(self, m: int, n: int) -> int:
+    return self.get_num_row_groups(m) * self.get_num_col_groups(n)
+
+  def get_accumulator_size(self, n: int) -> int:
+    return self.rows_per_thread * self.get_cols_per_thread(n)
+
+  def __str__(self) -> str:
+    cols = 'all' if self.cols_per_thread is None else self.cols_per_thread
+    return f'{self.rows_per_thread}x{cols}'
+
+
+class RegisterTileSelector:
+  """Selects register tiles for all gemms of a chain.
+
+  All gemms share the same num. threads and the same register array. Thus, the selection
+  is done for the entire chain: for each feasible num. threads, every gemm takes the tile with
+  the smallest num. lane-instructions (i.e., fma-s, `op1` and `op2` loads) per contraction
+  step, and the chain is scored by the sum over all gemms. Loads of `op1` which stays
+  in global memory are weighted by `GLB_LOAD_WEIGHT`. An accumulator may take at most
+  half of the per-thread register budget which still allows half of the max. num. threads
+  per SM to be resident. The default (one row per thread) tile is always allowed.
+  """
+  MAX_REGS_PER_THREAD = 255
+  GLB_LOAD_WEIGHT = 4
+  MAX_ROWS_PER_THREAD = 8
+  COL_SPLITS = [1, 2, 4, 8, 16, 32]
+
+  def __init__(self, context: Context):
+    self._context: Context = context
+    self._hw_descr = context.get_vm().hw_descr
+    self._words_per_fp = 1 if context.fp_type == FloatingPointType.FLOAT else 2
+
+  def select(self, gemm_list) -> List[RegisterTile]:
+    candidates = [self._get_candidates(gemm) for gemm in gemm_list]
+    thread_options = sorted(set([threads for items in candidates for _, threads in items]))
+
+    best_cost, best_tiles = None, None
+    for num_threads in thread_options:
+      tiles, cost = [], 0
+      for gemm, items in zip(gemm_list, candidates):
+        selected = self._select_for_gemm(gemm, items, num_threads)
+        if selected is None:
+          break
+        tile, gemm_cost = selected
+        tiles.append(tile)
+        cost += num_threads * gemm_cost
+      else:
+        if best_cost is None or cost < best_cost:
+          best_cost, best_tiles = cost, tiles
+
+    if best_tiles is None:
+      return [RegisterTile() for _ in gemm_list]
+    return best_tiles
+
+  def _get_candidates(self, gemm) -> List[Tuple[RegisterTile, int]]:
+    m, n = gemm.get_m(), gemm.get_n()
+    if gemm.register_tile is not None:
+      tiles = [gemm.register_tile]
+    elif gemm.prefer_align:
+      # NOTE: an aligned gemm can extend its `m`-range which is not known at this point
+      tiles = [RegisterTile()]
+    else:
+      tiles = []
+      for num_col_groups in RegisterTileSelector.COL_SPLITS:
+        if num_col_groups > n:
+          break
+        cols_per_thread = int(ceil(n / num_col_groups))
+        for rows_per_thread in range(1, RegisterTileSelector.MAX_ROWS_PER_THREAD + 1):
+          if rows_per_thread > m:
+            break
+          tiles.append(RegisterTile(rows_per_thread, None if cols_per_thread == n else cols_per_thread))
+
+    candidates = []
+    for tile in tiles:
+      num_threads = self._context.align(tile.get_num_active_threads(m, n))
+      if num_threads <= self._hw_descr.max_threads_per_block:
+        candidates.append((tile, num_threads))
+    return candidates
+
+  def _select_for_gemm(self, gemm, candidates, num_threads) -> Union[Tuple[RegisterTile, int], None]:
+    m, n, k = gemm.get_m(), gemm.get_n(), gemm.get_k()
+    num_resident_threads = max(num_threads, self._hw_descr.max_threads_per_sm // 2)
+    reg_budget = min(RegisterTileSelector.MAX_REGS_PER_THREAD,
+                     self._hw_descr.max_reg_per_block // num_resident_threads) // 2
+
+    # NOTE: `op1` is loaded to shr. mem. only if it is a tmp. matrix or it needs to be transposed
+    is_op1_in_shr_mem = gemm.trans_a or gemm.mat_a.is_tmp
+    op1_weight = 1 if is_op1_in_shr_mem else RegisterTileSelector.GLB_LOAD_WEIGHT
+
+    best = None
+    for tile, tile_threads in candidates:
+      if tile_threads > num_threads:
+        continue
+
+      acc_size = tile.get_accumulator_size(n)
+      if acc_size * self._words_per_fp > reg_budget and not tile.is_trivial(n):
+        continue
+
+      rows, cols = tile.rows_per_thread, tile.get_cols_per_thread(n)
+      cost = (rows * cols + op1_weight * rows + cols) * k
+      if best is None or cost < best[1]:
+        best = (tile, cost)
+    return best
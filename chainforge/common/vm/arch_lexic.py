@@ -10,13 +10,21 @@ class AbstractArchLexic(ABC):
     self.block_dim_y = None
     self.block_dim_z = None
     self.block_idx_x = None
+    self.grid_dim_x = None
     self.stream_type = None
     self.kenrnel_type = None
     self.shr_mem_kw = None
+    self.constant_mem_kw = None
     self.dim3_type = None
     self.sync_block_threads = None
     self.sync_warp_threads = None
     self.restrict_kw = None
+    self.parallel_region_kw = None
+    self.parallel_loop_kw = None
+    self.simd_loop_kw = None
+
+    # NOTE: a statement after each launch which checks errors (see chainforge_aux.h)
+    self.launch_error_check = 'CHECK_ERR'
 
     self._thread_idx_x = None
 
@@ -34,6 +42,54 @@ class AbstractArchLexic(ABC):
   def get_mapped_keywords(self):
     return [(self.thread_idx_x, self._thread_idx_x, 'int')]
 
+  def get_vector_type(self, fp_type, width):
+    return f'{fp_type}{width}'
+
+  def get_shr_mem_decl(self, fp_type, name, size, alignment):
+    return f'{self.shr_mem_kw} __align__({alignment}) {fp_type} {name}[{size}];'
+
+  def get_kernel_launch_params(self):
+    """Returns params of a kernel which are not batch params and are given by `get_launch_code`"""
+    return []
+
+  def get_launch_size_decl(self, name, x, y, z):
+    return f'{self.dim3_type} {name}({x}, {y}, {z});'
+
+  def get_stream_decl(self, name, stream_ptr):
+    """Returns host code which declares a stream `name` given by an untyped pointer"""
+    stream_obj = f'static_cast<{self.stream_type}>({stream_ptr})'
+    return [f'{self.stream_type} {name} = ({stream_ptr} != nullptr) ? {stream_obj} : 0;']
+
+  def get_command_group(self, stream):
+    """Returns the header of a scope which submits device code to a queue.
+
+    None means that device code is the body of a kernel
+    """
+    return None
+
+  def get_shr_mem_accessor(self, name, num_bytes, alignment):
+    raise GenerationError(f'shr. mem. accessors are not supported by {type(self).__name__}')
+
+  def get_parallel_for(self, grid, block, sub_group_size):
+    raise GenerationError(f'parallel-for scopes are not supported by {type(self).__name__}')
+
+  def supports_async_copy(self, arch):
+    """Returns True if glb. to shr. mem. copies can be issued asynchronously on a given arch"""
+    return False
+
+  def get_async_copy(self, dest_address, src_address, num_bytes):
+    raise GenerationError(f'async copies are not supported by {type(self).__name__}')
+
+  def get_num_sms_query(self, var_name):
+    """Returns host code which writes num. SMs (compute units) of the current device to `var_name`"""
+    raise GenerationError(f'querying num. SMs is not supported by {type(self).__name__}')
+
+  def get_async_copy_commit(self):
+    raise GenerationError(f'async copies are not supported by {type(self).__name__}')
+
+  def get_async_copy_wait(self, num_pending):
+    raise GenerationError(f'async copies are not supported by {type(self).__name__}')
+
 
 class AmdArchLexic(AbstractArchLexic):
   def __init__(self):
@@ -42,11 +98,13 @@ class AmdArchLexic(AbstractArchLexic):
     self.thread_idx_y = 'hipThreadIdx_y'
     self.thread_idx_z = 'hipThreadIdx_z'
     self.block_idx_x = 'hipBlockIdx_x'
+    self.grid_dim_x = 'hipGridDim_x'
     self.block_dim_y = 'hipBlockDim_y'
     self.block_dim_z = 'hipBlockDim_z'
     self.stream_type = 'hipStream_t'
     self.kernel_type = '__global__ void'
     self.shr_mem_kw = '__shared__'
+    self.constant_mem_kw = '__constant__'
     self.dim3_type = 'dim3'
     self.sync_block_threads = '__syncthreads()'
     self.sync_warp_threads = '__syncthreads()'
@@ -58,6 +116,12 @@ class AmdArchLexic(AbstractArchLexic):
   def get_launch_bounds(self, total_num_threads_per_block, min_blocks_per_mp=None):
     return ''
 
+  def get_num_sms_query(self, var_name):
+    return ['int device = 0;',
+            'hipGetDevice(&device);',
+            f'int {var_name} = 0;',
+            f'hipDeviceGetAttribute(&{var_name}, hipDeviceAttributeMultiprocessorCount, device);']
+
 
 class NvidiaArchLexic(AbstractArchLexic):
   def __init__(self):
@@ -66,11 +130,13 @@ class NvidiaArchLexic(AbstractArchLexic):
     self.thread_idx_y = 'threadIdx.y'
     self.thread_idx_z = 'threadIdx.z'
     self.block_idx_x = 'blockIdx.x'
+    self.grid_dim_x = 'gridDim.x'
     self.block_dim_y = 'blockDim.y'
     self.block_dim_z = 'blockDim.z'
     self.stream_type = 'cudaStream_t'
     self.kernel_type = '__global__ void'
     self.shr_mem_kw = '__shared__'
+    self.constant_mem_kw = '__constant__'
     self.dim3_type = 'dim3'
     self.sync_block_threads = '__syncthreads()'
     self.sync_warp_threads = '__syncwarp()'
@@ -83,11 +149,151 @@ class NvidiaArchLexic(AbstractArchLexic):
     params = [str(item) for item in [total_num_threads_per_block, min_blocks_per_mp] if item]
     return f'__launch_bounds__({", ".join(params)})'
 
+  def get_num_sms_query(self, var_name):
+    return ['int device = 0;',
+            'cudaGetDevice(&device);',
+            f'int {var_name} = 0;',
+            f'cudaDeviceGetAttribute(&{var_name}, cudaDevAttrMultiProcessorCount, device);']
+
+  def supports_async_copy(self, arch):
+    # NOTE: `cp.async` is available since Ampere (sm_80)
+    if not arch.startswith('sm_'):
+      return False
+    return int(arch[len('sm_'):]) >= 80
+
+  def get_async_copy(self, dest_address, src_address, num_bytes):
+    dest = f'static_cast<unsigned>(__cvta_generic_to_shared({dest_address}))'
+    return f'asm volatile("cp.async.ca.shared.global [%0], [%1], {num_bytes};" :: "r"({dest}), "l"({src_address}))'
+
+  def get_async_copy_commit(self):
+    return 'asm volatile("cp.async.commit_group;")'
+
+  def get_async_copy_wait(self, num_pending):
+    return f'asm volatile("cp.async.wait_group {num_pending};" ::: "memory")'
+
+
+class CpuArchLexic(AbstractArchLexic):
+  """Lexic of C++/OpenMP code for the host.
+
+  A block is executed by a single host thread: `thread_idx_x` is the index of a SIMD loop
+  over lanes and a block always computes a single batch element. Thus, barriers are not needed
+  and shr. mem. is a scratch buffer on the stack
+  """
+  def __init__(self):
+    AbstractArchLexic.__init__(self)
+    self.thread_idx_y = '0'
+    self.block_dim_y = '1'
+    self.kernel_type = 'void'
+    self.shr_mem_kw = ''
+    self.constant_mem_kw = 'static const'
+    self.sync_block_threads = ''
+    self.sync_warp_threads = ''
+    self.restrict_kw = '__restrict__'
+    self.parallel_region_kw = '#pragma omp parallel'
+    self.parallel_loop_kw = '#pragma omp for'
+    self.simd_loop_kw = '#pragma omp simd'
+
+  def get_launch_code(self, func_name, grid, block, stream, func_params):
+    return f'{func_name}({func_params})'
+
+  def get_launch_bounds(self, total_num_threads_per_block, min_blocks_per_mp=None):
+    return ''
+
+  def get_mapped_keywords(self):
+    # NOTE: `thread_idx_x` is declared by loops over lanes
+    return []
+
+  def get_vector_type(self, fp_type, width):
+    raise GenerationError(f'vector types are not supported by {type(self).__name__}')
+
+  def get_shr_mem_decl(self, fp_type, name, size, alignment):
+    return f'alignas({alignment}) {fp_type} {name}[{size}];'
+
+
+class SyclArchLexic(AbstractArchLexic):
+  """Lexic of SYCL 2020 code.
+
+  A kernel submits a command group to a queue. Work-items of an `nd_range<2>` are mapped as
+  `(y, x)`, i.e. `thread_idx_x` and `block_idx_x` belong to the last (fastest) dimension.
+  Shr. mem. is a local accessor of the command group
+  """
+  def __init__(self):
+    AbstractArchLexic.__init__(self)
+    self._thread_idx_x = 'item.get_local_id(1)'
+    self.thread_idx_y = 'item.get_local_id(0)'
+    self.block_idx_x = 'item.get_group(1)'
+    self.grid_dim_x = 'item.get_group_range(1)'
+    self.block_dim_y = 'item.get_local_range(0)'
+    self.stream_type = 'sycl::queue*'
+    self.kernel_type = 'void'
+    self.shr_mem_kw = ''
+    self.constant_mem_kw = 'static const'
+    self.dim3_type = 'sycl::range<2>'
+    self.sync_block_threads = 'sycl::group_barrier(item.get_group())'
+    self.sync_warp_threads = 'sycl::group_barrier(item.get_sub_group())'
+    self.restrict_kw = '__restrict__'
+
+    # NOTE: `submit` throws synchronous errors. Asynchronous ones are passed to
+    # the async handler of the queue
+    self.launch_error_check = None
+
+  def get_launch_code(self, func_name, grid, block, stream, func_params):
+    return f'{func_name}({stream}, {grid}, {block}, {func_params})'
+
+  def get_launch_bounds(self, total_num_threads_per_block, min_blocks_per_mp=None):
+    return ''
+
+  def get_kernel_launch_params(self):
+    return [f'{self.stream_type} stream', f'{self.dim3_type} grid', f'{self.dim3_type} block']
+
+  def get_launch_size_decl(self, name, x, y, z):
+    # NOTE: the last dimension of a SYCL range is the fastest one
+    return f'{self.dim3_type} {name}({y}, {x});'
+
+  def get_stream_decl(self, name, stream_ptr):
+    return [f'{self.stream_type} {name} = static_cast<{self.stream_type}>({stream_ptr});',
+            f'if ({name} == nullptr) {{',
+            '  static sycl::queue defaultQueue{sycl::property::queue::in_order()};',
+            f'  {name} = &defaultQueue;',
+            '}']
+
+  def get_command_group(self, stream):
+    return f'{stream}->submit([&](sycl::handler &cgh)'
+
+  def get_shr_mem_accessor(self, name, num_bytes, alignment):
+    # NOTE: the element type guarantees the alignment of the accessor
+    num_items = (num_bytes + alignment - 1) // alignment
+    item_type = f'sycl::vec<unsigned char, {alignment}>'
+    return f'sycl::local_accessor<{item_type}, 1> {self._get_accessor_name(name)}(sycl::range<1>({num_items}), cgh);'
+
+  def get_shr_mem_decl(self, fp_type, name, size, alignment):
+    return f'{fp_type}* {name} = reinterpret_cast<{fp_type}*>(&{self._get_accessor_name(name)}[0]);'
+
+  def get_parallel_for(self, grid, block, sub_group_size):
+    # NOTE: warp-level barriers (see SyncThreads) require sub-groups of the size of a vector unit
+    nd_range = f'sycl::nd_range<2>({grid} * {block}, {block})'
+    attribute = f'[[sycl::reqd_sub_group_size({sub_group_size})]]'
+    return f'cgh.parallel_for({nd_range}, [=](sycl::nd_item<2> item) {attribute}'
+
+  def get_vector_type(self, fp_type, width):
+    return f'sycl::vec<{fp_type}, {width}>'
+
+  def get_num_sms_query(self, var_name):
+    # NOTE: the launcher declares `stream` before the query
+    return [f'int {var_name} = stream->get_device().get_info<sycl::info::device::max_compute_units>();']
+
+  def _get_accessor_name(self, name):
+    return f'{name}Acc'
+
 
 def lexic_factory(backend):
   if backend == "cuda":
     return NvidiaArchLexic()
   elif backend == "hip":
     return AmdArchLexic()
+  elif backend == "cpu":
+    return CpuArchLexic()
+  elif backend == "oneapi" or backend == "hipsycl":
+    return SyclArchLexic()
   else:
     raise GenerationError(f'unknown backend, given: {backend}')
@@ -27,6 +27,7 @@ def hw_descr_factory(arch, backend):
   nvidia_list = retrieve_arch(arch_table=known_arch, vendor='nvidia')
   amd_list = retrieve_arch(arch_table=known_arch, vendor='amd')
   intel_list = retrieve_arch(arch_table=known_arch, vendor='intel')
+  host_list = retrieve_arch(arch_table=known_arch, vendor='host')
 
   if backend == 'cuda':
     if arch in nvidia_list:
@@ -38,16 +39,18 @@ def hw_descr_factory(arch, backend):
       return HwDecription(known_arch[arch], arch, backend)
     else:
       report_error(backend, arch)
-  """
-  # TODO: add sycl
+  elif backend == 'cpu':
+    if arch in host_list:
+      return HwDecription(known_arch[arch], arch, backend)
+    else:
+      report_error(backend, arch)
   elif backend == 'oneapi' or backend == 'hipsycl':
-    if arch in nvidia_list or arch in intel_list:
+    if arch in nvidia_list or arch in amd_list or arch in intel_list:
       return HwDecription(known_arch[arch], arch, backend)
     else:
       report_error(backend, arch)
-  """
 
-  raise ValueError(f'Unknown gpu architecture: {backend} {arch}')
+  raise ValueError(f'Unknown architecture: {backend} {arch}')
 
 
 def get_known_arch():
@@ -146,8 +149,12 @@ def get_known_arch():
   arch['gfx1200'] = deepcopy(arch['gfx1010'])
 
   # Intel
+  # NOTE: a compute unit is a Xe-core (a sub-slice on older GPUs). `vec_unit_length` is
+  # the sub-group size which is required by kernels (see SyclArchLexic)
+
+  # info: oneAPI GPU Optimization Guide, sections "Intel Xe GPU Architecture" and "Shared Local Memory"
   arch['dg1'] = {
-    'vec_unit_length': 64,
+    'vec_unit_length': 32,
     'max_local_mem_size_per_block': 64 * KB,
     'max_num_threads': 512,
     'max_reg_per_block': 64 * KB,
@@ -166,7 +173,54 @@ def get_known_arch():
                                   'max_threads_per_sm': 256,
                                   'max_block_per_sm': 32,
                                   'hw_fp_word_size': 4,
+                                  'mem_access_align_size': 32,
                                   'name': 'intel'}
+
+  # Arc (Alchemist), Flex: 16 vector engines with 8 hw. threads per Xe-core
+  arch['dg2'] = {
+    'vec_unit_length': 16,
+    'max_local_mem_size_per_block': 64 * KB,
+    'max_num_threads': 1024,
+    'max_reg_per_block': 512 * KB,
+    'max_threads_per_sm': 16 * 8 * 16,
+    'max_block_per_sm': 64,
+    'hw_fp_word_size': 4,
+    'mem_access_align_size': 32,
+    'name': 'intel',
+  }
+  arch['acm_g10'] = deepcopy(arch['dg2'])
+
+  # Data Center GPU Max (Ponte Vecchio): 8 vector engines with 8 hw. threads per Xe-core
+  arch['pvc'] = deepcopy(arch['dg2'])
+  arch['pvc']['max_local_mem_size_per_block'] = 128 * KB
+  arch['pvc']['max_threads_per_sm'] = 8 * 8 * 16
+
+  # Host (CPU)
+  # NOTE: a block is a loop over SIMD lanes of a single core. Thus, `vec_unit_length` is
+  # num. fp32 lanes and shr. mem. is a stack buffer which should stay within L1.
+  # Lanes access memory with scalar loads which are vectorized by the compiler. Thus,
+  # `mem_access_align_size` is set to the word size to disable wide loads
+  arch['host'] = {
+    'vec_unit_length': 4,
+    'max_local_mem_size_per_block': 32 * KB,
+    'max_num_threads': 1024,
+    'max_reg_per_block': 64 * KB,
+    'max_threads_per_sm': 1024,
+    'max_block_per_sm': 1,
+    'hw_fp_word_size': 4,
+    'mem_access_align_size': 4,
+    'name': 'host',
+  }
+
+  arch['neon'] = deepcopy(arch['host'])
+  arch['neon']['max_local_mem_size_per_block'] = 64 * KB
+
+  arch['avx2'] = deepcopy(arch['host'])
+  arch['avx2']['vec_unit_length'] = 8
+
+  arch['avx512'] = deepcopy(arch['host'])
+  arch['avx512']['vec_unit_length'] = 16
+  arch['avx512']['max_local_mem_size_per_block'] = 48 * KB
   return arch
 
 
@@ -2,4 +2,4 @@ from .symbol_table import SymbolTable
 from .aux import VarFactory
 from .parser import Parser
 from .post_porcessor import PostProcessor
-from .traversals import Printer, PrimaryGemmFolder, AstToList
+from .traversals import Printer, PrimaryGemmFolder, AstToList, MatrixChainOrdering
@@ -1,4 +1,4 @@
-from chainforge.common import DenseMatrix, Addressing
+from chainforge.common import DenseMatrix, SparseMatrix, Addressing
 
 
 class VarFactory:
@@ -6,6 +6,22 @@ class VarFactory:
   def produce_matrix(cls, text_descr):
     addrs = Addressing.str2addr(text_descr['addressing'])
 
+    if 'nonzeros' in text_descr:
+      num_rows, num_cols = text_descr['num_rows'], text_descr['num_cols']
+      pattern = [[False] * num_cols for _ in range(num_rows)]
+      for row, column in text_descr['nonzeros']:
+        if not (0 <= row < num_rows and 0 <= column < num_cols):
+          raise ValueError(f'non-zero ({row}, {column}) is outside of matrix {text_descr["name"]}')
+        pattern[row][column] = True
+
+      descr = SparseMatrix(num_rows=num_rows,
+                           num_cols=num_cols,
+                           addressing=addrs,
+                           pattern=pattern,
+                           bbox=text_descr['bbox'],
+                           alias=text_descr['name'])
+      return text_descr['name'], descr
+
     descr = DenseMatrix(num_rows=text_descr['num_rows'],
                         num_cols=text_descr['num_cols'],
                         addressing=addrs,
@@ -100,10 +100,13 @@ class ScaleMatrixNode(BinarryOps):
 
 
 class AssignNode(BinarryOps):
-  def __init__(self, name, left, right):
+  def __init__(self, name, left, right, epilogue=None):
     super().__init__(op_name='=', left=left, right=right)
     self.name = name
 
+    # NOTE: a list of (op. name, MatrixNode, beta) tuples
+    self.epilogue = epilogue if epilogue else []
+
   def __str__(self):
     return f'{self.left} = {self.right}'
 
@@ -14,13 +14,33 @@ class CustomTransformer(Transformer):
     self.root = StatementsNode()
 
   def assign(self, items):
-    node = AssignNode(name=items[2].value,
+    node = AssignNode(name=items[3].value,
                       left=self.create_var_node(items[0]),
-                      right=items[1])
+                      right=items[1],
+                      epilogue=items[2])
     if isinstance(node.left, ScalarNode):
       raise ValueError('lhs of an expression must be a matrix, given scalar')
     return node
 
+  def epilogue(self, items):
+    return items
+
+  def epilogue_scale(self, items):
+    return 'scale', self.create_epilogue_node(items[0]), 0.0
+
+  def epilogue_add(self, items):
+    return 'add', self.create_epilogue_node(items[0]), 0.0
+
+  def epilogue_out(self, items):
+    beta = float(items[1]) if len(items) > 1 else 0.0
+    return 'out', self.create_epilogue_node(items[0]), beta
+
+  def create_epilogue_node(self, name):
+    node = self.create_var_node(name)
+    if isinstance(node, ScalarNode):
+      raise ValueError(f'operands of an epilogue must be matrices, given scalar {name}')
+    return node
+
   def add(self, items):
     return AddNode(left=items[0], right=items[1])
 
@@ -105,6 +125,11 @@ class CustomTransformer(Transformer):
     numbers = [int(token) for token in tokens.children]
     return 'bbox', numbers
 
+  def def_nonzeros(self, tokens):
+    (tokens, ) = tokens
+    coords = [(int(coord.children[0]), int(coord.children[1])) for coord in tokens.children]
+    return 'nonzeros', coords
+
   def fold(self, assign_node):
     (assign_node, ) = assign_node
     self.root.add_node(assign_node)
@@ -125,18 +150,27 @@ class Parser:
       matrix_definition : STRING "=" matrix_desc ";"
       scalar_definition : STRING "=" SIGNED_FLOAT ";"
 
-      matrix_desc : "{" pair ("," pair)~3 "}"
+      matrix_desc : "{" pair ("," pair)~3..4 "}"
       pair : "rows" ":" INT                           -> def_num_rows
            | "cols" ":" INT                           -> def_num_cols
            | "addr" ":" STRING                        -> def_addressing
            | "bbox" ":" list                          -> def_int_list
+           | "nz" ":" coord_list                      -> def_nonzeros
 
       list : "[" INT ("," INT)~3 "]"
+      coord_list : "[" coord ("," coord)* "]"
+      coord : "(" INT "," INT ")"
 
-      assign : STRING "=" expr kernel_name ";"         -> assign
+      assign : STRING "=" expr epilogue kernel_name ";" -> assign
 
       ?kernel_name: "->" STRING
 
+      epilogue : ("|" epilogue_op)*
+      epilogue_op : "scale" "(" STRING ")"              -> epilogue_scale
+                  | "add" "(" STRING ")"                -> epilogue_add
+                  | "out" "(" STRING ")"                -> epilogue_out
+                  | "out" "(" STRING "," SIGNED_FLOAT ")" -> epilogue_out
+
       expr : term "+" expr                             -> add
            | term                                      -> single_term
 
@@ -1,22 +1,32 @@
 from .nodes import StatementsNode
 from .traversals import ConstantPropagation, DeadNodesElimination
-from .traversals import GemmListFolder, PrimaryGemmFolder
+from .traversals import GemmListFolder, PrimaryGemmFolder, MatrixChainOrdering
 from .traversals import AstToList, Printer
 
 
 class PostProcessor:
-  def __init__(self, statements, symbol_table):
+  def __init__(self, statements, symbol_table, chain_ordering=None, shr_mem_weight=1.0):
+    """
+    :param chain_ordering: objective of automatic matrix-chain reordering
+                           (see MatrixChainOrdering). `None` keeps the ordering given by a user
+    """
     if not isinstance(statements, StatementsNode):
       raise ValueError(f'expected StatementsNode, given {type(statements)}')
 
     self.stmts = statements
     self.symbol_table = symbol_table
+    self.chain_ordering = chain_ordering
+    self.shr_mem_weight = shr_mem_weight
 
   def process(self, visualize=False):
     gemm_dicts = {}
     for child in self.stmts.children:
       _, ast = ConstantPropagation(self.symbol_table).traverse(child)
       ast = DeadNodesElimination().traverse(ast)
+      if self.chain_ordering:
+        ast = MatrixChainOrdering(self.symbol_table,
+                                  objective=self.chain_ordering,
+                                  shr_mem_weight=self.shr_mem_weight).traverse(ast)
       ast = PrimaryGemmFolder(self.symbol_table).traverse(ast)
       ast = GemmListFolder().traversal(ast)
       if visualize:
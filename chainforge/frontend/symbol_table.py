@@ -1,6 +1,6 @@
 import enum
 from typing import Dict, Union
-from chainforge.common import DenseMatrix, Addressing
+from chainforge.common import Matrix, Addressing
 
 
 class ObjType(enum.Enum):
@@ -12,7 +12,7 @@ class Attribute:
   def __init__(self, descr):
     self.descr = descr
     self.obj_type = None
-    if isinstance(descr, DenseMatrix):
+    if isinstance(descr, Matrix):
       self.obj_type = ObjType.MATRIX
     elif isinstance(descr, float):
       self.obj_type = ObjType.SCALAR
@@ -1,7 +1,7 @@
 import os
 from graphviz import Digraph
 from chainforge.common import generate_tmp_matrix
-from chainforge.common import GemmDescr
+from chainforge.common import GemmDescr, Epilogue
 from .nodes import VarNode, ScalarNode, MatrixNode, DeadNode
 from .nodes import BinarryOps, AssignNode, AddNode, MultNode
 from .nodes import StatementsNode, GemmListNode
@@ -78,6 +78,101 @@ class DeadNodesElimination:
     return node
 
 
+class MatrixChainOrdering:
+  """Reassociates pure chains of matrix multiplications (i.e., MultNode-s with
+  only MatrixNode-s as leaves) using dynamic-programming matrix-chain ordering.
+
+  Objectives:
+    flops: minimize num. flops. Ties are resolved by tmp. shared memory footprint
+    shr_mem: minimize peak footprint of temporaries. Ties are resolved by num. flops
+    balanced: minimize `flops + shr_mem_weight * footprint`
+  """
+  OBJECTIVES = ['flops', 'shr_mem', 'balanced']
+
+  def __init__(self, symbol_table, objective='flops', shr_mem_weight=1.0):
+    if objective not in MatrixChainOrdering.OBJECTIVES:
+      allowed = ', '.join(MatrixChainOrdering.OBJECTIVES)
+      raise ValueError(f'expected chain ordering objective to be one of {allowed}, given: {objective}')
+
+    self._symbol_table = symbol_table
+    self._objective = objective
+    self._shr_mem_weight = shr_mem_weight
+
+  def traverse(self, node):
+    if isinstance(node, MultNode):
+      leaves = self._collect_leaves(node)
+      if leaves and len(leaves) > 2:
+        return self._reorder(leaves)
+
+    if isinstance(node, BinarryOps):
+      node.left = self.traverse(node.left)
+      node.right = self.traverse(node.right)
+    return node
+
+  def _collect_leaves(self, node):
+    if isinstance(node, MatrixNode):
+      return [node]
+    elif isinstance(node, MultNode):
+      left = self._collect_leaves(node.left)
+      right = self._collect_leaves(node.right)
+      return left + right if (left and right) else None
+    else:
+      return None
+
+  def _get_shape(self, leaf):
+    matrix = self._symbol_table.find(leaf.name).descr
+    rows, cols = matrix.get_actual_num_rows(), matrix.get_actual_num_cols()
+    return (cols, rows) if leaf.is_trans else (rows, cols)
+
+  def _rank(self, flops, footprint):
+    if self._objective == 'flops':
+      return flops, footprint
+    elif self._objective == 'shr_mem':
+      return footprint, flops
+    else:
+      return flops + self._shr_mem_weight * footprint, flops
+
+  def _reorder(self, leaves):
+    shapes = [self._get_shape(leaf) for leaf in leaves]
+    rows = [shape[0] for shape in shapes]
+    cols = [shape[1] for shape in shapes]
+    num_leaves = len(leaves)
+
+    # NOTE: leaves are not temporaries. Thus, they do not contribute to the footprint.
+    # A subchain is evaluated from left to right i.e., the result of the left
+    # subchain stays in shr. mem. while the right one is being computed
+    flops = [[0] * num_leaves for _ in range(num_leaves)]
+    footprint = [[0] * num_leaves for _ in range(num_leaves)]
+    tmp_size = [[0] * num_leaves for _ in range(num_leaves)]
+    split = [[None] * num_leaves for _ in range(num_leaves)]
+
+    for length in range(2, num_leaves + 1):
+      for i in range(num_leaves - length + 1):
+        j = i + length - 1
+        tmp_size[i][j] = rows[i] * cols[j]
+        best_rank = None
+        for k in range(i, j):
+          curr_flops = flops[i][k] + flops[k + 1][j] + 2 * rows[i] * cols[k] * cols[j]
+          curr_footprint = max(footprint[i][k],
+                               tmp_size[i][k] + footprint[k + 1][j],
+                               tmp_size[i][k] + tmp_size[k + 1][j])
+          rank = self._rank(curr_flops, curr_footprint)
+          if best_rank is None or rank < best_rank:
+            best_rank = rank
+            flops[i][j] = curr_flops
+            footprint[i][j] = curr_footprint
+            split[i][j] = k
+
+    return self._build(leaves, split, 0, num_leaves - 1)
+
+  def _build(self, leaves, split, i, j):
+    if i == j:
+      return leaves[i]
+    k = split[i][j]
+    return MultNode(left=self._build(leaves, split, i, k),
+                    right=self._build(leaves, split, k + 1, j))
+
+
 class PrimaryGemmFolder:
   def __init__(self, symbol_table):
     self._symbol_table = symbol_table
@@ -95,7 +190,9 @@ class PrimaryGemmFolder:
     left_attr = self._symbol_table.find(self._retrieve_name(gemm.left))
     right_attr = self._symbol_table.find(self._retrieve_name(gemm.right))
     descr = generate_tmp_matrix(op1=left_attr.descr,
-                                op2=right_attr.descr)
+                                op2=right_attr.descr,
+                                trans_op1=getattr(gemm.left, 'is_trans', False),
+                                trans_op2=getattr(gemm.right, 'is_trans', False))
     name = GemmNode.make_tmp_name()
     descr.alias = name
     self._symbol_table.add(name=name, descr=descr)
@@ -159,6 +256,7 @@ class AstToList:
     self._check_root(self._curr_root)
     self._initial_alpha = self._compute_initial_alpha(self._curr_root)
     self._to_list(ast)
+    self._attach_epilogue(self._curr_root)
     return self._gemm_list
 
   def _check_root(self, root):
@@ -191,6 +289,30 @@ class AstToList:
         raise ValueError(f'cannot add {name} to {lhs.name} using only gemms')
     return value
 
+  def _attach_epilogue(self, root):
+    if not root.epilogue:
+      return
+
+    # NOTE: extra outputs must receive the entire rhs. Thus, it must be computed by a single gemm chain
+    if len(root.right.children) != 1:
+      raise ValueError(f'an epilogue requires rhs of `{root.name}` to be a single matrix product')
+
+    scale, addends, outputs = None, [], []
+    for op_name, node, beta in root.epilogue:
+      matrix = self._symbol_table.find(node.name).descr
+      if op_name == 'scale':
+        if scale is not None:
+          raise ValueError(f'an epilogue of `{root.name}` can have only one scale')
+        scale = matrix
+      elif op_name == 'add':
+        addends.append(matrix)
+      else:
+        outputs.append((matrix, beta))
+
+    last_gemm = self._gemm_list[-1]
+    last_gemm.epilogue = Epilogue(scale=scale, addends=addends, outputs=outputs)
+    last_gemm.epilogue.check(last_gemm.mat_c)
+
   def _make_gemm_descr(self, gemm):
     if not isinstance(gemm, GemmNode):
       raise ValueError(f'expected GemmNode, given {type(gemm)}')
@@ -0,0 +1,163 @@
+import os
+import re
+import shutil
+import ctypes
+import subprocess
+import tempfile
+from typing import Dict, List, Tuple, Union
+import numpy as np
+import pytest
+from chainforge.common import Addressing, FloatingPointType, SparseMatrix
+from chainforge.common.matrix import Matrix
+from chainforge.backend.generator import Generator
+from chainforge.backend.interpreter import IrInterpreter
+
+
+CXX = os.environ.get('CXX', 'g++')
+CXXFLAGS = os.environ.get('CXXFLAGS', '-std=c++14 -O1 -fopenmp')
+
+requires_compiler = pytest.mark.skipif(shutil.which(CXX) is None, reason=f'{CXX} is not available')
+
+
+def get_batch_matrices(generator: Generator) -> Dict[str, Matrix]:
+  """Returns matrices passed to a launcher given by their names"""
+  matrices = {}
+  for gemm in generator.gemm_list:
+    epilogue = getattr(gemm, 'epilogue', None)
+    extra = epilogue.get_matrices() if epilogue else []
+    for matrix in [gemm.mat_a, gemm.mat_b, gemm.mat_c] + list(extra):
+      if not matrix.is_tmp:
+        matrices[matrix.name] = matrix
+  return matrices
+
+
+def make_batches(generator: Generator,
+                 num_elements: int,
+                 offsets: Union[Dict[str, int], None] = None,
+                 seed: int = 0) -> Dict[str, object]:
+  """Returns random batches laid out as expected by a launcher and `IrInterpreter`"""
+  rng = np.random.default_rng(seed)
+  dtype = np.float32 if generator.get_context().fp_type == FloatingPointType.FLOAT else np.float64
+  offsets = offsets if offsets else {}
+  batches = {}
+  for name, matrix in get_batch_matrices(generator).items():
+    volume = matrix.get_real_volume()
+    offset = offsets.get(name, 0)
+    if matrix.addressing == Addressing.STRIDED:
+      batches[name] = rng.standard_normal(offset + num_elements * volume).astype(dtype)
+    elif matrix.addressing == Addressing.PTR_BASED:
+      batches[name] = [rng.standard_normal(offset + volume).astype(dtype) for _ in range(num_elements)]
+    else:
+      batches[name] = rng.standard_normal(volume).astype(dtype)
+  return batches
+
+
+def copy_batches(batches: Dict[str, object]) -> Dict[str, object]:
+  return {name: [item.copy() for item in batch] if isinstance(batch, list) else batch.copy()
+          for name, batch in batches.items()}
+
+
+def get_max_difference(lhs: Dict[str, object], rhs: Dict[str, object]) -> float:
+  difference = 0.0
+  for name, batch in lhs.items():
+    items = zip(batch, rhs[name]) if isinstance(batch, list) else [(batch, rhs[name])]
+    for lhs_item, rhs_item in items:
+      difference = max(difference, float(np.max(np.abs(lhs_item - rhs_item), initial=0.0)))
+  return difference
+
+
+def parse_launcher_params(generator: Generator) -> Tuple[str, List[Tuple[str, str]]]:
+  """Returns the launcher name and its params as (type, name) pairs"""
+  match = re.match(r'\s*void\s+(\w+)\((.*)\);', generator.get_header())
+  params = []
+  for param in match.group(2).split(','):
+    declaration = param.split('=')[0].strip()
+    param_type, name = declaration.rsplit(' ', 1)
+    params.append((param_type.replace(' ', ''), name))
+  return match.group(1), params
+
+
+class HostLibrary:
+  """A shared library which contains a kernel and a launcher generated for the cpu backend"""
+
+  def __init__(self, generator: Generator):
+    self._generator: Generator = generator
+    self._dir: str = tempfile.mkdtemp(prefix='chainforge_')
+    src = f'#include <cstddef>\nextern "C" {{\n{generator.get_kernel()}\n{generator.get_launcher()}\n}}\n'
+    src_path = os.path.join(self._dir, 'kernel.cpp')
+    lib_path = os.path.join(self._dir, 'kernel.so')
+    with open(src_path, 'w') as file:
+      file.write(src)
+
+    result = subprocess.run([CXX, '-shared', '-fPIC'] + CXXFLAGS.split() + [src_path, '-o', lib_path],
+                            capture_output=True,
+                            text=True)
+    if result.returncode != 0:
+      raise RuntimeError(f'failed to compile a generated kernel:\n{result.stderr}\n{src}')
+    self._lib = ctypes.CDLL(lib_path)
+
+  def launch(self,
+             batches: Dict[str, object],
+             num_elements: int,
+             offsets: Union[Dict[str, int], None] = None,
+             scalars: Union[Dict[str, float], None] = None,
+             flags: Union[np.ndarray, None] = None) -> None:
+    is_float = self._generator.get_context().fp_type == FloatingPointType.FLOAT
+    fp_type = ctypes.c_float if is_float else ctypes.c_double
+    offsets = offsets if offsets else {}
+    scalars = scalars if scalars else {}
+
+    launcher_name, params = parse_launcher_params(self._generator)
+    args, keep_alive = [], []
+    for param_type, name in params:
+      if param_type in ('float', 'double'):
+        args.append(fp_type(scalars[name]))
+      elif param_type in ('float*', 'double*'):
+        args.append(batches[name].ctypes.data_as(ctypes.POINTER(fp_type)))
+      elif param_type in ('float**', 'double**'):
+        pointers = (ctypes.POINTER(fp_type) * len(batches[name]))(
+          *[item.ctypes.data_as(ctypes.POINTER(fp_type)) for item in batches[name]])
+        keep_alive.append(pointers)
+        args.append(pointers)
+      elif param_type in ('unsigned', 'size_t') and name.endswith('_extraOffset'):
+        offset_type = ctypes.c_uint if param_type == 'unsigned' else ctypes.c_size_t
+        args.append(offset_type(offsets.get(name[:-len('_extraOffset')], 0)))
+      elif param_type == 'size_t':
+        args.append(ctypes.c_size_t(num_elements))
+      elif param_type == 'unsigned*':
+        if flags is None:
+          args.append(ctypes.c_void_p(0))
+        else:
+          flags = np.ascontiguousarray(flags, dtype=np.uint32)
+          args.append(flags.ctypes.data_as(ctypes.c_void_p))
+      elif param_type == 'void*':
+        args.append(ctypes.c_void_p(0))
+      else:
+        raise ValueError(f'unexpected launcher param: {param_type} {name}')
+    getattr(self._lib, launcher_name)(*args)
+
+
+def compare_with_interpreter(generator: Generator,
+                             num_elements: int = 13,
+                             offsets: Union[Dict[str, int], None] = None,
+                             scalars: Union[Dict[str, float], None] = None,
+                             flags: Union[np.ndarray, None] = None) -> float:
+  """Runs a kernel of the cpu backend and `IrInterpreter` on the same batches.
+
+  Returns the max. abs. difference between all batches after both runs
+  """
+  batches = make_batches(generator, num_elements, offsets)
+  expected = copy_batches(batches)
+  IrInterpreter.from_generator(generator).run(expected, num_elements, offsets, scalars, flags)
+  HostLibrary(generator).launch(batches, num_elements, offsets, scalars, flags)
+  return get_max_difference(batches, expected)
+
+
+def to_dense(matrix: Matrix, values: np.ndarray) -> np.ndarray:
+  """Returns a (num_rows, num_cols) array of a single element given in the glb. mem. layout"""
+  if isinstance(matrix, SparseMatrix):
+    dense = np.zeros((matrix.num_rows, matrix.num_cols), dtype=values.dtype)
+    for index, (row, column) in enumerate(matrix.get_nonzeros()):
+      dense[row, column] = values[index]
+    return dense
+  return values.reshape(matrix.num_cols, matrix.num_rows).T
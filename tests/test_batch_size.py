@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from chainforge.common import Context, FloatingPointType
+from chainforge.common.context import Options
+from chainforge.backend.generator import Generator
+from host_runner import requires_compiler, compare_with_interpreter, parse_launcher_params
+from test_host import make_chain
+
+
+def generate(**options):
+  generator = Generator(make_chain(), Context('avx2', 'cpu', FloatingPointType.DOUBLE, Options(**options)))
+  generator.generate()
+  return generator
+
+
+def get_offset_types(generator):
+  _, params = parse_launcher_params(generator)
+  return {param_type for param_type, name in params if name.endswith('_extraOffset')}
+
+
+def test_launchers_without_declared_size_are_not_chunked():
+  generator = generate()
+  assert get_offset_types(generator) == {'unsigned'}
+  assert 'chunkOffset' not in generator.get_launcher()
+
+
+def test_declared_sizes_select_index_types():
+  generator = generate(max_batch_size=1000)
+  assert get_offset_types(generator) == {'unsigned'}
+  assert 'chunkOffset' in generator.get_launcher()
+
+  generator = generate(max_batch_size=2**32)
+  assert get_offset_types(generator) == {'size_t'}
+  assert 'chunkOffset' not in generator.get_launcher()
+
+
+@requires_compiler
+@pytest.mark.parametrize('options', [dict(), dict(enable_persistent_threads=True)])
+def test_chunked_launches(monkeypatch, options):
+  generator = generate(max_batch_size=4, **options)
+
+  # NOTE: forces launches of at most 4 elements
+  monkeypatch.setattr(Generator, 'MAX_32BIT_INDEX', 4 * generator._get_max_strided_volume() + 3)
+  generator._generate_launcher()
+  assert 'chunkOffset' in generator.get_launcher()
+
+  offsets = {matrix.name: 5 for matrix in [generator.gemm_list[1].mat_a, generator.gemm_list[0].mat_a]}
+  flags = np.array([(index * 7) % 3 != 1 for index in range(13)])
+  assert compare_with_interpreter(generator, num_elements=13, offsets=offsets, flags=flags) < 1e-12
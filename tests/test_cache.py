@@ -0,0 +1,84 @@
+import time
+from copy import deepcopy
+from chainforge.common import Context, DenseMatrix, GemmDescr, FloatingPointType, Addressing
+from chainforge.common.context import Options
+from chainforge.backend.cache import KernelCache, CacheEntry
+from chainforge.backend.generator import Generator
+from chainforge.backend.interpreter import IrInterpreter
+from host_runner import requires_compiler, make_batches, copy_batches, get_max_difference, HostLibrary
+
+
+def make_gemm_list():
+  mat_a = DenseMatrix(16, 10, Addressing.STRIDED, bbox=[0, 0, 16, 10])
+  mat_b = DenseMatrix(10, 6, Addressing.NONE, bbox=[0, 0, 10, 6])
+  mat_c = DenseMatrix(16, 6, Addressing.STRIDED, bbox=[0, 0, 16, 6])
+  return [GemmDescr(False, False, mat_a, mat_b, mat_c, alpha=2.0)]
+
+
+def generate(cache, options=None):
+  context = Context('host', 'cpu', FloatingPointType.DOUBLE, options if options else Options())
+  generator = Generator(make_gemm_list(), context, cache=cache)
+  generator.generate()
+  return generator
+
+
+@requires_compiler
+def test_hit_and_miss(tmp_path):
+  cache = KernelCache(str(tmp_path))
+  cold = generate(cache)
+  assert len(cache) == 1
+
+  warm = generate(KernelCache(str(tmp_path)))
+  assert warm.get_kernel() == cold.get_kernel()
+  assert warm.get_launcher() == cold.get_launcher()
+  assert warm.get_header() == cold.get_header()
+
+  num_elements = 5
+  batches = make_batches(cold, num_elements)
+  expected = copy_batches(batches)
+  IrInterpreter.from_generator(cold).run(expected, num_elements)
+  HostLibrary(warm).launch(batches, num_elements)
+  assert get_max_difference(batches, expected) < 1e-12
+
+  generate(cache, Options(enable_register_tiling=False))
+  assert len(cache) == 2
+
+
+def test_instances_share_directory(tmp_path):
+  lhs, rhs = KernelCache(str(tmp_path)), KernelCache(str(tmp_path))
+  lhs.put('x', CacheEntry('kernel_x', 'launcher_x', 'header_x'))
+  rhs.put('y', CacheEntry('kernel_y', 'launcher_y', 'header_y'))
+  assert 'x' in rhs and 'y' in lhs
+  assert rhs.get('x').kernel == 'kernel_x'
+  assert lhs.get('z') is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+  entry = CacheEntry('kernel' * 100, 'launcher', 'header')
+  probe = KernelCache(str(tmp_path / 'probe'))
+  probe.put('probe', entry)
+  entry_size = probe.get_total_size()
+
+  cache = KernelCache(str(tmp_path / 'cache'), max_size=3 * entry_size)
+  for key in ['a', 'b', 'c']:
+    cache.put(key, entry)
+    time.sleep(0.01)
+  cache.get('a')
+  time.sleep(0.01)
+  cache.put('d', entry)
+  assert sorted([key for key in 'abcd' if key in cache]) == ['a', 'c', 'd']
+  assert cache.get_total_size() <= 3 * entry_size
+
+
+@requires_compiler
+def test_report_and_instructions_on_hit(tmp_path):
+  cold = generate(KernelCache(str(tmp_path)))
+  warm = generate(KernelCache(str(tmp_path)))
+  assert warm.get_report().to_dict() == cold.get_report().to_dict()
+
+  num_elements = 5
+  batches = make_batches(warm, num_elements)
+  expected = copy_batches(batches)
+  IrInterpreter.from_generator(warm).run(expected, num_elements)
+  HostLibrary(warm).launch(batches, num_elements)
+  assert get_max_difference(batches, expected) < 1e-12
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from chainforge.common import Context, DenseMatrix, GemmDescr, FloatingPointType, Addressing
+from chainforge.common.context import Options
+from chainforge.backend.generator import Generator
+from host_runner import requires_compiler, compare_with_interpreter
+
+
+def make_gemm(trans_a, trans_b, const_a, const_b):
+  # C = A x B with A: 20x12 and B: 12x7 after transposition
+  shape_a = (12, 20) if trans_a else (20, 12)
+  shape_b = (7, 12) if trans_b else (12, 7)
+  mat_a = DenseMatrix(*shape_a, Addressing.NONE if const_a else Addressing.STRIDED, bbox=[0, 0, *shape_a])
+  mat_b = DenseMatrix(*shape_b, Addressing.NONE if const_b else Addressing.STRIDED, bbox=[0, 0, *shape_b])
+  mat_c = DenseMatrix(20, 7, Addressing.STRIDED, bbox=[0, 0, 20, 7])
+  return [GemmDescr(trans_a, trans_b, mat_a, mat_b, mat_c, beta=1.0)]
+
+
+@requires_compiler
+@pytest.mark.parametrize('trans_a', [False, True])
+@pytest.mark.parametrize('trans_b', [False, True])
+@pytest.mark.parametrize('const_a, const_b', [(True, False), (False, True), (True, True)])
+@pytest.mark.parametrize('register_tiling', [True, False])
+def test_constant_operands(trans_a, trans_b, const_a, const_b, register_tiling):
+  gemm_list = make_gemm(trans_a, trans_b, const_a, const_b)
+  context = Context('host', 'cpu', FloatingPointType.DOUBLE, Options(enable_register_tiling=register_tiling))
+  generator = Generator(gemm_list, context)
+
+  rng = np.random.default_rng(1)
+  for is_const, matrix in [(const_a, gemm_list[0].mat_a), (const_b, gemm_list[0].mat_b)]:
+    if is_const:
+      values = rng.standard_normal((matrix.num_rows, matrix.num_cols))
+      values[rng.random(values.shape) < 0.3] = 0.0
+      generator.set_constant_values(matrix, values)
+  generator.generate()
+
+  assert compare_with_interpreter(generator) < 1e-12
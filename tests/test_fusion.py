@@ -0,0 +1,46 @@
+import pytest
+from chainforge.common import Context, DenseMatrix, GemmDescr, FloatingPointType, Addressing
+from chainforge.common.aux import generate_tmp_matrix
+from chainforge.common.context import Options
+from chainforge.backend.exceptions import GenerationError
+from chainforge.backend.fusion import fuse_gemm_lists
+from chainforge.backend.generator import Generator
+from host_runner import requires_compiler, compare_with_interpreter, parse_launcher_params
+
+
+def make_dense(num_rows, num_cols, addressing=Addressing.STRIDED):
+  return DenseMatrix(num_rows, num_cols, addressing, bbox=[0, 0, num_rows, num_cols])
+
+
+def make_gemm_lists():
+  # C = A x B and E = (A x D) x F, where A is shared by both lists
+  mat_a = make_dense(16, 12)
+  mat_b, mat_c = make_dense(12, 9, Addressing.NONE), make_dense(16, 9)
+  mat_d, mat_e, mat_f = make_dense(12, 8, Addressing.PTR_BASED), make_dense(16, 5), make_dense(8, 5)
+  tmp = generate_tmp_matrix(mat_a, mat_d)
+  return [[GemmDescr(False, False, mat_a, mat_b, mat_c, beta=1.0)],
+          [GemmDescr(False, False, mat_a, mat_d, tmp),
+           GemmDescr(False, False, tmp, mat_f, mat_e, alpha=2.0)]]
+
+
+@requires_compiler
+@pytest.mark.parametrize('pipeline', ['default', 'aggressive'])
+@pytest.mark.parametrize('register_tiling', [True, False])
+def test_fused_lists(pipeline, register_tiling):
+  options = Options(pipeline=pipeline, enable_register_tiling=register_tiling)
+  generator = Generator(fuse_gemm_lists(make_gemm_lists()), Context('avx2', 'cpu', FloatingPointType.DOUBLE, options))
+  generator.generate()
+
+  # NOTE: A, B, C, D, E and F are passed once together with their extra offsets
+  _, params = parse_launcher_params(generator)
+  assert len([name for _, name in params if name.endswith('_extraOffset')]) == 6
+  assert compare_with_interpreter(generator) < 1e-12
+
+
+def test_rejects_dependent_lists():
+  mat_a, mat_b, mat_c = make_dense(16, 12), make_dense(12, 9), make_dense(16, 9)
+  mat_d, mat_e = make_dense(9, 4), make_dense(16, 4)
+  gemm_lists = [[GemmDescr(False, False, mat_a, mat_b, mat_c)],
+                [GemmDescr(False, False, mat_c, mat_d, mat_e)]]
+  with pytest.raises(GenerationError, match='written by the former'):
+    fuse_gemm_lists(gemm_lists)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from chainforge.common import Context, DenseMatrix, GemmDescr, FloatingPointType, Addressing
+from chainforge.common.aux import generate_tmp_matrix
+from chainforge.common.context import Options
+from chainforge.backend.generator import Generator
+from host_runner import requires_compiler, compare_with_interpreter, make_batches, copy_batches, HostLibrary, to_dense
+
+
+def make_chain():
+  # D = 0.5 * A x (B x C)^T + D
+  mat_a = DenseMatrix(20, 14, Addressing.STRIDED, bbox=[0, 0, 20, 14])
+  mat_b = DenseMatrix(9, 12, Addressing.PTR_BASED, bbox=[0, 0, 9, 12])
+  mat_c = DenseMatrix(12, 14, Addressing.NONE, bbox=[0, 0, 12, 14])
+  mat_d = DenseMatrix(20, 9, Addressing.STRIDED, bbox=[0, 0, 20, 9])
+  tmp = generate_tmp_matrix(mat_b, mat_c)
+  return [GemmDescr(False, False, mat_b, mat_c, tmp),
+          GemmDescr(False, True, mat_a, tmp, mat_d, alpha=0.5, beta=1.0)]
+
+
+@requires_compiler
+@pytest.mark.parametrize('fp_type', [FloatingPointType.FLOAT, FloatingPointType.DOUBLE])
+def test_chain_matches_numpy(fp_type):
+  generator = Generator(make_chain(), Context('host', 'cpu', fp_type))
+  generator.generate()
+
+  num_elements = 7
+  batches = make_batches(generator, num_elements)
+  inputs = copy_batches(batches)
+  HostLibrary(generator).launch(batches, num_elements)
+
+  mat_a, mat_b, mat_c, mat_d = [generator.gemm_list[1].mat_a, generator.gemm_list[0].mat_a,
+                                generator.gemm_list[0].mat_b, generator.gemm_list[1].mat_c]
+  tolerance = 1e-4 if fp_type == FloatingPointType.FLOAT else 1e-12
+
+  def get_element(data, matrix, element):
+    if matrix.addressing == Addressing.STRIDED:
+      volume = matrix.get_real_volume()
+      return to_dense(matrix, data[matrix.name][element * volume:(element + 1) * volume])
+    if matrix.addressing == Addressing.PTR_BASED:
+      return to_dense(matrix, data[matrix.name][element])
+    return to_dense(matrix, data[matrix.name])
+
+  for element in range(num_elements):
+    a, b, c, d = [get_element(inputs, matrix, element) for matrix in (mat_a, mat_b, mat_c, mat_d)]
+    result = get_element(batches, mat_d, element)
+    assert np.allclose(result, 0.5 * a @ (b @ c).T + d, atol=tolerance, rtol=tolerance)
+
+
+@requires_compiler
+@pytest.mark.parametrize('options', [dict(),
+                                     dict(enable_register_tiling=False),
+                                     dict(enable_persistent_threads=True),
+                                     dict(enable_block_shared_invariants=True)])
+def test_chain_matches_interpreter(options):
+  generator = Generator(make_chain(), Context('avx2', 'cpu', FloatingPointType.DOUBLE, Options(**options)))
+  generator.generate()
+  flags = np.array([1, 0, 1, 1, 0, 1, 1, 1, 0, 1, 1, 1, 1])
+  assert compare_with_interpreter(generator, num_elements=13, flags=flags) < 1e-12
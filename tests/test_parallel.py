@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import chainforge.backend.parallel as parallel
+from chainforge.common import Context, DenseMatrix, GemmDescr, FloatingPointType, Addressing
+from chainforge.backend.generator import Generator
+from chainforge.backend.parallel import generate_many
+from host_runner import requires_compiler, compare_with_interpreter
+from test_host import make_chain
+
+
+def make_gemm_list():
+  mat_a = DenseMatrix(16, 10, Addressing.STRIDED, bbox=[0, 0, 16, 10])
+  mat_b = DenseMatrix(10, 6, Addressing.NONE, bbox=[0, 0, 10, 6])
+  mat_c = DenseMatrix(16, 6, Addressing.STRIDED, bbox=[0, 0, 16, 6])
+  return [GemmDescr(False, False, mat_a, mat_b, mat_c, alpha=2.0)]
+
+
+def get_context():
+  return Context('host', 'cpu', FloatingPointType.DOUBLE)
+
+
+@requires_compiler
+def test_identical_chains_are_generated_once(monkeypatch):
+  generated = []
+
+  def generate(generator):
+    generated.append(generator)
+    generator.generate()
+    return generator
+  monkeypatch.setattr(parallel, '_generate', generate)
+
+  chain, other = make_chain(), make_gemm_list()
+  generators = generate_many([chain, chain, chain, other, chain],
+                             get_context(),
+                             workers=1,
+                             kernel_names=['first', 'second', None, 'other', 'first'])
+  assert len(generated) == 2
+  assert generators[0] is generators[4]
+  assert [generator.get_base_name() for generator in generators[:2]] == ['first', 'second']
+
+  default_name = Generator(make_chain(), get_context())
+  default_name.register()
+  assert generators[2].get_base_name() == default_name.get_base_name()
+
+  for generator in generators[1:3]:
+    assert generator.get_kernel() == generators[0].get_kernel().replace('first', generator.get_base_name())
+    assert 'first' not in generator.get_launcher() + generator.get_header()
+    assert generator.get_report().to_dict()['name'] == generator.get_base_name()
+    assert compare_with_interpreter(generator) < 1e-12
+
+
+@requires_compiler
+def test_renamed_constants():
+  gemm_list = make_gemm_list()
+  generator = Generator(gemm_list, get_context())
+  generator.set_kernel_name('original')
+  generator.set_constant_values(gemm_list[0].mat_b, np.arange(60.0).reshape(10, 6))
+  generator.generate()
+
+  gemm_list = make_gemm_list()
+  renamed = Generator(gemm_list, get_context())
+  renamed.set_kernel_name('renamed')
+  renamed.set_constant_values(gemm_list[0].mat_b, np.arange(60.0).reshape(10, 6))
+  renamed.adopt_src(generator)
+  assert 'original' not in renamed.get_kernel() + renamed.get_launcher() + renamed.get_header()
+  assert generator.get_base_name() == 'original'
+  assert compare_with_interpreter(renamed) < 1e-12
+
+  other = Generator(make_gemm_list(), get_context())
+  with pytest.raises(ValueError):
+    other.adopt_src(generator)
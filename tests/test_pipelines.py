@@ -0,0 +1,45 @@
+import pytest
+from chainforge.common import Context, FloatingPointType
+from chainforge.common.context import Options
+from chainforge.backend.exceptions import GenerationError
+from chainforge.backend.generator import Generator
+from host_runner import requires_compiler, compare_with_interpreter
+from test_host import make_chain
+
+
+def generate(pipeline, **options):
+  context = Context('avx2', 'cpu', FloatingPointType.DOUBLE, Options(pipeline=pipeline, **options))
+  generator = Generator(make_chain(), context)
+  generator.generate()
+  return generator
+
+
+@requires_compiler
+@pytest.mark.parametrize('pipeline', ['default', 'fast', 'aggressive'])
+@pytest.mark.parametrize('options', [dict(), dict(enable_block_shared_invariants=True)])
+def test_named_pipelines(pipeline, options):
+  assert compare_with_interpreter(generate(pipeline, **options)) < 1e-12
+
+
+@requires_compiler
+@pytest.mark.parametrize('pipeline', [['register_tmps', 'prefetch', 'load_cse', 'shr_mem_padding',
+                                       'region_shr_mem', 'interval_shr_mem', 'sync_threads'],
+                                      ['prefetch', 'hoist_invariants', 'liveness', 'load_cse',
+                                       'region_allocation', 'sync_threads', 'region_shr_mem'],
+                                      []])
+def test_reordered_pipelines(pipeline):
+  assert compare_with_interpreter(generate(pipeline)) < 1e-12
+
+
+@pytest.mark.parametrize('pipeline', [['region_shr_mem', 'load_cse'],
+                                      ['interval_shr_mem', 'shr_mem_padding'],
+                                      ['sync_threads', 'prefetch'],
+                                      ['region_allocation', 'register_tmps', 'region_shr_mem']])
+def test_rejects_allocation_before_rewrites(pipeline):
+  with pytest.raises(GenerationError, match='rewrites the IR'):
+    generate(pipeline)
+
+
+def test_rejects_unknown_passes():
+  with pytest.raises(GenerationError, match='unknown pass'):
+    generate(['load_cse', 'unroll'])
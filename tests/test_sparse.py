@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from chainforge.common import Context, DenseMatrix, SparseMatrix, GemmDescr, FloatingPointType, Addressing
+from chainforge.common.aux import generate_tmp_matrix
+from chainforge.common.context import Options
+from chainforge.backend.generator import Generator
+from host_runner import requires_compiler, compare_with_interpreter, make_batches, copy_batches, HostLibrary, to_dense
+
+
+def make_pattern(num_rows, num_cols, density, seed):
+  rng = np.random.default_rng(seed)
+  pattern = rng.random((num_rows, num_cols)) < density
+  pattern[0, num_cols - 1] = True
+  return pattern
+
+
+def make_sparse(num_rows, num_cols, addressing, bbox=None, density=0.3, seed=0, csr=False):
+  bbox = bbox if bbox else [0, 0, num_rows, num_cols]
+  pattern = make_pattern(num_rows, num_cols, density, seed)
+  if not csr:
+    return SparseMatrix(num_rows, num_cols, addressing, pattern=pattern, bbox=bbox)
+
+  row_ptr, col_indices = [0], []
+  for row in pattern:
+    col_indices.extend(np.nonzero(row)[0].tolist())
+    row_ptr.append(len(col_indices))
+  return SparseMatrix(num_rows, num_cols, addressing, row_ptr=row_ptr, col_indices=col_indices, bbox=bbox)
+
+
+def make_dense(num_rows, num_cols, addressing=Addressing.STRIDED):
+  return DenseMatrix(num_rows, num_cols, addressing, bbox=[0, 0, num_rows, num_cols])
+
+
+def make_sparse_a():
+  mat_a = make_sparse(16, 12, Addressing.NONE)
+  return [GemmDescr(False, False, mat_a, make_dense(12, 9), make_dense(16, 9), alpha=0.5, beta=1.0)]
+
+
+def make_sparse_b():
+  mat_b = make_sparse(12, 9, Addressing.STRIDED, seed=1)
+  return [GemmDescr(False, False, make_dense(16, 12), mat_b, make_dense(16, 9))]
+
+
+def make_transposed_sparse_b():
+  mat_b = make_sparse(9, 12, Addressing.NONE, seed=2, csr=True)
+  return [GemmDescr(False, True, make_dense(16, 12), mat_b, make_dense(16, 9), beta=1.0)]
+
+
+def make_sparse_a_and_b():
+  mat_a = make_sparse(20, 14, Addressing.PTR_BASED, bbox=[2, 1, 18, 13], density=0.5, seed=3)
+  mat_b = make_sparse(14, 10, Addressing.STRIDED, bbox=[1, 0, 13, 7], seed=4)
+  return [GemmDescr(False, False, mat_a, mat_b, make_dense(16, 7))]
+
+
+def make_sparse_chain():
+  # D = (A x B) x E^T + D, where A and E are sparse
+  mat_a = make_sparse(16, 16, Addressing.NONE, density=0.2, seed=5)
+  mat_e = make_sparse(9, 9, Addressing.NONE, density=0.4, seed=6)
+  mat_b = make_dense(16, 9)
+  tmp = generate_tmp_matrix(mat_a, mat_b)
+  return [GemmDescr(False, False, mat_a, mat_b, tmp),
+          GemmDescr(False, True, tmp, mat_e, make_dense(16, 9), beta=1.0)]
+
+
+@requires_compiler
+@pytest.mark.parametrize('make_gemm_list', [make_sparse_a,
+                                            make_sparse_b,
+                                            make_transposed_sparse_b,
+                                            make_sparse_a_and_b,
+                                            make_sparse_chain])
+@pytest.mark.parametrize('register_tiling', [True, False])
+def test_sparse_operands(make_gemm_list, register_tiling):
+  context = Context('avx2', 'cpu', FloatingPointType.DOUBLE, Options(enable_register_tiling=register_tiling))
+  generator = Generator(make_gemm_list(), context)
+  generator.generate()
+  assert compare_with_interpreter(generator) < 1e-12
+
+
+@requires_compiler
+def test_sparse_operands_match_numpy():
+  generator = Generator(make_sparse_a_and_b(), Context('host', 'cpu', FloatingPointType.DOUBLE))
+  generator.generate()
+
+  num_elements = 4
+  batches = make_batches(generator, num_elements)
+  inputs = copy_batches(batches)
+  HostLibrary(generator).launch(batches, num_elements)
+
+  gemm = generator.gemm_list[0]
+  volume_b, volume_c = gemm.mat_b.get_real_volume(), gemm.mat_c.get_real_volume()
+  for element in range(num_elements):
+    a = to_dense(gemm.mat_a, inputs[gemm.mat_a.name][element])
+    b = to_dense(gemm.mat_b, inputs[gemm.mat_b.name][element * volume_b:(element + 1) * volume_b])
+    c = to_dense(gemm.mat_c, batches[gemm.mat_c.name][element * volume_c:(element + 1) * volume_c])
+    assert np.allclose(c, a[2:18, 1:13] @ b[1:13, 0:7], atol=1e-12, rtol=1e-12)